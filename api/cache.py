@@ -0,0 +1,120 @@
+"""
+BESS Analytics - API Response Cache
+
+Read endpoints return the same answer for the same parameters until the next
+data load, so responses are kept in an in-process LRU cache keyed by route
+and normalized query parameters (plus the output format) and tagged with the data version the pool
+serves (see ``ConnectionPool.data_version``). A new load changes the version,
+which empties the cache. The cache is bounded by entry count and by the
+total size of the stored bodies, so a few large drilldowns cannot pin
+hundreds of megabytes; bodies over the byte budget are never stored.
+
+Cached responses carry an ``ETag`` derived from the version and key, so a
+client sending it back in ``If-None-Match`` gets ``304 Not Modified`` without
+the endpoint running at all. Only JSON bodies are kept; Arrow and Parquet
+responses are streamed through, but still carry ETags.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+# Route prefixes whose GET responses depend only on the data and the query
+CACHED_PREFIXES = ("/sites", "/metrics/", "/edge/")
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Response headers stored and replayed with a cached body
+PRESERVED_HEADERS = ("x-next-cursor",)
+
+
+def cache_key(path: str, query: str, fmt: str = "json") -> str:
+    """
+    Route plus query parameters in a canonical order, so equivalent URLs share an entry.
+
+    ``fmt`` is the negotiated output format, which may come from the
+    ``Accept`` header rather than the query string.
+    """
+    params = sorted(parse_qsl(query, keep_blank_values=True))
+    key = f"{path}?{urlencode(params)}" if params else path
+    return key if fmt == "json" else f"{key}#{fmt}"
+
+
+def etag(version: str, key: str) -> str:
+    """Strong ETag for a response to ``key`` at a data version."""
+    return '"' + hashlib.sha1(f"{version}|{key}".encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Whether an ``If-None-Match`` header names ``tag`` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return tag in candidates
+
+
+class ResponseCache:
+    """Thread-safe LRU of response bodies for the current data version."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._entries: OrderedDict[str, tuple[bytes, str, dict]] = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the cached bodies."""
+        return self._bytes
+
+    def get(self, version: str, key: str) -> Optional[tuple[bytes, str, dict]]:
+        """
+        Cached ``(body, media_type, headers)`` for ``key``, or None on a miss.
+
+        ``version`` is the one the pool currently serves; seeing a new one
+        drops everything cached for the previous version.
+        """
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, version: str, key: str, body: bytes, media_type: str, headers: Optional[dict] = None):
+        """
+        Store a response produced at ``version``.
+
+        Bodies from any version but the current one are ignored, so a slow
+        response read from a previous snapshot cannot evict newer entries.
+        """
+        with self._lock:
+            if version != self._version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (body, media_type, headers or {})
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = None
@@ -0,0 +1,246 @@
+"""
+BESS Analytics - Bounded Query Execution
+
+Endpoints run their DuckDB work on a dedicated, fixed-size thread pool rather
+than the server's shared threadpool, behind an admission limit:
+
+- At most ``workers`` queries run at once and ``queue_depth`` more may wait;
+  beyond that requests are refused with ``503`` and ``Retry-After``.
+- Each route has a time budget; a query still running when it expires is
+  stopped with ``conn.interrupt()`` and the request fails with ``504``.
+- If the client disconnects while its query runs, the query is interrupted
+  too, so abandoned dashboard requests stop using CPU.
+- Arrow and Parquet results stream from the cursor after the endpoint
+  returns; they hold their slot and stay under the same budget and
+  disconnect check until the last chunk is sent. The slot is given back
+  even if the body is never started: when the response finishes sending or
+  fails, or when a response that was never sent is garbage collected.
+
+Under a burst the API therefore sheds load quickly instead of starving every
+request of threads.
+"""
+
+import asyncio
+import functools
+import inspect
+import threading
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import duckdb
+from fastapi import HTTPException, Request
+from loguru import logger
+
+from api.formats import QueryStream
+
+DEFAULT_QUERY_WORKERS = 8
+DEFAULT_QUEUE_DEPTH = 32
+
+# Seconds a route's query may run before it is interrupted
+DEFAULT_QUERY_TIMEOUT = 15.0
+
+# Seconds between client-disconnect checks while a query runs
+DISCONNECT_POLL_SECONDS = 0.1
+RETRY_AFTER_SECONDS = 1
+
+# Non-standard status used by proxies for requests the client abandoned
+CLIENT_CLOSED_REQUEST = 499
+
+
+class QueryExecutor:
+    """Admission-limited thread pool running blocking query functions."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_QUERY_WORKERS,
+        queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    ):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Slots are given back from any thread (a finalizer runs wherever
+        # garbage collection does), so admission is counted under a lock
+        self._lock = threading.Lock()
+        self._admitted = 0
+
+    @property
+    def admitted(self) -> int:
+        """Requests currently running or waiting for a worker."""
+        return self._admitted
+
+    def _releaser(self) -> Callable[[], None]:
+        """A thread-safe callback giving back one admitted slot; calls after the first do nothing."""
+        released = False
+
+        def release():
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self._admitted -= 1
+
+        return release
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bess-query")
+        return self._pool
+
+    async def _wait(self, future: asyncio.Future, deadline: float, request: Optional[Request]) -> Optional[str]:
+        """Wait for ``future``; returns why it was given up on (``timeout``/``disconnect``), or None when done."""
+        loop = asyncio.get_running_loop()
+        while True:
+            remaining = deadline - loop.time()
+            done, _ = await asyncio.wait({future}, timeout=max(0.0, min(DISCONNECT_POLL_SECONDS, remaining)))
+            if done:
+                return None
+            if loop.time() >= deadline:
+                return "timeout"
+            if request is not None and await request.is_disconnected():
+                return "disconnect"
+
+    @staticmethod
+    async def _interrupt(future: asyncio.Future, conn: Optional[duckdb.DuckDBPyConnection]):
+        if conn is not None:
+            conn.interrupt()
+        try:
+            # Wait for the worker to unwind so the cursor is idle when released
+            await future
+        except (duckdb.Error, OSError):
+            # Arrow readers surface the interrupt as an OSError
+            pass
+
+    @staticmethod
+    def _log(reason: str, request: Optional[Request], timeout: float):
+        path = request.url.path if request is not None else "query"
+        if reason == "timeout":
+            logger.warning(f"Query for {path} interrupted after {timeout:g}s")
+        else:
+            logger.info(f"Query for {path} cancelled: client disconnected")
+
+    async def run(
+        self,
+        fn: Callable,
+        conn: Optional[duckdb.DuckDBPyConnection],
+        timeout: float = DEFAULT_QUERY_TIMEOUT,
+        request: Optional[Request] = None,
+    ):
+        """
+        Run ``fn()`` on the pool and return its result.
+
+        ``conn`` is the cursor ``fn`` queries; it is interrupted when the
+        timeout expires or ``request``'s client goes away. A ``QueryStream``
+        result keeps its slot and the rest of the time budget until its body
+        has been sent, since its chunks are still being read from ``conn``.
+        """
+        with self._lock:
+            full = self._admitted >= self.workers + self.queue_depth
+            if not full:
+                self._admitted += 1
+        if full:
+            raise HTTPException(
+                status_code=503,
+                detail="Query capacity exhausted, retry shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+        release = self._releaser()
+        streaming = False
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            future = loop.run_in_executor(self._executor(), fn)
+            reason = await self._wait(future, deadline, request)
+            if reason is None:
+                result = future.result()
+                if isinstance(result, QueryStream):
+                    result.body_iterator = self._stream(result.chunks, conn, deadline, timeout, request, release)
+                    result.on_close = release
+                    # A response dropped before it is sent never calls on_close
+                    weakref.finalize(result, release)
+                    streaming = True
+                return result
+            await self._interrupt(future, conn)
+        finally:
+            if not streaming:
+                release()
+
+        self._log(reason, request, timeout)
+        if reason == "timeout":
+            raise HTTPException(status_code=504, detail=f"Query exceeded its {timeout:g}s time limit")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+    async def _stream(
+        self,
+        chunks: Iterator[bytes],
+        conn: Optional[duckdb.DuckDBPyConnection],
+        deadline: float,
+        timeout: float,
+        request: Optional[Request],
+        release: Callable[[], None],
+    ) -> AsyncIterator[bytes]:
+        """Read ``chunks`` on the pool within the request's deadline, then give up its slot with ``release``."""
+        loop = asyncio.get_running_loop()
+        future = None
+        try:
+            while True:
+                future = loop.run_in_executor(self._executor(), next, chunks, None)
+                reason = await self._wait(future, deadline, request)
+                if reason is not None:
+                    await self._interrupt(future, conn)
+                    self._log(reason, request, timeout)
+                    if reason == "timeout":
+                        # The status line is already sent: abort the body so the client sees it is incomplete
+                        raise TimeoutError(f"Query exceeded its {timeout:g}s time limit")
+                    return
+                chunk = future.result()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            if future is not None and not future.done() and conn is not None:
+                # The response was abandoned mid-read
+                conn.interrupt()
+            release()
+
+    def shutdown(self):
+        """Stop the worker threads (a later ``run`` starts new ones)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+executor = QueryExecutor()
+
+
+def bounded(timeout: float = DEFAULT_QUERY_TIMEOUT):
+    """
+    Run a sync endpoint on the query executor with a time budget.
+
+    The endpoint keeps its signature, so FastAPI still injects its query
+    parameters and the pooled ``conn`` cursor, which is what gets
+    interrupted.
+    """
+
+    def decorate(endpoint: Callable) -> Callable:
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, request: Request, **kwargs):
+            return await executor.run(
+                functools.partial(endpoint, *args, **kwargs),
+                kwargs.get("conn"),
+                timeout=timeout,
+                request=request,
+            )
+
+        # Ask FastAPI for the Request as well, without exposing it to the endpoint
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+        return wrapper
+
+    return decorate
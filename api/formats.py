@@ -0,0 +1,251 @@
+"""
+BESS Analytics - Columnar API Output
+
+Bulk endpoints answer in JSON by default. Clients that ask for Arrow or
+Parquet, with ``?format=arrow|parquet`` or an ``Accept`` header, get the
+DuckDB result streamed as Arrow record batches instead, without building a
+DataFrame or encoding rows to JSON:
+
+    import pyarrow as pa, requests
+    resp = requests.get(url, params={"format": "arrow"}, stream=True)
+    table = pa.ipc.open_stream(resp.raw).read_all()
+
+JSON results are encoded straight from Arrow rows by ``RecordsResponse``
+with orjson, when installed, instead of going through ``jsonable_encoder``
+and per-row response model validation. Routes keep their ``response_model``
+for the OpenAPI schema.
+"""
+
+import math
+from collections.abc import Callable, Iterable, Iterator
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard encoder
+    orjson = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "arrow": ARROW_STREAM,
+    "parquet": PARQUET,
+}
+
+# Rows per record batch (and Parquet row group) sent to the client
+BATCH_ROWS = 65536
+
+
+def negotiate_format(format: Optional[str], accept: Optional[str]) -> str:
+    """
+    Output format for a request: ``json``, ``arrow`` or ``parquet``.
+
+    An explicit ``format`` query parameter wins; otherwise the first
+    columnar media type listed in ``Accept`` is used, falling back to JSON.
+    """
+    if format:
+        if format not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported format '{format}'; use one of {', '.join(MEDIA_TYPES)}",
+            )
+        return format
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip()
+        for name, known in MEDIA_TYPES.items():
+            if media_type == known:
+                return name
+    return "json"
+
+
+def _json_default(value):
+    """Encode the values orjson has no native support for, as jsonable_encoder would."""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (timedelta, pd.Timedelta)):
+        return value.total_seconds()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _plain(value):
+    """``value`` with NaN as None and library scalars as plain Python values."""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if value is pd.NaT or value is pd.NA or isinstance(value, (np.generic, pd.Timestamp, Decimal, timedelta)):
+        value = _json_default(value)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class RecordsResponse(JSONResponse):
+    """
+    JSON response for bulk result rows, encoded without ``jsonable_encoder``.
+
+    NaN becomes null and datetimes are ISO 8601, matching the default
+    encoder's output.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(jsonable_encoder(_plain(content)))
+        return orjson.dumps(
+            content,
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+class _ChunkSink:
+    """Write-only file collecting bytes until they are drained to the client."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_batches(schema: pa.Schema, batches: Iterable[pa.RecordBatch], fmt: str) -> Iterator[bytes]:
+    """Encode record batches as an Arrow IPC stream or a Parquet file, chunk by chunk."""
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for batch in batches:
+        writer.write_batch(batch)
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield sink.drain()
+
+
+def _filename(fmt: str, name: str) -> str:
+    return f"{name}.{'arrows' if fmt == 'arrow' else 'parquet'}"
+
+
+def query_response(
+    conn: duckdb.DuckDBPyConnection,
+    query: str,
+    params: list,
+    fmt: str,
+    name: str = "result",
+):
+    """
+    Answer a query in the negotiated format.
+
+    JSON keeps the records list the endpoints always returned. Columnar
+    formats stream DuckDB's record batches as they are produced.
+    """
+    reader = arrow_reader(conn.execute(query, params))
+    if fmt == "json":
+        return RecordsResponse(reader.read_all().to_pylist())
+
+    return QueryStream(stream_batches(reader.schema, reader, fmt), fmt, name)
+
+
+def arrow_reader(result: duckdb.DuckDBPyConnection, batch_rows: int = BATCH_ROWS) -> pa.RecordBatchReader:
+    """Record batch reader over an executed query's result."""
+    # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases
+    if hasattr(result, "to_arrow_reader"):
+        return result.to_arrow_reader(batch_rows)
+    return result.fetch_record_batch(batch_rows)
+
+
+class QueryStream(StreamingResponse):
+    """
+    Columnar response whose chunks are still read from a DuckDB cursor.
+
+    ``chunks`` is the raw iterator; the query executor swaps the body for one
+    that reads it on the query pool under the request's time budget, and sets
+    ``on_close`` to give up its slot. ``on_close`` runs once the response has
+    been sent or has failed, even if its body was never started.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], fmt: str, name: str):
+        super().__init__(
+            chunks,
+            media_type=MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{_filename(fmt, name)}"'},
+        )
+        self.chunks = chunks
+        self.on_close: Optional[Callable[[], None]] = None
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+def _stream(schema: pa.Schema, batches: Iterable[pa.RecordBatch], fmt: str, name: str, headers: Optional[dict] = None):
+    return StreamingResponse(
+        stream_batches(schema, batches, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{_filename(fmt, name)}"', **(headers or {})},
+    )
+
+
+def frame_response(df, fmt: str, name: str = "result"):
+    """Answer with an already built DataFrame in the negotiated format."""
+    # Missing cells (e.g. after a pivot) become nulls rather than NaN
+    return table_response(pa.Table.from_pandas(df, preserve_index=False), fmt, name)
+
+
+def table_response(table: pa.Table, fmt: str, name: str = "result", headers: Optional[dict] = None):
+    """Answer with an Arrow table in the negotiated format, adding ``headers``."""
+    if fmt == "json":
+        return RecordsResponse(table.to_pylist(), headers=headers)
+    return _stream(table.schema, table.to_batches(BATCH_ROWS), fmt, name, headers)
+
+
+def output_format(
+    request: Request,
+    format: Optional[str] = Query(None, description="Response format: json, arrow or parquet"),
+) -> str:
+    """Dependency resolving the requested output format from ``format`` or ``Accept``."""
+    return negotiate_format(format, request.headers.get("accept"))
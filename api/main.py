@@ -4,22 +4,75 @@ BESS Analytics - FastAPI Backend
 Provides REST API endpoints for dashboard metrics and drilldowns.
 """
 
+from contextlib import asynccontextmanager
 from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 import duckdb
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from loguru import logger
 from pydantic import BaseModel
 
+from api.cache import CACHED_PREFIXES, PRESERVED_HEADERS, ResponseCache, cache_key, etag, etag_matches
+from api.executor import bounded, executor
+from api.formats import (
+    MEDIA_TYPES,
+    RecordsResponse,
+    arrow_reader,
+    frame_response,
+    negotiate_format,
+    output_format,
+    query_response,
+)
+from api.pagination import NEXT_CURSOR_HEADER, page_envelope, page_response, paged_query
+from api.pool import ConnectionPool
+from api.stream import TelemetryBroadcaster, event_stream
+from db.downsample import MIN_POINTS, downsample_query
+from db.kpi import portfolio_kpi_snapshot
+from db.partitions import partitioned_source
+from db.retention import telemetry_tier, tier_source
+from db.snapshot import resolve_db_path
+from db.telemetry import has_wide_columns
+
+# Database path
+DATA_DIR = Path(__file__).parent.parent / "data"
+DB_PATH = DATA_DIR / "bess_analytics.duckdb"
+
+# One read-only connection per process, following the published snapshot
+pool = ConnectionPool(lambda: resolve_db_path(DB_PATH))
+response_cache = ResponseCache()
+telemetry_stream = TelemetryBroadcaster()
+
+# Time budget for routes that scan telemetry-sized tables
+BULK_QUERY_TIMEOUT = 60.0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the connection pool on startup and close it on shutdown."""
+    try:
+        pool.open()
+    except duckdb.Error as e:
+        # Still serve /health; requests retry the connection lazily
+        logger.warning(f"Database not available at startup: {e}")
+    yield
+    await telemetry_stream.close()
+    executor.shutdown()
+    pool.close()
+    response_cache.clear()
+
+
 # Initialize app
 app = FastAPI(
     title="BESS Analytics API",
     description="API for Battery Energy Storage System telemetry and analytics",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -29,16 +82,70 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", NEXT_CURSOR_HEADER],
 )
 
-# Database path
-DATA_DIR = Path(__file__).parent.parent / "data"
-DB_PATH = DATA_DIR / "bess_analytics.duckdb"
 
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    """Serve repeated reads from the response cache until the data version changes."""
+    path = request.url.path
+    if request.method != "GET" or not path.startswith(CACHED_PREFIXES):
+        return await call_next(request)
+    try:
+        version = await run_in_threadpool(pool.data_version)
+    except duckdb.Error:
+        return await call_next(request)
 
-def get_db() -> duckdb.DuckDBPyConnection:
-    """Get database connection."""
-    return duckdb.connect(str(DB_PATH), read_only=True)
+    try:
+        fmt = negotiate_format(request.query_params.get("format"), request.headers.get("accept"))
+    except HTTPException:
+        return await call_next(request)
+    key = cache_key(path, request.url.query, fmt)
+    tag = etag(version, key)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+
+    cached = response_cache.get(version, key)
+    if cached is not None:
+        body, media_type, preserved = cached
+        return Response(body, media_type=media_type, headers={**preserved, **headers, "X-Cache": "HIT"})
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    # A snapshot swap while the request ran means its cursor may have read other
+    # data than the version checked above; tag the body with what was served
+    # (the cache ignores bodies from any version but its current one)
+    served = getattr(request.state, "data_version", None)
+    if served is not None and served != version:
+        version = served
+        headers["ETag"] = etag(version, key)
+    if fmt != "json":
+        # Columnar results are streamed to the client, not buffered
+        response.headers.update(headers)
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    media_type = response.headers.get("content-type", MEDIA_TYPES["json"])
+    preserved = {h: response.headers[h] for h in PRESERVED_HEADERS if h in response.headers}
+    response_cache.put(version, key, body, media_type, preserved)
+    return Response(body, media_type=media_type, headers={**preserved, **headers, "X-Cache": "MISS"})
+
+
+def get_db(request: Request) -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Dependency yielding a pooled cursor on the live database snapshot.
+
+    The cursor's data version is recorded on the request, so the response
+    cache tags the body with the snapshot that actually produced it.
+    """
+    cursor = pool.cursor()
+    request.state.data_version = pool.cursor_version(cursor)
+    try:
+        yield cursor
+    finally:
+        pool.release(cursor)
 
 
 # ============== Response Models ==============
@@ -90,9 +197,13 @@ class RevenueLossRecord(BaseModel):
     date: date
     site_id: str
     site_name: str
-    forecast_revenue: float
+    forecast_revenue: Optional[float]
     actual_revenue: float
-    revenue_gap: float
+    revenue_gap: Optional[float]
+    loss_faults_gbp: float
+    loss_trips_gbp: float
+    loss_data_gaps_gbp: float
+    loss_market_gbp: float
     loss_category: str
 
 
@@ -119,9 +230,11 @@ def root():
 def health_check():
     """Health check endpoint."""
     try:
-        conn = get_db()
-        conn.execute("SELECT 1").fetchone()
-        conn.close()
+        cursor = pool.cursor()
+        try:
+            cursor.execute("SELECT 1").fetchone()
+        finally:
+            pool.release(cursor)
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
@@ -130,26 +243,24 @@ def health_check():
 # ============== Sites ==============
 
 @app.get("/sites", response_model=list[SiteInfo])
-def get_sites():
+@bounded()
+def get_sites(conn: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get all sites."""
-    conn = get_db()
     df = conn.execute("""
         SELECT site_id, name, country, bess_mw, bess_mwh, vendor_controller
         FROM dim_site
     """).df()
-    conn.close()
     return df.to_dict(orient="records")
 
 
 @app.get("/sites/{site_id}")
-def get_site(site_id: str):
+@bounded()
+def get_site(site_id: str, conn: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get site details with latest telemetry."""
-    conn = get_db()
     result = conn.execute("""
         SELECT * FROM v_site_latest_telemetry
         WHERE site_id = ?
     """, [site_id]).df()
-    conn.close()
 
     if result.empty:
         raise HTTPException(status_code=404, detail="Site not found")
@@ -160,146 +271,120 @@ def get_site(site_id: str):
 # ============== Portfolio Metrics ==============
 
 @app.get("/metrics/portfolio", response_model=PortfolioMetrics)
+@bounded()
 def get_portfolio_metrics(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
-    """Get portfolio-level metrics."""
-    conn = get_db()
-
-    # Sites summary
-    sites = conn.execute("SELECT COUNT(*) as cnt, SUM(bess_mw) as mw, SUM(bess_mwh) as mwh FROM dim_site").fetchone()
+    """Get portfolio-level metrics, optionally for a date range."""
+    return PortfolioMetrics(**portfolio_kpi_snapshot(conn, start_date, end_date))
 
-    # Revenue MTD
-    revenue_query = """
-        SELECT COALESCE(SUM(revenue_gbp), 0) as revenue
-        FROM fact_settlement
-        WHERE date >= DATE_TRUNC('month', (SELECT MAX(date) FROM fact_settlement))
-    """
-    revenue = conn.execute(revenue_query).fetchone()[0]
 
-    # Average availability
-    availability = conn.execute("""
-        SELECT AVG(availability_pct)
+# All SiteMetrics fields for a set of sites in one set-based pass
+SITE_METRICS_QUERY = """
+    WITH sites AS (
+        SELECT site_id, name
+        FROM dim_site
+        WHERE {site_filter}
+    ),
+    latest AS (
+        SELECT
+            site_id,
+            arg_max(value, ts) FILTER (WHERE tag = 'p_kw') as current_power_kw,
+            arg_max(value, ts) FILTER (WHERE tag = 'soc_pct') as current_soc_pct,
+            arg_max(value, ts) FILTER (WHERE tag = 'soh_pct') as current_soh_pct
+        FROM cur_telemetry
+        WHERE site_id IN (SELECT site_id FROM sites)
+        GROUP BY site_id
+    ),
+    availability AS (
+        -- Last 7 days
+        SELECT site_id, AVG(availability_pct) as availability_pct
         FROM v_site_availability
-        WHERE date >= (SELECT MAX(date) FROM v_site_availability) - INTERVAL '7 days'
-    """).fetchone()[0] or 0
-
-    # Active faults
-    active_faults = conn.execute("""
-        SELECT COUNT(*)
+        WHERE site_id IN (SELECT site_id FROM sites)
+        AND date >= (SELECT MAX(date) FROM v_site_availability) - INTERVAL '7 days'
+        GROUP BY site_id
+    ),
+    revenue AS (
+        SELECT site_id, SUM(revenue_gbp) as revenue_mtd
+        FROM fact_settlement
+        WHERE site_id IN (SELECT site_id FROM sites)
+        AND date >= DATE_TRUNC('month', (SELECT MAX(date) FROM fact_settlement))
+        GROUP BY site_id
+    ),
+    events AS (
+        SELECT site_id, COUNT(*) as active_events
         FROM fact_events
-        WHERE event_type IN ('fault', 'trip')
-        AND end_ts > (SELECT MAX(ts) FROM fact_telemetry) - INTERVAL '1 hour'
-    """).fetchone()[0]
-
-    # Average SOH
-    avg_soh = conn.execute("""
-        SELECT AVG(avg_soh)
-        FROM v_battery_health
-        WHERE date = (SELECT MAX(date) FROM v_battery_health)
-    """).fetchone()[0] or 0
-
-    # Sites below availability target (95%)
-    below_target = conn.execute("""
-        SELECT COUNT(DISTINCT site_id)
-        FROM v_site_availability
-        WHERE date >= (SELECT MAX(date) FROM v_site_availability) - INTERVAL '7 days'
+        WHERE site_id IN (SELECT site_id FROM sites)
+        AND (end_ts > (SELECT MAX(ts) FROM cur_telemetry) OR end_ts IS NULL)
         GROUP BY site_id
-        HAVING AVG(availability_pct) < 95
-    """).fetchone()
-    below_target_count = below_target[0] if below_target else 0
-
-    conn.close()
-
-    return PortfolioMetrics(
-        total_sites=sites[0],
-        total_mw=sites[1] or 0,
-        total_mwh=sites[2] or 0,
-        revenue_mtd=revenue,
-        avg_availability_pct=availability,
-        active_faults=active_faults,
-        avg_soh_pct=avg_soh,
-        sites_below_target=below_target_count,
     )
+    SELECT
+        s.site_id,
+        s.name,
+        l.current_power_kw,
+        l.current_soc_pct,
+        l.current_soh_pct,
+        a.availability_pct,
+        COALESCE(r.revenue_mtd, 0) as revenue_mtd,
+        COALESCE(e.active_events, 0) as active_events
+    FROM sites s
+    LEFT JOIN latest l ON l.site_id = s.site_id
+    LEFT JOIN availability a ON a.site_id = s.site_id
+    LEFT JOIN revenue r ON r.site_id = s.site_id
+    LEFT JOIN events e ON e.site_id = s.site_id
+    ORDER BY s.site_id
+"""
 
 
-@app.get("/metrics/site/{site_id}", response_model=SiteMetrics)
-def get_site_metrics(site_id: str):
-    """Get site-level metrics."""
-    conn = get_db()
+def _site_metrics(conn: duckdb.DuckDBPyConnection, site_ids: Optional[list[str]] = None) -> list[dict]:
+    """SiteMetrics rows for the given sites (default: all) from a single query."""
+    if site_ids:
+        site_filter = f"site_id IN ({', '.join('?' for _ in site_ids)})"
+        params = list(site_ids)
+    else:
+        site_filter, params = "TRUE", []
 
-    # Site info
-    site = conn.execute("SELECT site_id, name FROM dim_site WHERE site_id = ?", [site_id]).fetchone()
-    if not site:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Site not found")
+    result = conn.execute(SITE_METRICS_QUERY.format(site_filter=site_filter), params)
+    return arrow_reader(result).read_all().to_pylist()
 
-    # Latest telemetry
-    latest = conn.execute("""
-        SELECT
-            MAX(CASE WHEN tag = 'p_kw' THEN value END) as power,
-            MAX(CASE WHEN tag = 'soc_pct' THEN value END) as soc,
-            MAX(CASE WHEN tag = 'soh_pct' THEN value END) as soh
-        FROM (
-            SELECT tag, value
-            FROM fact_telemetry
-            WHERE site_id = ?
-            ORDER BY ts DESC
-            LIMIT 100
-        )
-    """, [site_id]).fetchone()
 
-    # Availability (last 7 days)
-    avail = conn.execute("""
-        SELECT AVG(availability_pct)
-        FROM v_site_availability
-        WHERE site_id = ?
-        AND date >= (SELECT MAX(date) FROM v_site_availability) - INTERVAL '7 days'
-    """, [site_id]).fetchone()[0]
+@app.get("/metrics/sites", response_model=list[SiteMetrics])
+@bounded()
+def get_sites_metrics(
+    site_ids: Optional[str] = Query(None, description="Comma-separated site IDs (default: all sites)"),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
+):
+    """Get site-level metrics for many sites at once."""
+    ids = [s.strip() for s in site_ids.split(",") if s.strip()] if site_ids else None
+    # Rows already have the SiteMetrics shape; skip validating each one
+    return RecordsResponse(_site_metrics(conn, ids))
 
-    # Revenue MTD
-    revenue = conn.execute("""
-        SELECT COALESCE(SUM(revenue_gbp), 0)
-        FROM fact_settlement
-        WHERE site_id = ?
-        AND date >= DATE_TRUNC('month', (SELECT MAX(date) FROM fact_settlement))
-    """, [site_id]).fetchone()[0]
 
-    # Active events
-    active_events = conn.execute("""
-        SELECT COUNT(*)
-        FROM fact_events
-        WHERE site_id = ?
-        AND (end_ts > (SELECT MAX(ts) FROM fact_telemetry) OR end_ts IS NULL)
-    """, [site_id]).fetchone()[0]
-
-    conn.close()
-
-    return SiteMetrics(
-        site_id=site[0],
-        name=site[1],
-        current_power_kw=latest[0],
-        current_soc_pct=latest[1],
-        current_soh_pct=latest[2],
-        availability_pct=avail,
-        revenue_mtd=revenue,
-        active_events=active_events,
-    )
+@app.get("/metrics/site/{site_id}", response_model=SiteMetrics)
+@bounded()
+def get_site_metrics(site_id: str, conn: duckdb.DuckDBPyConnection = Depends(get_db)):
+    """Get site-level metrics."""
+    metrics = _site_metrics(conn, [site_id])
+    if not metrics:
+        raise HTTPException(status_code=404, detail="Site not found")
+    return metrics[0]
 
 
 # ============== Revenue ==============
 
 @app.get("/metrics/revenue")
+@bounded()
 def get_revenue_metrics(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     group_by: str = Query("day", regex="^(day|week|month)$"),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get revenue metrics with optional filtering."""
-    conn = get_db()
-
     date_trunc = {
         "day": "DATE_TRUNC('day', date)",
         "week": "DATE_TRUNC('week', date)",
@@ -330,21 +415,25 @@ def get_revenue_metrics(
 
     query += f" GROUP BY {date_trunc}, site_id ORDER BY period"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="revenue")
 
 
-@app.get("/metrics/revenue_loss")
+@app.get("/metrics/revenue_loss", response_model=list[RevenueLossRecord])
+@bounded()
 def get_revenue_loss(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
-    """Get revenue loss attribution."""
-    conn = get_db()
+    """
+    Get revenue loss attribution.
 
+    Each day's revenue gap is split across faults, trips, data gaps and
+    market conditions by ``v_revenue_loss_allocation``; ``loss_category``
+    names the largest share.
+    """
     query = """
         SELECT
             date,
@@ -353,10 +442,12 @@ def get_revenue_loss(
             forecast_revenue,
             actual_revenue,
             revenue_gap,
-            fault_minutes,
-            trip_minutes,
-            data_completeness
-        FROM v_revenue_loss_attribution
+            loss_faults_gbp,
+            loss_trips_gbp,
+            loss_data_gaps_gbp,
+            loss_market_gbp,
+            loss_category
+        FROM v_revenue_loss_allocation
         WHERE 1=1
     """
     params = []
@@ -373,47 +464,26 @@ def get_revenue_loss(
 
     query += " ORDER BY date DESC"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    # Categorize losses
-    records = []
-    for _, row in df.iterrows():
-        loss_category = "Other"
-        if row["fault_minutes"] > 30:
-            loss_category = "Faults/Trips"
-        elif row["data_completeness"] < 95:
-            loss_category = "Data Gaps"
-        elif row["revenue_gap"] > 0:
-            loss_category = "Market Conditions"
-
-        records.append({
-            "date": row["date"],
-            "site_id": row["site_id"],
-            "site_name": row["site_name"],
-            "forecast_revenue": row["forecast_revenue"],
-            "actual_revenue": row["actual_revenue"],
-            "revenue_gap": row["revenue_gap"],
-            "loss_category": loss_category,
-        })
-
-    return records
+    return query_response(conn, query, params, fmt, name="revenue_loss")
 
 
 # ============== Events ==============
 
-@app.get("/metrics/events")
+@app.get("/metrics/events", response_model=list[EventRecord])
+@bounded()
 def get_events(
     site_id: Optional[str] = Query(None),
     event_type: Optional[str] = Query(None),
     severity: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    limit: int = Query(100, le=1000),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    envelope: bool = Depends(page_envelope),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get event records with filtering."""
-    conn = get_db()
-
     query = """
         SELECT
             event_id, site_id, asset_id,
@@ -439,23 +509,20 @@ def get_events(
         query += " AND start_ts <= ?"
         params.append(datetime.combine(end_date, datetime.max.time()))
 
-    query += f" ORDER BY start_ts DESC LIMIT {limit}"
-
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    page, next_cursor = paged_query(conn, query, params, [("start_ts", "DESC"), ("event_id", "DESC")], limit, cursor)
+    return page_response(page, next_cursor, fmt, name="events", envelope=envelope)
 
 
 @app.get("/metrics/event_summary")
+@bounded()
 def get_event_summary(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get event summary statistics."""
-    conn = get_db()
-
     query = """
         SELECT
             site_id,
@@ -480,19 +547,19 @@ def get_event_summary(
 
     query += " GROUP BY site_id, event_type, severity ORDER BY count DESC"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="event_summary")
 
 
 # ============== SLA ==============
 
 @app.get("/metrics/sla_report")
-def get_sla_report(site_id: Optional[str] = Query(None)):
+@bounded()
+def get_sla_report(
+    site_id: Optional[str] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
+):
     """Get SLA compliance report."""
-    conn = get_db()
-
     query = """
         SELECT
             sla_id,
@@ -515,27 +582,36 @@ def get_sla_report(site_id: Optional[str] = Query(None)):
         query += " AND site_id = ?"
         params.append(site_id)
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="sla_report")
 
 
 # ============== Telemetry ==============
 
 @app.get("/metrics/telemetry")
+@bounded(timeout=BULK_QUERY_TIMEOUT)
 def get_telemetry(
     site_id: str = Query(...),
     tags: str = Query(..., description="Comma-separated tag names"),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     resolution: str = Query("1min", regex="^(1min|5min|15min|1hour|1day)$"),
+    max_points: Optional[int] = Query(
+        None,
+        ge=MIN_POINTS,
+        description="Downsample to at most this many rows, keeping per-tag min/max extremes",
+    ),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get telemetry data for specified tags."""
-    conn = get_db()
-
     tag_list = [t.strip() for t in tags.split(",")]
-    tag_placeholders = ",".join(["?" for _ in tag_list])
+    if max_points and max_points < MIN_POINTS * len(set(tag_list)):
+        # Every tag needs its end points plus one min/max bucket
+        raise HTTPException(
+            status_code=422,
+            detail=f"max_points must be at least {MIN_POINTS} per requested tag "
+            f"({MIN_POINTS * len(set(tag_list))} for {len(set(tag_list))} tags)",
+        )
 
     # Resolution mapping
     resolutions = {
@@ -546,13 +622,57 @@ def get_telemetry(
         "1day": "DATE_TRUNC('day', ts)",
     }
     time_bucket = resolutions[resolution]
+    resolution_minutes = {"1min": 1, "5min": 5, "15min": 15, "1hour": 60, "1day": 1440}[resolution]
+
+    # Pick the cheapest retention tier that still has this resolution and range
+    start = datetime.combine(start_date, datetime.min.time()) if start_date else None
+    tier = telemetry_tier(conn, resolution_minutes, start)
+    raw = tier["table"] == "fact_telemetry"
+
+    # Date-bounded raw reads prefer the hive-partitioned layout, so only this
+    # site's days are read; other raw reads of registered tags are served
+    # straight from their columns in the wide table
+    partitioned = partitioned_source(conn, "fact_telemetry") if raw and (start_date or end_date) else None
+    if raw and not partitioned and has_wide_columns(tag_list):
+        tag_columns = sorted(set(tag_list))
+        averages = ", ".join(f"AVG({tag}) as {tag}" for tag in tag_columns)
+        query = f"""
+            SELECT
+                {time_bucket} as ts,
+                {averages}
+            FROM fact_telemetry_wide
+            WHERE site_id = ?
+        """
+        params = [site_id]
+
+        if start_date:
+            query += " AND ts >= ?"
+            params.append(datetime.combine(start_date, datetime.min.time()))
+        if end_date:
+            query += " AND ts <= ?"
+            params.append(datetime.combine(end_date, datetime.max.time()))
+
+        query += f" GROUP BY {time_bucket} ORDER BY ts"
+        if max_points:
+            query = downsample_query(query, max_points, tag_columns)
+
+        return query_response(conn, query, params, fmt, name="telemetry")
+
+    tag_placeholders = ",".join(["?" for _ in tag_list])
+
+    if raw:
+        source = partitioned or "fact_telemetry"
+        value = "AVG(value)"
+    else:
+        source = tier_source(tier)
+        value = "SUM(avg_value * sample_count) / SUM(sample_count)"
 
     query = f"""
         SELECT
             {time_bucket} as ts,
             tag,
-            AVG(value) as value
-        FROM fact_telemetry
+            {value} as value
+        FROM {source}
         WHERE site_id = ?
         AND tag IN ({tag_placeholders})
     """
@@ -561,32 +681,43 @@ def get_telemetry(
     if start_date:
         query += " AND ts >= ?"
         params.append(datetime.combine(start_date, datetime.min.time()))
+        if partitioned:
+            query += " AND date >= ?"
+            params.append(start_date)
     if end_date:
         query += " AND ts <= ?"
         params.append(datetime.combine(end_date, datetime.max.time()))
+        if partitioned:
+            query += " AND date <= ?"
+            params.append(end_date)
 
     query += f" GROUP BY {time_bucket}, tag ORDER BY ts"
+    if max_points:
+        # Split the budget between tags so the pivoted rows stay within max_points
+        per_tag = max_points // len(set(tag_list))
+        query = downsample_query(query, per_tag, ["value"], series_column="tag")
 
     df = conn.execute(query, params).df()
-    conn.close()
 
     # Pivot to wide format
     if not df.empty:
         df_pivot = df.pivot(index="ts", columns="tag", values="value").reset_index()
-        return df_pivot.to_dict(orient="records")
+        df_pivot.columns.name = None
+        return frame_response(df_pivot, fmt, name="telemetry")
 
-    return []
+    return frame_response(pd.DataFrame({"ts": pd.Series(dtype="datetime64[us]")}), fmt, name="telemetry")
 
 
 @app.get("/metrics/data_quality")
+@bounded()
 def get_data_quality(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get data quality metrics."""
-    conn = get_db()
-
     query = """
         SELECT
             site_id,
@@ -611,23 +742,47 @@ def get_data_quality(
 
     query += " ORDER BY date DESC"
 
-    df = conn.execute(query, params).df()
-    conn.close()
+    return query_response(conn, query, params, fmt, name="data_quality")
 
-    return df.to_dict(orient="records")
+
+# ============== Live Stream ==============
+
+@app.get("/stream/telemetry")
+async def stream_telemetry(
+    request: Request,
+    site_ids: Optional[str] = Query(None, description="Comma-separated site IDs (default: all sites)"),
+    tags: Optional[str] = Query(None, description="Comma-separated tags (default: all tags)"),
+):
+    """
+    Push telemetry readings as they are ingested, as Server-Sent Events.
+
+    Each ``telemetry`` event carries a JSON list of new ``site_id``, ``tag``,
+    ``ts`` and ``value`` readings; a ``dropped`` event reports readings
+    discarded because the client fell behind.
+    """
+    subscriber = telemetry_stream.subscribe(
+        site_ids=[s.strip() for s in site_ids.split(",") if s.strip()] if site_ids else None,
+        tags=[t.strip() for t in tags.split(",") if t.strip()] if tags else None,
+    )
+    return StreamingResponse(
+        event_stream(telemetry_stream, subscriber, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ============== Battery Health ==============
 
 @app.get("/metrics/battery_health")
+@bounded()
 def get_battery_health(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get battery health metrics."""
-    conn = get_db()
-
     query = """
         SELECT
             site_id,
@@ -654,24 +809,22 @@ def get_battery_health(
 
     query += " ORDER BY date"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="battery_health")
 
 
 # ============== Dispatch ==============
 
 @app.get("/metrics/dispatch")
+@bounded()
 def get_dispatch_metrics(
     site_id: Optional[str] = Query(None),
     service_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get dispatch data."""
-    conn = get_db()
-
     query = """
         SELECT
             DATE_TRUNC('hour', ts) as hour,
@@ -700,21 +853,19 @@ def get_dispatch_metrics(
 
     query += " GROUP BY DATE_TRUNC('hour', ts), site_id, service_id ORDER BY hour"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="dispatch")
 
 
 @app.get("/metrics/dispatch_compliance")
+@bounded()
 def get_dispatch_compliance(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get dispatch compliance metrics."""
-    conn = get_db()
-
     query = """
         SELECT
             site_id,
@@ -739,24 +890,22 @@ def get_dispatch_compliance(
 
     query += " ORDER BY date DESC"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="dispatch_compliance")
 
 
 # ============== Partners ==============
 
 @app.get("/metrics/partner_revenue")
+@bounded()
 def get_partner_revenue(
     partner_id: Optional[str] = Query(None),
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get partner revenue share data."""
-    conn = get_db()
-
     query = """
         SELECT
             partner_id,
@@ -787,19 +936,15 @@ def get_partner_revenue(
 
     query += " ORDER BY date DESC"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="partner_revenue")
 
 
 # ============== Vendor Benchmarking ==============
 
 @app.get("/metrics/vendor_benchmark")
-def get_vendor_benchmark():
+@bounded()
+def get_vendor_benchmark(conn: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get vendor benchmarking metrics."""
-    conn = get_db()
-
     df = conn.execute("""
         SELECT
             s.vendor_controller as vendor,
@@ -817,7 +962,6 @@ def get_vendor_benchmark():
             AND e.event_type IN ('fault', 'trip')
         GROUP BY s.vendor_controller
     """).df()
-    conn.close()
 
     return df.to_dict(orient="records")
 
@@ -825,12 +969,10 @@ def get_vendor_benchmark():
 # ============== Pipeline ==============
 
 @app.get("/metrics/pipeline")
-def get_pipeline():
+@bounded()
+def get_pipeline(conn: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get project pipeline data."""
-    conn = get_db()
-
     df = conn.execute("SELECT * FROM projects_pipeline ORDER BY expected_cod").df()
-    conn.close()
 
     return df.to_dict(orient="records")
 
@@ -838,15 +980,16 @@ def get_pipeline():
 # ============== Maintenance ==============
 
 @app.get("/metrics/maintenance")
+@bounded()
 def get_maintenance(
     site_id: Optional[str] = Query(None),
     status: Optional[str] = Query(None, regex="^(open|closed)$"),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get maintenance ticket data."""
-    conn = get_db()
-
     query = """
         SELECT
             ticket_id,
@@ -878,23 +1021,21 @@ def get_maintenance(
 
     query += " ORDER BY opened_ts DESC"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="maintenance")
 
 
 # ============== Grid Code ==============
 
 @app.get("/metrics/grid_code")
+@bounded(timeout=BULK_QUERY_TIMEOUT)
 def get_grid_code_metrics(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get grid code compliance metrics."""
-    conn = get_db()
-
     query = """
         WITH power_data AS (
             SELECT
@@ -950,24 +1091,24 @@ def get_grid_code_metrics(
         ORDER BY r.date DESC
     """
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="grid_code")
 
 
 # ============== Edge Intelligence ==============
 
 @app.get("/edge/corrected_signals")
+@bounded(timeout=BULK_QUERY_TIMEOUT)
 def get_corrected_signals(
     site_id: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    limit: int = Query(1000, le=10000),
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    envelope: bool = Depends(page_envelope),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get corrected signal data with trust scores."""
-    conn = get_db()
-
     query = """
         SELECT
             site_id, ts, soc_pct_raw, soc_pct_corrected, soe_mwh_corrected,
@@ -988,19 +1129,18 @@ def get_corrected_signals(
         query += " AND ts <= ?"
         params.append(datetime.combine(end_date, datetime.max.time()))
 
-    query += f" ORDER BY ts DESC LIMIT {limit}"
-
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    page, next_cursor = paged_query(conn, query, params, [("ts", "DESC"), ("CAST(site_id AS VARCHAR)", "DESC")], limit, cursor)
+    return page_response(page, next_cursor, fmt, name="corrected_signals", envelope=envelope)
 
 
 @app.get("/edge/latest_signals")
-def get_latest_corrected_signals(site_id: Optional[str] = Query(None)):
+@bounded()
+def get_latest_corrected_signals(
+    site_id: Optional[str] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
+):
     """Get latest corrected signals per site."""
-    conn = get_db()
-
     query = "SELECT * FROM v_latest_corrected_signals"
     params = []
 
@@ -1008,17 +1148,17 @@ def get_latest_corrected_signals(site_id: Optional[str] = Query(None)):
         query = "SELECT * FROM v_latest_corrected_signals WHERE site_id = ?"
         params.append(site_id)
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="latest_signals")
 
 
 @app.get("/edge/signal_health")
-def get_signal_health(site_id: Optional[str] = Query(None)):
+@bounded()
+def get_signal_health(
+    site_id: Optional[str] = Query(None),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
+):
     """Get signal health summary per site."""
-    conn = get_db()
-
     query = "SELECT * FROM v_site_signal_health"
     params = []
 
@@ -1026,21 +1166,21 @@ def get_signal_health(site_id: Optional[str] = Query(None)):
         query = "SELECT * FROM v_site_signal_health WHERE site_id = ?"
         params.append(site_id)
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="signal_health")
 
 
 @app.get("/edge/constraints")
+@bounded()
 def get_constraints(
     site_id: Optional[str] = Query(None),
     constraint_type: Optional[str] = Query(None),
-    limit: int = Query(500, le=5000),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    envelope: bool = Depends(page_envelope),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get power/energy constraint records."""
-    conn = get_db()
-
     query = """
         SELECT site_id, ts, constraint_type, reason, limit_value, duration_min, severity
         FROM fact_constraints
@@ -1055,23 +1195,20 @@ def get_constraints(
         query += " AND constraint_type = ?"
         params.append(constraint_type)
 
-    query += f" ORDER BY ts DESC LIMIT {limit}"
-
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    page, next_cursor = paged_query(conn, query, params, [("ts", "DESC"), ("CAST(site_id AS VARCHAR)", "DESC"), ("constraint_type", "DESC")], limit, cursor)
+    return page_response(page, next_cursor, fmt, name="constraints", envelope=envelope)
 
 
 @app.get("/edge/forecasts")
+@bounded(timeout=BULK_QUERY_TIMEOUT)
 def get_forecasts(
     site_id: Optional[str] = Query(None),
     horizon_min: Optional[int] = Query(None),
-    limit: int = Query(1000, le=10000),
+    limit: int = Query(1000, ge=1, le=10000),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get energy/power availability forecasts."""
-    conn = get_db()
-
     query = """
         SELECT site_id, ts, horizon_min, predicted_soc_pct,
                time_to_empty_min, time_to_full_min, confidence_pct, available_energy_mwh
@@ -1089,21 +1226,21 @@ def get_forecasts(
 
     query += f" ORDER BY ts DESC, horizon_min LIMIT {limit}"
 
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    return query_response(conn, query, params, fmt, name="forecasts")
 
 
 @app.get("/edge/imbalance")
+@bounded(timeout=BULK_QUERY_TIMEOUT)
 def get_imbalance(
     site_id: Optional[str] = Query(None),
     severity: Optional[str] = Query(None),
-    limit: int = Query(1000, le=10000),
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    envelope: bool = Depends(page_envelope),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get rack imbalance detection records."""
-    conn = get_db()
-
     query = """
         SELECT site_id, rack_id, ts, imbalance_score, severity, max_cell_delta_mv, max_temp_delta_c
         FROM fact_imbalance
@@ -1118,24 +1255,23 @@ def get_imbalance(
         query += " AND severity = ?"
         params.append(severity)
 
-    query += f" ORDER BY ts DESC LIMIT {limit}"
-
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    page, next_cursor = paged_query(conn, query, params, [("ts", "DESC"), ("CAST(site_id AS VARCHAR)", "DESC"), ("rack_id", "DESC")], limit, cursor)
+    return page_response(page, next_cursor, fmt, name="imbalance", envelope=envelope)
 
 
 @app.get("/edge/balancing_actions")
+@bounded()
 def get_balancing_actions(
     site_id: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
-    limit: int = Query(500, le=5000),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    envelope: bool = Depends(page_envelope),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get balancing action recommendations."""
-    conn = get_db()
-
     query = """
         SELECT action_id, site_id, rack_id, ts, action_type, priority,
                estimated_duration_min, estimated_recovery_mwh, status
@@ -1154,25 +1290,24 @@ def get_balancing_actions(
         query += " AND priority = ?"
         params.append(priority)
 
-    query += f" ORDER BY ts DESC LIMIT {limit}"
-
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    page, next_cursor = paged_query(conn, query, params, [("ts", "DESC"), ("action_id", "DESC")], limit, cursor)
+    return page_response(page, next_cursor, fmt, name="balancing_actions", envelope=envelope)
 
 
 @app.get("/edge/insights")
+@bounded()
 def get_insights(
     site_id: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     severity: Optional[str] = Query(None),
     resolved: Optional[bool] = Query(None),
-    limit: int = Query(500, le=5000),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    envelope: bool = Depends(page_envelope),
+    fmt: str = Depends(output_format),
+    conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get automated insights and findings."""
-    conn = get_db()
-
     query = """
         SELECT finding_id, ts, site_id, category, severity, title,
                description, recommendation, estimated_value_gbp,
@@ -1195,24 +1330,16 @@ def get_insights(
         query += " AND resolved = ?"
         params.append(resolved)
 
-    query += """
-        ORDER BY
-            CASE severity WHEN 'critical' THEN 1 WHEN 'alert' THEN 2 WHEN 'warning' THEN 3 ELSE 4 END,
-            ts DESC
-    """
-    query += f" LIMIT {limit}"
-
-    df = conn.execute(query, params).df()
-    conn.close()
-
-    return df.to_dict(orient="records")
+    severity_rank = "CASE severity WHEN 'critical' THEN 1 WHEN 'alert' THEN 2 WHEN 'warning' THEN 3 ELSE 4 END"
+    keys = [(severity_rank, "ASC"), ("ts", "DESC"), ("finding_id", "DESC")]
+    page, next_cursor = paged_query(conn, query, params, keys, limit, cursor)
+    return page_response(page, next_cursor, fmt, name="insights", envelope=envelope)
 
 
 @app.get("/edge/value_at_risk")
-def get_value_at_risk(site_id: Optional[str] = Query(None)):
+@bounded()
+def get_value_at_risk(site_id: Optional[str] = Query(None), conn: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get total value at risk from unresolved insights."""
-    conn = get_db()
-
     query = """
         SELECT
             site_id,
@@ -1238,7 +1365,6 @@ def get_value_at_risk(site_id: Optional[str] = Query(None)):
         SELECT SUM(estimated_value_gbp) as total, COUNT(*) as count
         FROM fact_insights_findings WHERE resolved = false
     """).fetchone()
-    conn.close()
 
     return {
         "by_site": df.to_dict(orient="records"),
@@ -0,0 +1,158 @@
+"""
+BESS Analytics - Keyset Pagination
+
+Listing endpoints page through history with opaque cursor tokens rather than
+OFFSET. Each page is ordered by a unique sort key, typically ``(ts, id)``; the
+cursor encodes the key of the last row returned, and the next page starts
+strictly after it. Every page is then a filtered top-N query, so the
+thousandth page costs the same as the first.
+
+The cursor for the following page is returned in the ``X-Next-Cursor``
+response header, and is absent on the last page:
+
+    GET /metrics/events?limit=100
+    GET /metrics/events?limit=100&cursor=<X-Next-Cursor>
+
+Clients that cannot see response headers ask for ``envelope=true`` and get
+the JSON rows wrapped as ``{"items": [...], "next_cursor": ...}``, with
+``next_cursor`` null on the last page.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional
+
+import duckdb
+import pyarrow as pa
+from fastapi import HTTPException, Query
+
+from api.formats import RecordsResponse, arrow_reader, table_response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value):
+    # Tag temporal values so they decode back to the type DuckDB compares against
+    if isinstance(value, datetime):
+        return {"ts": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque, URL-safe token for a row's sort key values."""
+    payload = [_encode_value(v) for v in values]
+    token = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return token.decode().rstrip("=")
+
+
+def decode_cursor(token: str, key_count: int) -> list:
+    """Sort key values from a cursor token; raises a 400 for malformed tokens."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        values = []
+        for v in payload:
+            if isinstance(v, dict) and "ts" in v:
+                values.append(datetime.fromisoformat(v["ts"]))
+            elif isinstance(v, dict) and "date" in v:
+                values.append(date.fromisoformat(v["date"]))
+            else:
+                values.append(v)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if len(values) != key_count:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _after(keys: list[tuple[str, str]]) -> str:
+    """
+    Predicate selecting rows strictly after a cursor in ``keys`` order.
+
+    Expands the lexicographic comparison so keys may mix directions, and
+    repeats a bound on the leading key on its own so zone maps can skip row
+    groups.
+    """
+    clauses = []
+    for i, (_, direction) in enumerate(keys):
+        equal = [f"_key_{j} = ?" for j in range(i)]
+        op = "<" if direction == "DESC" else ">"
+        clauses.append("(" + " AND ".join(equal + [f"_key_{i} {op} ?"]) + ")")
+    leading = "<=" if keys[0][1] == "DESC" else ">="
+    return f"_key_0 {leading} ? AND ({' OR '.join(clauses)})"
+
+
+def _after_params(values: list) -> list:
+    params = [values[0]]
+    for i in range(len(values)):
+        params.extend(values[: i + 1])
+    return params
+
+
+def paged_query(
+    conn: duckdb.DuckDBPyConnection,
+    query: str,
+    params: list,
+    keys: list[tuple[str, str]],
+    limit: int,
+    cursor: Optional[str] = None,
+):
+    """
+    Run one page of ``query`` in ``keys`` order.
+
+    ``query`` is the filtered SELECT without ORDER BY or LIMIT; ``keys`` are
+    ``(expression, "ASC" | "DESC")`` pairs over its output columns that
+    together identify a row. Returns the page as an Arrow table and the
+    cursor for the next page, or None if this is the last one.
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    key_columns = ", ".join(f"{expr} as _key_{i}" for i, (expr, _) in enumerate(keys))
+    order_by = ", ".join(f"_key_{i} {direction}" for i, (_, direction) in enumerate(keys))
+    page_params = list(params)
+    where = "TRUE"
+    if cursor:
+        where = _after(keys)
+        page_params += _after_params(decode_cursor(cursor, len(keys)))
+
+    try:
+        result = conn.execute(
+            f"""
+            SELECT * FROM (SELECT *, {key_columns} FROM ({query}))
+            WHERE {where}
+            ORDER BY {order_by}
+            LIMIT {int(limit) + 1}
+            """,
+            page_params,
+        )
+    except duckdb.ConversionException:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    page = arrow_reader(result).read_all()
+
+    next_cursor = None
+    if page.num_rows > limit:
+        page = page.slice(0, limit)
+        last = page.slice(limit - 1, 1)
+        next_cursor = encode_cursor([last.column(f"_key_{i}")[0].as_py() for i in range(len(keys))])
+    return page.drop_columns([f"_key_{i}" for i in range(len(keys))]), next_cursor
+
+
+def page_response(page: pa.Table, next_cursor: Optional[str], fmt: str, name: str, envelope: bool = False):
+    """
+    Answer with a page in the negotiated format, advertising the next cursor.
+
+    With ``envelope`` set, JSON pages also carry the cursor in the body.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if envelope and fmt == "json":
+        return RecordsResponse({"items": page.to_pylist(), "next_cursor": next_cursor}, headers=headers)
+    return table_response(page, fmt, name=name, headers=headers)
+
+
+def page_envelope(
+    envelope: bool = Query(False, description='Wrap JSON rows as {"items": [...], "next_cursor": ...}'),
+) -> bool:
+    """Dependency reading whether the page cursor should also be returned in the body."""
+    return envelope
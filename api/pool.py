@@ -0,0 +1,127 @@
+"""
+BESS Analytics - Shared DuckDB Connection Pool
+
+Keeps one read-only DuckDB connection open per process and hands out a
+cursor per request, so the catalog and buffer cache stay warm between
+requests instead of being rebuilt by a fresh ``duckdb.connect`` each time.
+
+The pool follows the published database snapshot (see ``db/snapshot.py``):
+when the pointer moves, new cursors come from a connection to the new
+snapshot, and the old connection is closed once its last cursor is released.
+"""
+
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+from loguru import logger
+
+
+def _data_version(conn: duckdb.DuckDBPyConnection, path: Path) -> str:
+    """Snapshot file name plus the time of the last watermark update in it."""
+    try:
+        loaded_at = conn.execute("SELECT MAX(updated_at) FROM _load_watermarks").fetchone()[0]
+    except duckdb.CatalogException:
+        loaded_at = None
+    return f"{path.name}@{loaded_at.isoformat() if loaded_at else path.stat().st_mtime}"
+
+
+class ConnectionPool:
+    """Process-wide read-only connection that serves per-request cursors."""
+
+    def __init__(self, resolve_path: Callable[[], Path]):
+        self._resolve_path = resolve_path
+        self._lock = threading.Lock()
+        self._path: Optional[Path] = None
+        self._version: Optional[str] = None
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+        # Open cursors per connection, and connections waiting for theirs to close
+        self._in_use: dict[int, int] = {}
+        self._retired: dict[int, duckdb.DuckDBPyConnection] = {}
+        self._owner: dict[int, duckdb.DuckDBPyConnection] = {}
+        self._versions: dict[int, str] = {}
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Database file the pool is currently connected to."""
+        return self._path
+
+    def open(self):
+        """Connect to the live database up front (called on application startup)."""
+        with self._lock:
+            self._current()
+
+    def _current(self) -> duckdb.DuckDBPyConnection:
+        """Connection to the live snapshot, reconnecting if the pointer moved."""
+        path = self._resolve_path()
+        if self._conn is not None and path == self._path:
+            return self._conn
+
+        if self._conn is not None:
+            self._retire(self._conn)
+        self._conn = duckdb.connect(str(path), read_only=True)
+        self._path = path
+        self._version = _data_version(self._conn, path)
+        self._versions[id(self._conn)] = self._version
+        self._in_use[id(self._conn)] = 0
+        logger.info(f"Connection pool opened {path}")
+        return self._conn
+
+    def _retire(self, conn: duckdb.DuckDBPyConnection):
+        if self._in_use.get(id(conn), 0) == 0:
+            self._in_use.pop(id(conn), None)
+            self._versions.pop(id(conn), None)
+            conn.close()
+        else:
+            self._retired[id(conn)] = conn
+
+    def data_version(self) -> str:
+        """Identifier of the data the pool currently serves; changes after every load."""
+        with self._lock:
+            self._current()
+            return self._version
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """Check out a cursor on the live database; return it with ``release``."""
+        with self._lock:
+            conn = self._current()
+            cursor = conn.cursor()
+            self._in_use[id(conn)] += 1
+            self._owner[id(cursor)] = conn
+        return cursor
+
+    def cursor_version(self, cursor: duckdb.DuckDBPyConnection) -> Optional[str]:
+        """Data version of the snapshot a checked-out cursor reads, which may trail ``data_version``."""
+        with self._lock:
+            conn = self._owner.get(id(cursor))
+            return self._versions.get(id(conn)) if conn is not None else None
+
+    def release(self, cursor: duckdb.DuckDBPyConnection):
+        """Close a cursor and, if it was the last one on a retired connection, the connection."""
+        cursor.close()
+        with self._lock:
+            conn = self._owner.pop(id(cursor), None)
+            if conn is None:  # the pool was closed while the cursor was out
+                return
+            self._in_use[id(conn)] -= 1
+            if id(conn) in self._retired and self._in_use[id(conn)] == 0:
+                del self._retired[id(conn)]
+                del self._in_use[id(conn)]
+                del self._versions[id(conn)]
+                conn.close()
+
+    def close(self):
+        """Close every connection (called on application shutdown)."""
+        with self._lock:
+            for conn in [self._conn, *self._retired.values()]:
+                if conn is not None:
+                    conn.close()
+            self._conn = None
+            self._path = None
+            self._version = None
+            self._in_use.clear()
+            self._retired.clear()
+            self._owner.clear()
+            self._versions.clear()
@@ -0,0 +1,157 @@
+"""
+BESS Analytics - Live Telemetry Stream
+
+``GET /stream/telemetry`` pushes telemetry readings to clients as they are
+ingested, as Server-Sent Events, instead of clients re-querying history:
+
+    event: telemetry
+    data: [{"site_id": "SITE001", "tag": "p_kw", "ts": "...", "value": 512.3}]
+
+One ``TelemetryTail`` is shared by every client: a single task polls it and
+fans each batch out to the subscribers, filtered by their sites and tags.
+Each subscriber buffers at most ``max_pending`` readings. A client that reads
+more slowly than data arrives loses its oldest readings instead of holding
+back the tail or other clients, and is told how many with a ``dropped``
+event. Polling stops while nobody is subscribed.
+"""
+
+import asyncio
+import json
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from typing import Callable, Optional
+
+from fastapi import Request
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from db.tail import TelemetryTail
+
+# Seconds between polls of the ingest tail
+POLL_SECONDS = 1.0
+
+# Readings buffered per client before the oldest are dropped
+CLIENT_BUFFER_READINGS = 10000
+
+# Seconds without data after which a keep-alive comment is sent
+HEARTBEAT_SECONDS = 15.0
+
+
+def sse_event(event: str, data) -> bytes:
+    """One Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    """A client's filter and bounded buffer of readings not yet sent."""
+
+    def __init__(
+        self,
+        site_ids: Optional[Iterable[str]] = None,
+        tags: Optional[Iterable[str]] = None,
+        max_pending: int = CLIENT_BUFFER_READINGS,
+    ):
+        self.site_ids = set(site_ids) if site_ids else None
+        self.tags = set(tags) if tags else None
+        self._pending: deque = deque(maxlen=max_pending)
+        self._dropped = 0
+        self._ready = asyncio.Event()
+
+    def wants(self, reading: dict) -> bool:
+        return (self.site_ids is None or reading["site_id"] in self.site_ids) and (
+            self.tags is None or reading["tag"] in self.tags
+        )
+
+    def offer(self, readings: list[dict]):
+        """Buffer the matching readings, dropping the oldest beyond the limit."""
+        matching = [r for r in readings if self.wants(r)]
+        if not matching:
+            return
+        self._dropped += max(0, len(self._pending) + len(matching) - self._pending.maxlen)
+        self._pending.extend(matching)
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> tuple[list[dict], int]:
+        """Wait up to ``timeout`` for readings; returns them and the number dropped since the last batch."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._ready.clear()
+        readings, dropped = list(self._pending), self._dropped
+        self._pending.clear()
+        self._dropped = 0
+        return readings, dropped
+
+
+class TelemetryBroadcaster:
+    """Polls one ingest tail and fans new readings out to subscribers."""
+
+    def __init__(self, tail_factory: Callable[[], TelemetryTail] = TelemetryTail, poll_seconds: float = POLL_SECONDS):
+        self.tail_factory = tail_factory
+        self.poll_seconds = poll_seconds
+        self._subscribers: set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, site_ids=None, tags=None, max_pending: int = CLIENT_BUFFER_READINGS) -> Subscriber:
+        """Register a client; must be called from the event loop."""
+        subscriber = Subscriber(site_ids, tags, max_pending)
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        # Start at the current end of the data, so clients only get new readings
+        tail = await run_in_threadpool(self.tail_factory)
+        while True:
+            try:
+                readings = await run_in_threadpool(tail.poll)
+            except OSError as e:
+                logger.warning(f"Telemetry tail poll failed: {e}")
+                readings = []
+            for subscriber in list(self._subscribers):
+                subscriber.offer(readings)
+            await asyncio.sleep(self.poll_seconds)
+
+    async def close(self):
+        """Stop polling and forget all subscribers."""
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def event_stream(
+    broadcaster: TelemetryBroadcaster,
+    subscriber: Subscriber,
+    request: Optional[Request] = None,
+    heartbeat: float = HEARTBEAT_SECONDS,
+) -> AsyncIterator[bytes]:
+    """SSE byte stream for one subscriber, until the client disconnects."""
+    try:
+        yield b": connected\n\n"
+        while request is None or not await request.is_disconnected():
+            readings, dropped = await subscriber.next_batch(heartbeat)
+            if dropped:
+                yield sse_event("dropped", {"count": dropped})
+            if readings:
+                yield sse_event("telemetry", readings)
+            elif not dropped:
+                yield b": keep-alive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscriber)
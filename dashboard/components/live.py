@@ -0,0 +1,65 @@
+"""
+Live Telemetry Component
+
+Keeps the most recent ingested telemetry in memory for real-time pages. A
+background thread follows the Bronze micro-batches with ``TelemetryTail`` and
+appends new readings to a bounded buffer, so pages redraw from the buffer
+instead of re-running window queries against DuckDB.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+import pandas as pd
+import streamlit as st
+
+from db.tail import TelemetryTail
+
+# Seconds between polls of the ingest tail
+POLL_SECONDS = 1.0
+
+# Most recent readings kept in memory (all sites and tags)
+BUFFER_READINGS = 200000
+
+
+class LiveTelemetryFeed:
+    """Background follower of ingested telemetry with a bounded reading buffer."""
+
+    def __init__(self, max_readings: int = BUFFER_READINGS, poll_seconds: float = POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._readings: deque = deque(maxlen=max_readings)
+        self._lock = threading.Lock()
+        self._tail = TelemetryTail()
+        self._thread = threading.Thread(target=self._run, name="live-telemetry", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                readings = self._tail.poll()
+            except OSError:
+                readings = []
+            if readings:
+                with self._lock:
+                    self._readings.extend(readings)
+            time.sleep(self.poll_seconds)
+
+    def snapshot(self, site_id: Optional[str] = None, tags: Optional[List[str]] = None) -> pd.DataFrame:
+        """Buffered readings as a ``site_id``/``tag``/``ts``/``value`` DataFrame."""
+        with self._lock:
+            readings = list(self._readings)
+        df = pd.DataFrame(readings, columns=["site_id", "tag", "ts", "value"])
+        if site_id:
+            df = df[df["site_id"] == site_id]
+        if tags:
+            df = df[df["tag"].isin(tags)]
+        df["ts"] = pd.to_datetime(df["ts"])
+        return df
+
+
+@st.cache_resource
+def get_live_feed() -> LiveTelemetryFeed:
+    """The process-wide live feed, shared by all sessions."""
+    return LiveTelemetryFeed()
@@ -38,7 +38,7 @@ DASHBOARD_KEY = "enka_portfolio_executive"
 @st.cache_data(ttl=300)
 def load_portfolio_data():
     """Load portfolio summary data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Sites
     sites = conn.execute("SELECT * FROM dim_site").df()
@@ -110,7 +110,7 @@ def load_portfolio_data():
 @st.cache_data(ttl=300)
 def load_revenue_trend():
     """Load revenue trend data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
     df = conn.execute("""
         SELECT
             date,
@@ -127,7 +127,7 @@ def load_revenue_trend():
 @st.cache_data(ttl=300)
 def load_event_summary():
     """Load event summary."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
     df = conn.execute("""
         SELECT
             site_id,
@@ -250,7 +250,7 @@ def main():
 
     with col1:
         st.subheader("Site Availability Heatmap")
-        conn = get_connection()
+        conn = get_connection(read_only=True)
         avail_daily = conn.execute("""
             SELECT site_id, date, availability_pct
             FROM v_site_availability
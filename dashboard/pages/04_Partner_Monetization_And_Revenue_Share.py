@@ -31,7 +31,7 @@ DASHBOARD_KEY = "enka_partner_monetization"
 @st.cache_data(ttl=300)
 def load_partner_data():
     """Load partner revenue share data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     partners = conn.execute("""
         SELECT
@@ -31,7 +31,7 @@ DASHBOARD_KEY = "enka_rtm_settlement"
 @st.cache_data(ttl=300)
 def load_settlement_data():
     """Load settlement and reconciliation data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Daily settlements
     settlements = conn.execute("""
@@ -31,7 +31,7 @@ DASHBOARD_KEY = "enka_lifecycle_augmentation"
 @st.cache_data(ttl=300)
 def load_lifecycle_data():
     """Load battery health and lifecycle data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Battery health trends
     health = conn.execute("""
@@ -32,7 +32,7 @@ DASHBOARD_KEY = "enka_development_pipeline"
 @st.cache_data(ttl=300)
 def load_pipeline_data():
     """Load project pipeline data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     pipeline = conn.execute("SELECT * FROM projects_pipeline").df()
 
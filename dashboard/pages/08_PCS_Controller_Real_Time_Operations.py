@@ -6,6 +6,7 @@ Real-time monitoring of controller status, power output, and alarms.
 
 import sys
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 import plotly.express as px
@@ -16,6 +17,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from dashboard.components.branding import apply_enka_theme, render_sidebar_branding, render_footer, style_plotly_chart
 from dashboard.components.header import get_dashboard_config, render_header, render_filter_bar
+from dashboard.components.live import get_live_feed
 from db.loader import get_connection
 
 st.set_page_config(initial_sidebar_state="expanded", page_title="PCS Real-time Ops", page_icon="⚡", layout="wide")
@@ -27,28 +29,26 @@ render_sidebar_branding("08_PCS_Controller_Real_Time_Operations")
 
 DASHBOARD_KEY = "tmeic_realtime_ops"
 
+# Seconds between redraws of the live panels from the ingest feed
+LIVE_REFRESH_SECONDS = 2
+
 
 @st.cache_data(ttl=60)  # Short cache for real-time data
 def load_realtime_data():
     """Load current operational data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
-    # Latest telemetry per site
+    # Latest telemetry per site (maintained by the loader in cur_telemetry)
     latest_telemetry = conn.execute("""
-        WITH ranked AS (
-            SELECT
-                t.site_id,
-                s.name as site_name,
-                t.tag,
-                t.value,
-                t.ts,
-                ROW_NUMBER() OVER (PARTITION BY t.site_id, t.tag ORDER BY t.ts DESC) as rn
-            FROM fact_telemetry t
-            JOIN dim_site s ON t.site_id = s.site_id
-        )
-        SELECT site_id, site_name, tag, value, ts
-        FROM ranked
-        WHERE rn = 1
+        SELECT
+            c.site_id,
+            s.name as site_name,
+            c.tag,
+            arg_max(c.value, c.ts) as value,
+            MAX(c.ts) as ts
+        FROM cur_telemetry c
+        JOIN dim_site s ON c.site_id = s.site_id
+        GROUP BY c.site_id, s.name, c.tag
     """).df()
 
     # Recent power trend (last 2 hours worth)
@@ -61,7 +61,7 @@ def load_realtime_data():
         FROM fact_telemetry t
         JOIN dim_site s ON t.site_id = s.site_id
         WHERE t.tag = 'p_kw'
-        AND t.ts >= (SELECT MAX(ts) FROM fact_telemetry) - INTERVAL '2 hours'
+        AND t.ts >= (SELECT MAX(ts) FROM cur_telemetry) - INTERVAL '2 hours'
         ORDER BY t.ts
     """).df()
 
@@ -80,7 +80,7 @@ def load_realtime_data():
             e.end_ts
         FROM fact_events e
         JOIN dim_site s ON e.site_id = s.site_id
-        WHERE e.end_ts > (SELECT MAX(ts) FROM fact_telemetry) - INTERVAL '1 hour'
+        WHERE e.end_ts > (SELECT MAX(ts) FROM cur_telemetry) - INTERVAL '1 hour'
            OR e.end_ts IS NULL
         ORDER BY e.start_ts DESC
     """).df()
@@ -112,6 +112,74 @@ def load_realtime_data():
     return latest_telemetry, power_trend, active_alarms, current_dispatch, sites
 
 
+def with_live_latest(latest_telemetry: pd.DataFrame, live: pd.DataFrame) -> pd.DataFrame:
+    """Latest value per site and tag, taking readings ingested since the load where newer."""
+    if live.empty:
+        return latest_telemetry
+    site_names = latest_telemetry.drop_duplicates("site_id").set_index("site_id")["site_name"]
+    live_latest = live.sort_values("ts").groupby(["site_id", "tag"], as_index=False).last()
+    live_latest["site_name"] = live_latest["site_id"].map(site_names)
+    combined = pd.concat([latest_telemetry, live_latest[latest_telemetry.columns]], ignore_index=True)
+    combined = combined.dropna(subset=["site_name"])
+    return combined.sort_values("ts").groupby(["site_id", "tag"], as_index=False).last()
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_live_power(power_trend: pd.DataFrame, site_id: Optional[str]):
+    """Power chart over the loaded 2-hour window, extended with readings pushed since."""
+    live = get_live_feed().snapshot(site_id=site_id, tags=["p_kw"])
+    power = power_trend if not site_id else power_trend[power_trend["site_id"] == site_id]
+
+    if not live.empty:
+        site_names = power_trend.drop_duplicates("site_id").set_index("site_id")["site_name"]
+        live = live.rename(columns={"value": "power_kw"}).drop(columns="tag")
+        live["site_name"] = live["site_id"].map(site_names)
+        if not power.empty:
+            live = live[live["ts"] > power["ts"].max()]
+        power = pd.concat([power, live[power_trend.columns]], ignore_index=True)
+        power = power[power["ts"] >= power["ts"].max() - pd.Timedelta(hours=2)]
+
+    if not power.empty:
+        fig = px.line(
+            power,
+            x="ts",
+            y="power_kw",
+            color="site_name",
+            title="Power Output (kW) - Last 2 Hours"
+        )
+        fig.add_hline(y=0, line_dash="dash", line_color="gray")
+        fig.update_layout(height=350)
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_site_status(latest_telemetry: pd.DataFrame):
+    """Status cards from the latest values, updated as readings are pushed."""
+    latest = with_live_latest(latest_telemetry, get_live_feed().snapshot())
+    if latest.empty:
+        return
+
+    telemetry_pivot = latest.pivot(
+        index=["site_id", "site_name"],
+        columns="tag",
+        values="value"
+    ).reset_index()
+
+    cols = st.columns(len(telemetry_pivot))
+    for idx, (_, row) in enumerate(telemetry_pivot.iterrows()):
+        with cols[idx]:
+            site_name = row["site_name"]
+            power = row.get("p_kw", 0) / 1000
+            soc = row.get("soc_pct", 0)
+            freq = row.get("f_hz", 50)
+            status = "🟢" if row.get("controller_status", 0) > 0.5 else "🔴"
+
+            st.markdown(f"### {status} {site_name}")
+            st.metric("Power (MW)", f"{power:.2f}")
+            st.metric("SOC", f"{soc:.1f}%")
+            st.metric("Frequency", f"{freq:.2f} Hz")
+
+
 def main():
     latest_telemetry, power_trend, active_alarms, current_dispatch, sites = load_realtime_data()
 
@@ -174,39 +242,12 @@ def main():
     # Real-time power chart
     st.subheader("Real-time Power Output")
 
-    filtered_power = power_trend.copy()
-    if filters.get("site_id"):
-        filtered_power = filtered_power[filtered_power["site_id"] == filters["site_id"]]
-
-    if not filtered_power.empty:
-        fig = px.line(
-            filtered_power,
-            x="ts",
-            y="power_kw",
-            color="site_name",
-            title="Power Output (kW) - Last 2 Hours"
-        )
-        fig.add_hline(y=0, line_dash="dash", line_color="gray")
-        fig.update_layout(height=350)
-        st.plotly_chart(fig, use_container_width=True)
+    render_live_power(power_trend, filters.get("site_id"))
 
     # Site status cards
     st.subheader("Site Status Overview")
 
-    if not telemetry_pivot.empty:
-        cols = st.columns(len(telemetry_pivot))
-        for idx, (_, row) in enumerate(telemetry_pivot.iterrows()):
-            with cols[idx]:
-                site_name = row["site_name"]
-                power = row.get("p_kw", 0) / 1000
-                soc = row.get("soc_pct", 0)
-                freq = row.get("f_hz", 50)
-                status = "🟢" if row.get("controller_status", 0) > 0.5 else "🔴"
-
-                st.markdown(f"### {status} {site_name}")
-                st.metric("Power (MW)", f"{power:.2f}")
-                st.metric("SOC", f"{soc:.1f}%")
-                st.metric("Frequency", f"{freq:.2f} Hz")
+    render_site_status(latest_telemetry)
 
     # Current dispatch and alarms
     col1, col2 = st.columns(2)
@@ -279,7 +320,10 @@ def main():
             st.metric("Efficiency (%)", f"{efficiency:.1f}")
 
     # Auto-refresh hint
-    st.caption("💡 Data refreshes every 60 seconds. Use browser refresh for immediate update.")
+    st.caption(
+        f"💡 Power and site status update every {LIVE_REFRESH_SECONDS} seconds from ingested telemetry; "
+        "alarms and dispatch refresh every 60 seconds."
+    )
 
 
 if __name__ == "__main__":
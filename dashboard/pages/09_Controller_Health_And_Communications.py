@@ -31,7 +31,7 @@ DASHBOARD_KEY = "tmeic_controller_health"
 @st.cache_data(ttl=120)
 def load_comms_data():
     """Load communications health data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Comms latency trend
     latency_trend = conn.execute("""
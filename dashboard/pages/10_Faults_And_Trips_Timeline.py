@@ -31,7 +31,7 @@ DASHBOARD_KEY = "tmeic_faults_timeline"
 @st.cache_data(ttl=120)
 def load_faults_data():
     """Load fault and maintenance data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # All events
     events = conn.execute("""
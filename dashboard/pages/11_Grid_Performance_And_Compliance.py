@@ -32,7 +32,7 @@ DASHBOARD_KEY = "tmeic_grid_code"
 @st.cache_data(ttl=300)
 def load_grid_data():
     """Load grid code related telemetry."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Power data with ramp calculation
     power_data = conn.execute("""
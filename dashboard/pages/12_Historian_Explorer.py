@@ -17,7 +17,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from dashboard.components.branding import apply_enka_theme, render_sidebar_branding, render_footer, style_plotly_chart
 from dashboard.components.header import get_dashboard_config, render_header
+from db.downsample import downsample_query
 from db.loader import get_connection
+from db.partitions import partitioned_source
+from db.retention import telemetry_tier, tier_source
 
 st.set_page_config(initial_sidebar_state="expanded", page_title="Historian Explorer", page_icon="🔍", layout="wide")
 
@@ -28,11 +31,14 @@ render_sidebar_branding("12_Historian_Explorer")
 
 DASHBOARD_KEY = "tmeic_historian"
 
+# Points per tag drawn in the telemetry chart, whatever the selected range
+CHART_MAX_POINTS = 2000
+
 
 @st.cache_data(ttl=600)
 def load_tag_list():
     """Load available tags."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
     tags = conn.execute("""
         SELECT DISTINCT tag
         FROM fact_telemetry
@@ -45,17 +51,14 @@ def load_tag_list():
 @st.cache_data(ttl=600)
 def load_sites():
     """Load site list."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
     sites = conn.execute("SELECT site_id, name FROM dim_site").df()
     conn.close()
     return sites.to_dict(orient="records")
 
 
-@st.cache_data(ttl=60)
-def load_telemetry(site_id: str, tags: list, start_date, end_date, resolution: str):
-    """Load telemetry data for selected tags."""
-    conn = get_connection()
-
+def telemetry_query(conn, site_id: str, tags: list, start_date, end_date, resolution: str) -> str:
+    """Query for the selected tags at the chosen resolution, one row per bucket and tag."""
     tag_list = ", ".join([f"'{t}'" for t in tags])
 
     resolution_map = {
@@ -65,25 +68,78 @@ def load_telemetry(site_id: str, tags: list, start_date, end_date, resolution: s
         "1 hour": "DATE_TRUNC('hour', ts)",
     }
     time_bucket = resolution_map.get(resolution, "ts")
+    resolution_minutes = {"1 minute": 1, "5 minutes": 5, "15 minutes": 15, "1 hour": 60}.get(resolution, 1)
 
-    query = f"""
-        SELECT
-            {time_bucket} as ts,
-            tag,
+    # Pick the cheapest retention tier that still has this resolution and range
+    tier = telemetry_tier(conn, resolution_minutes, pd.Timestamp(start_date).to_pydatetime())
+    partition_filter = ""
+    if tier["table"] == "fact_telemetry":
+        aggregates = """
             AVG(value) as value,
             MIN(value) as min_value,
             MAX(value) as max_value,
             COUNT(*) as sample_count
-        FROM fact_telemetry
+        """
+        # Read only this site's day partitions when the hive layout is available
+        source = partitioned_source(conn, "fact_telemetry")
+        if source:
+            partition_filter = f"AND date >= CAST('{start_date}' AS DATE) AND date <= CAST('{end_date}' AS DATE)"
+        else:
+            source = "fact_telemetry"
+    else:
+        aggregates = """
+            SUM(avg_value * sample_count) / SUM(sample_count) as value,
+            MIN(min_value) as min_value,
+            MAX(max_value) as max_value,
+            SUM(sample_count) as sample_count
+        """
+        source = tier_source(tier)
+
+    query = f"""
+        SELECT
+            {time_bucket} as ts,
+            tag,
+            {aggregates}
+        FROM {source}
         WHERE site_id = '{site_id}'
         AND tag IN ({tag_list})
         AND ts >= '{start_date}'
         AND ts <= '{end_date}'
+        {partition_filter}
         GROUP BY {time_bucket}, tag
         ORDER BY ts
     """
+    return query
 
-    df = conn.execute(query).df()
+
+@st.cache_data(ttl=60)
+def load_telemetry(site_id: str, tags: list, start_date, end_date, resolution: str, max_points: int):
+    """Load telemetry for selected tags, min/max-downsampled to ``max_points`` per tag for charting."""
+    conn = get_connection(read_only=True)
+    query = telemetry_query(conn, site_id, tags, start_date, end_date, resolution)
+    df = conn.execute(downsample_query(query, max_points, ["value"], series_column="tag")).df()
+    conn.close()
+    return df
+
+
+@st.cache_data(ttl=60)
+def load_telemetry_stats(site_id: str, tags: list, start_date, end_date, resolution: str):
+    """Per-tag statistics over every point at the chosen resolution, aggregated in the database."""
+    conn = get_connection(read_only=True)
+    query = telemetry_query(conn, site_id, tags, start_date, end_date, resolution)
+    df = conn.execute(f"""
+        SELECT
+            tag,
+            ROUND(AVG(value), 3) as "Mean",
+            ROUND(MIN(value), 3) as "Min",
+            ROUND(MAX(value), 3) as "Max",
+            ROUND(STDDEV_SAMP(value), 3) as "Std Dev",
+            CAST(SUM(sample_count) AS BIGINT) as "Samples",
+            COUNT(*) as points
+        FROM ({query})
+        GROUP BY tag
+        ORDER BY tag
+    """).df()
     conn.close()
     return df
 
@@ -91,7 +147,7 @@ def load_telemetry(site_id: str, tags: list, start_date, end_date, resolution: s
 @st.cache_data(ttl=60)
 def load_events(site_id: str, start_date, end_date):
     """Load events for timeline overlay."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     df = conn.execute(f"""
         SELECT
@@ -207,25 +263,35 @@ def main():
 
     # Load and display data
     if selected_tags and selected_site:
-        telemetry = load_telemetry(
+        # Only the downsampled points and per-tag aggregates leave the
+        # database, so the page costs the same whatever the range
+        stats = load_telemetry_stats(selected_site, selected_tags, start_date, end_date, resolution)
+        chart_data = load_telemetry(
             selected_site,
             selected_tags,
             start_date,
             end_date,
-            resolution
+            resolution,
+            max_points=CHART_MAX_POINTS,
         )
+        total_points = int(stats["points"].sum())
 
         events = load_events(selected_site, start_date, end_date)
 
-        if not telemetry.empty:
+        if not chart_data.empty:
             st.subheader("Telemetry Chart")
+            if len(chart_data) < total_points:
+                st.caption(
+                    f"Showing {len(chart_data):,} of {total_points:,} points "
+                    "(min/max downsampled per tag; extremes preserved)"
+                )
 
             # Create multi-axis chart
             fig = go.Figure()
 
             colors = px.colors.qualitative.Set1
             for idx, tag in enumerate(selected_tags):
-                tag_data = telemetry[telemetry["tag"] == tag]
+                tag_data = chart_data[chart_data["tag"] == tag]
                 if not tag_data.empty:
                     fig.add_trace(go.Scatter(
                         x=tag_data["ts"],
@@ -261,38 +327,30 @@ def main():
             # Statistics table
             st.subheader("Statistics")
 
-            stats = telemetry.groupby("tag").agg({
-                "value": ["mean", "min", "max", "std"],
-                "sample_count": "sum"
-            }).round(3)
-
-            stats.columns = ["Mean", "Min", "Max", "Std Dev", "Samples"]
-            stats = stats.reset_index()
-
-            st.dataframe(stats, use_container_width=True)
+            st.dataframe(stats.drop(columns="points"), use_container_width=True)
 
             # Data table
-            st.subheader("Raw Data")
+            st.subheader("Chart Data")
 
             # Pivot for display
             if len(selected_tags) > 1:
-                pivot = telemetry.pivot(index="ts", columns="tag", values="value").reset_index()
+                pivot = chart_data.pivot(index="ts", columns="tag", values="value").reset_index()
                 display_df = pivot.head(500)
             else:
-                display_df = telemetry[["ts", "value", "min_value", "max_value"]].head(500)
+                display_df = chart_data[["ts", "value", "min_value", "max_value"]].head(500)
 
             st.dataframe(display_df, use_container_width=True, height=300)
 
             # Export button
             st.download_button(
-                label="Download Data (CSV)",
-                data=telemetry.to_csv(index=False),
+                label="Download Chart Data (CSV)",
+                data=chart_data.to_csv(index=False),
                 file_name=f"telemetry_{selected_site}_{start_date}_{end_date}.csv",
                 mime="text/csv"
             )
 
             # Update KPI
-            st.sidebar.metric("Data Points Loaded", f"{len(telemetry):,}")
+            st.sidebar.metric("Data Points", f"{total_points:,}")
 
         else:
             st.warning("No data found for selected parameters")
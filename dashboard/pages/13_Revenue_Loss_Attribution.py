@@ -32,9 +32,9 @@ DASHBOARD_KEY = "combined_revenue_loss"
 @st.cache_data(ttl=300)
 def load_revenue_data():
     """Load revenue loss attribution data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
-    # Revenue vs forecast with attribution
+    # Revenue vs forecast with the gap allocated across causes
     loss_data = conn.execute("""
         SELECT
             date,
@@ -45,8 +45,13 @@ def load_revenue_data():
             revenue_gap,
             fault_minutes,
             trip_minutes,
-            data_completeness
-        FROM v_revenue_loss_attribution
+            data_completeness,
+            loss_faults_gbp,
+            loss_trips_gbp,
+            loss_data_gaps_gbp,
+            loss_market_gbp,
+            loss_category
+        FROM v_revenue_loss_allocation
         ORDER BY date DESC
     """).df()
 
@@ -83,32 +88,26 @@ def load_revenue_data():
     return loss_data, daily_summary, event_losses, sites
 
 
-def categorize_loss(row):
-    """Categorize loss by root cause."""
-    if row["fault_minutes"] + row["trip_minutes"] > 60:
-        return "Faults/Trips"
-    elif row["data_completeness"] < 95:
-        return "Data Gaps"
-    elif row["revenue_gap"] > row["forecast_revenue"] * 0.1:
-        return "Market Conditions"
-    else:
-        return "Other"
+# Allocation columns of v_revenue_loss_allocation and their chart labels
+LOSS_ALLOCATIONS = {
+    "loss_faults_gbp": "Faults/Trips",
+    "loss_trips_gbp": "Faults/Trips",
+    "loss_data_gaps_gbp": "Data Gaps",
+    "loss_market_gbp": "Market Conditions",
+}
 
 
 def main():
     loss_data, daily_summary, event_losses, sites = load_revenue_data()
 
-    # Add loss category
-    loss_data["loss_category"] = loss_data.apply(categorize_loss, axis=1)
-
     # Calculate KPIs
     # MTD losses
     if not loss_data.empty:
         mtd_data = loss_data[loss_data["date"] >= loss_data["date"].max().replace(day=1)]
         total_loss = mtd_data["revenue_gap"].sum()
-        loss_from_faults = mtd_data[mtd_data["loss_category"] == "Faults/Trips"]["revenue_gap"].sum()
-        loss_from_curtailment = mtd_data[mtd_data["loss_category"] == "Market Conditions"]["revenue_gap"].sum()
-        loss_from_gaps = mtd_data[mtd_data["loss_category"] == "Data Gaps"]["revenue_gap"].sum()
+        loss_from_faults = mtd_data["loss_faults_gbp"].sum() + mtd_data["loss_trips_gbp"].sum()
+        loss_from_curtailment = mtd_data["loss_market_gbp"].sum()
+        loss_from_gaps = mtd_data["loss_data_gaps_gbp"].sum()
 
         recovery_rate = (mtd_data["actual_revenue"].sum() / mtd_data["forecast_revenue"].sum()) * 100 if mtd_data["forecast_revenue"].sum() > 0 else 100
         top_loss_site = mtd_data.groupby("site_name")["revenue_gap"].sum().idxmax() if not mtd_data.empty else "N/A"
@@ -120,8 +119,9 @@ def main():
         recovery_rate = 100
         top_loss_site = "N/A"
 
-    # Loss from dispatch issues (separate from faults)
-    loss_from_dispatch = mtd_data[mtd_data["loss_category"] == "Market Conditions"]["revenue_gap"].sum() if not loss_data.empty else 0
+    # Loss from dispatch issues (separate from faults): the allocation view has
+    # no dispatch cause, so this is its market-conditions share (loss_market_gbp)
+    loss_from_dispatch = loss_from_curtailment
 
     # Loss from comms (data gaps)
     loss_from_comms = loss_from_gaps
@@ -207,7 +207,11 @@ def main():
     with col1:
         st.subheader("Loss Attribution (MTD)")
         if not filtered.empty:
-            category_totals = filtered.groupby("loss_category")["revenue_gap"].sum().reset_index()
+            category_totals = (
+                filtered[list(LOSS_ALLOCATIONS)].sum()
+                .groupby(LOSS_ALLOCATIONS).sum()
+                .rename_axis("loss_category").reset_index(name="revenue_gap")
+            )
             category_totals = category_totals[category_totals["revenue_gap"] > 0]
 
             if not category_totals.empty:
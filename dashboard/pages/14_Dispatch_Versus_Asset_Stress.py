@@ -32,7 +32,7 @@ DASHBOARD_KEY = "combined_dispatch_stress"
 @st.cache_data(ttl=300)
 def load_stress_data():
     """Load dispatch and stress correlation data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Daily dispatch intensity
     dispatch_intensity = conn.execute("""
@@ -31,7 +31,7 @@ DASHBOARD_KEY = "combined_sla_warranty"
 @st.cache_data(ttl=300)
 def load_sla_data():
     """Load SLA and warranty data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # SLA compliance
     sla_compliance = conn.execute("""
@@ -31,7 +31,7 @@ DASHBOARD_KEY = "combined_vendor_benchmarking"
 @st.cache_data(ttl=300)
 def load_vendor_data():
     """Load vendor comparison data."""
-    conn = get_connection()
+    conn = get_connection(read_only=True)
 
     # Site info with vendor
     sites = conn.execute("""
@@ -26,7 +26,7 @@ from dashboard.components.branding import (
     ENKA_GREEN,
 )
 from dashboard.components.header import render_header, render_filter_bar
-from db.loader import get_connection, load_data
+from db.loader import get_connection
 
 st.set_page_config(initial_sidebar_state="expanded", 
     page_title="Signal Fidelity And SCADA Replacement",
@@ -41,8 +41,7 @@ render_sidebar_branding("17_Signal_Fidelity_And_SCADA_Replacement")
 @st.cache_data(ttl=300)
 def load_sites():
     """Load site data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     sites = conn.execute("SELECT site_id, name FROM dim_site").df()
     conn.close()
     return sites.to_dict("records")
@@ -51,8 +50,7 @@ def load_sites():
 @st.cache_data(ttl=300)
 def load_corrected_signals(site_id: str = None, hours: int = 24):
     """Load corrected signals data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
 
     query = """
         SELECT
@@ -75,8 +73,7 @@ def load_corrected_signals(site_id: str = None, hours: int = 24):
 @st.cache_data(ttl=300)
 def load_latest_signals():
     """Load latest corrected signals per site."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("SELECT * FROM v_latest_corrected_signals").df()
     conn.close()
     return df
@@ -85,8 +82,7 @@ def load_latest_signals():
 @st.cache_data(ttl=300)
 def load_signal_health():
     """Load signal health summary."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("SELECT * FROM v_site_signal_health").df()
     conn.close()
     return df
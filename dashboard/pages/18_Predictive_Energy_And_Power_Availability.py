@@ -26,7 +26,7 @@ from dashboard.components.branding import (
     ENKA_GREEN,
 )
 from dashboard.components.header import render_header, render_filter_bar
-from db.loader import get_connection, load_data
+from db.loader import get_connection
 
 st.set_page_config(initial_sidebar_state="expanded", 
     page_title="Predictive Energy And Power Availability",
@@ -41,8 +41,7 @@ render_sidebar_branding("18_Predictive_Energy_And_Power_Availability")
 @st.cache_data(ttl=300)
 def load_sites():
     """Load site data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     sites = conn.execute("SELECT site_id, name, bess_mwh FROM dim_site").df()
     conn.close()
     return sites.to_dict("records")
@@ -51,8 +50,7 @@ def load_sites():
 @st.cache_data(ttl=300)
 def load_forecasts(site_id: str = None, hours: int = 24):
     """Load forecast data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
 
     query = """
         SELECT
@@ -75,8 +73,7 @@ def load_forecasts(site_id: str = None, hours: int = 24):
 @st.cache_data(ttl=300)
 def load_forecast_summary():
     """Load latest forecast summary."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("SELECT * FROM v_forecast_summary").df()
     conn.close()
     return df
@@ -85,8 +82,7 @@ def load_forecast_summary():
 @st.cache_data(ttl=300)
 def load_constraints(site_id: str = None):
     """Load active constraints."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
 
     query = "SELECT * FROM v_active_constraints"
     if site_id:
@@ -183,7 +179,8 @@ def main():
                     },
                 ))
                 fig.update_layout(height=200, margin=dict(t=50, b=0, l=20, r=20))
-                st.plotly_chart(fig, use_container_width=True)
+                # Sites with the same reading draw identical gauges, so key them by site
+                st.plotly_chart(fig, use_container_width=True, key=f"tte_{row['site_id']}")
 
                 st.metric("Available Energy", f"{row['available_energy_mwh']:.1f} MWh")
                 st.metric("Confidence", f"{row['confidence_pct']:.0f}%")
@@ -26,7 +26,7 @@ from dashboard.components.branding import (
     ENKA_GREEN,
 )
 from dashboard.components.header import render_header, render_filter_bar
-from db.loader import get_connection, load_data
+from db.loader import get_connection
 
 st.set_page_config(initial_sidebar_state="expanded", 
     page_title="Balancing And Imbalance Optimization",
@@ -41,8 +41,7 @@ render_sidebar_branding("19_Balancing_And_Imbalance_Optimization")
 @st.cache_data(ttl=300)
 def load_sites():
     """Load site data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     sites = conn.execute("SELECT site_id, name FROM dim_site").df()
     conn.close()
     return sites.to_dict("records")
@@ -51,8 +50,7 @@ def load_sites():
 @st.cache_data(ttl=300)
 def load_imbalance_data(site_id: str = None, hours: int = 24):
     """Load imbalance detection data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
 
     query = """
         SELECT
@@ -74,8 +72,7 @@ def load_imbalance_data(site_id: str = None, hours: int = 24):
 @st.cache_data(ttl=300)
 def load_imbalance_summary():
     """Load imbalance summary by rack."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("SELECT * FROM v_imbalance_summary").df()
     conn.close()
     return df
@@ -84,8 +81,7 @@ def load_imbalance_summary():
 @st.cache_data(ttl=300)
 def load_balancing_actions(site_id: str = None):
     """Load balancing actions."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
 
     query = """
         SELECT
@@ -113,8 +109,7 @@ def load_balancing_actions(site_id: str = None):
 @st.cache_data(ttl=300)
 def load_pending_actions():
     """Load pending balancing actions."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("SELECT * FROM v_pending_balancing_actions").df()
     conn.close()
     return df
@@ -26,7 +26,7 @@ from dashboard.components.branding import (
     ENKA_GREEN,
 )
 from dashboard.components.header import render_header, render_filter_bar
-from db.loader import get_connection, load_data
+from db.loader import get_connection
 
 st.set_page_config(initial_sidebar_state="expanded", 
     page_title="Insights Report And Recommendations",
@@ -41,8 +41,7 @@ render_sidebar_branding("20_Insights_Report_And_Recommendations")
 @st.cache_data(ttl=300)
 def load_sites():
     """Load site data."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     sites = conn.execute("SELECT site_id, name FROM dim_site").df()
     conn.close()
     return sites.to_dict("records")
@@ -51,8 +50,7 @@ def load_sites():
 @st.cache_data(ttl=300)
 def load_insights(site_id: str = None, category: str = None, severity: str = None):
     """Load insights findings."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
 
     query = """
         SELECT
@@ -100,8 +98,7 @@ def load_insights(site_id: str = None, category: str = None, severity: str = Non
 @st.cache_data(ttl=300)
 def load_insights_summary():
     """Load insights summary by category and severity."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("""
         SELECT
             site_id,
@@ -118,8 +115,7 @@ def load_insights_summary():
 @st.cache_data(ttl=300)
 def load_active_insights():
     """Load active (unresolved) insights."""
-    conn = get_connection()
-    load_data(conn)
+    conn = get_connection(read_only=True)
     df = conn.execute("""
         SELECT
             f.*,
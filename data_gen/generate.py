@@ -7,6 +7,7 @@ Generates realistic BESS telemetry, events, and financial data for demo purposes
 - Realistic patterns: daily price cycles, faults, comms drops, degradation
 """
 
+import argparse
 import json
 import os
 import random
@@ -18,6 +19,8 @@ import numpy as np
 import pandas as pd
 from loguru import logger
 
+from db.partitions import clear_table_files, write_table_batch
+
 # Configuration
 NUM_DAYS = 30
 MINUTES_PER_DAY = 1440
@@ -26,7 +29,6 @@ VENDORS = ["TMEIC", "OtherPCS"]
 DATA_DIR = Path(__file__).parent.parent / "data"
 BRONZE_DIR = DATA_DIR / "bronze"
 SILVER_DIR = DATA_DIR / "silver"
-GOLD_DIR = DATA_DIR / "gold"
 
 # Seed for reproducibility
 np.random.seed(42)
@@ -776,105 +778,6 @@ def generate_bronze_layer(telemetry_df: pd.DataFrame, events_df: pd.DataFrame, s
     logger.info(f"Bronze layer generated in {BRONZE_DIR}")
 
 
-def generate_gold_layer(sites_df: pd.DataFrame, telemetry_df: pd.DataFrame,
-                        settlement_df: pd.DataFrame, events_df: pd.DataFrame):
-    """
-    Generate Gold layer rollup/aggregate tables.
-    """
-    GOLD_DIR.mkdir(parents=True, exist_ok=True)
-
-    logger.info("Generating Gold layer (aggregates and rollups)...")
-
-    # 1. agg_telemetry_15min - 15-minute aggregates
-    telemetry_15min = telemetry_df.copy()
-    telemetry_15min["ts_15min"] = telemetry_15min["ts"].dt.floor("15min")
-
-    agg_telemetry_15min = telemetry_15min.groupby(
-        ["ts_15min", "site_id", "tag"]
-    ).agg({
-        "value": ["mean", "min", "max", "std", "count"]
-    }).reset_index()
-    agg_telemetry_15min.columns = ["ts_15min", "site_id", "tag", "avg_value", "min_value", "max_value", "std_value", "sample_count"]
-    agg_telemetry_15min.to_parquet(GOLD_DIR / "agg_telemetry_15min.parquet", index=False)
-
-    # 2. agg_site_daily - Daily site rollups
-    telemetry_daily = telemetry_df.copy()
-    telemetry_daily["date"] = telemetry_daily["ts"].dt.date
-
-    # Calculate daily metrics per site
-    daily_metrics = []
-    for site_id in sites_df["site_id"].unique():
-        site_data = telemetry_daily[telemetry_daily["site_id"] == site_id]
-        site_info = sites_df[sites_df["site_id"] == site_id].iloc[0]
-
-        for date, day_data in site_data.groupby("date"):
-            # Get tag values
-            soc_data = day_data[day_data["tag"] == "soc_pct"]["value"]
-            soh_data = day_data[day_data["tag"] == "soh_pct"]["value"]
-            power_data = day_data[day_data["tag"] == "p_kw"]["value"]
-            temp_data = day_data[day_data["tag"] == "temp_c_max"]["value"]
-
-            # Calculate metrics
-            dod = soc_data.max() - soc_data.min() if len(soc_data) > 0 else 0
-            avg_soh = soh_data.mean() if len(soh_data) > 0 else None
-            max_temp = temp_data.max() if len(temp_data) > 0 else None
-            energy_charged = (power_data[power_data < 0].abs().sum() / 60) / 1000 if len(power_data) > 0 else 0  # MWh
-            energy_discharged = (power_data[power_data > 0].sum() / 60) / 1000 if len(power_data) > 0 else 0  # MWh
-
-            daily_metrics.append({
-                "date": date,
-                "site_id": site_id,
-                "dod_pct": dod,
-                "avg_soh_pct": avg_soh,
-                "max_temp_c": max_temp,
-                "energy_charged_mwh": energy_charged,
-                "energy_discharged_mwh": energy_discharged,
-                "cycles_equivalent": (energy_charged + energy_discharged) / (2 * site_info["bess_mwh"]) if site_info["bess_mwh"] > 0 else 0
-            })
-
-    agg_site_daily = pd.DataFrame(daily_metrics)
-    agg_site_daily.to_parquet(GOLD_DIR / "agg_site_daily.parquet", index=False)
-
-    # 3. agg_revenue_daily - Daily revenue by site and service
-    agg_revenue_daily = settlement_df.groupby(["date", "site_id", "service_id"]).agg({
-        "revenue_gbp": "sum",
-        "energy_mwh": "sum"
-    }).reset_index()
-    agg_revenue_daily["revenue_per_mwh"] = agg_revenue_daily["revenue_gbp"] / agg_revenue_daily["energy_mwh"].replace(0, np.nan)
-    agg_revenue_daily.to_parquet(GOLD_DIR / "agg_revenue_daily.parquet", index=False)
-
-    # 4. agg_events_daily - Daily event counts by site and type
-    events_daily = events_df.copy()
-    events_daily["date"] = pd.to_datetime(events_daily["start_ts"]).dt.date
-
-    agg_events_daily = events_daily.groupby(["date", "site_id", "event_type", "severity"]).agg({
-        "event_id": "count"
-    }).reset_index()
-    agg_events_daily.columns = ["date", "site_id", "event_type", "severity", "event_count"]
-    agg_events_daily.to_parquet(GOLD_DIR / "agg_events_daily.parquet", index=False)
-
-    # 5. agg_site_monthly - Monthly aggregates
-    agg_site_monthly = agg_site_daily.copy()
-    agg_site_monthly["month"] = pd.to_datetime(agg_site_monthly["date"]).dt.to_period("M")
-
-    agg_site_monthly = agg_site_monthly.groupby(["month", "site_id"]).agg({
-        "dod_pct": "mean",
-        "avg_soh_pct": "mean",
-        "max_temp_c": "max",
-        "energy_charged_mwh": "sum",
-        "energy_discharged_mwh": "sum",
-        "cycles_equivalent": "sum"
-    }).reset_index()
-    agg_site_monthly["month"] = agg_site_monthly["month"].astype(str)
-    agg_site_monthly.to_parquet(GOLD_DIR / "agg_site_monthly.parquet", index=False)
-
-    logger.info(f"Gold layer generated in {GOLD_DIR}")
-    logger.info(f"  - agg_telemetry_15min: {len(agg_telemetry_15min):,} records")
-    logger.info(f"  - agg_site_daily: {len(agg_site_daily):,} records")
-    logger.info(f"  - agg_revenue_daily: {len(agg_revenue_daily):,} records")
-    logger.info(f"  - agg_events_daily: {len(agg_events_daily):,} records")
-
-
 # ============== Edge Intelligence Data Generation ==============
 
 def generate_fact_corrected_signals(
@@ -1308,15 +1211,19 @@ def generate_fact_insights_findings(
     return pd.DataFrame(records)
 
 
-def main():
-    """Main data generation function."""
+def main(partitioned_telemetry: bool = False):
+    """
+    Main data generation function.
+
+    With ``partitioned_telemetry`` the telemetry fact is written hive-partitioned
+    by site and day instead of as a single Parquet file.
+    """
     logger.info("Starting BESS Analytics data generation...")
 
     # Create data directories (Medallion architecture)
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     BRONZE_DIR.mkdir(parents=True, exist_ok=True)
     SILVER_DIR.mkdir(parents=True, exist_ok=True)
-    GOLD_DIR.mkdir(parents=True, exist_ok=True)
 
     # Set start date (30 days ago from "now")
     end_date = datetime(2024, 3, 15)  # Fixed date for reproducibility
@@ -1342,7 +1249,12 @@ def main():
 
     # Generate fact tables
     telemetry_df = generate_fact_telemetry(sites_df, assets_df, start_date, NUM_DAYS)
-    telemetry_df.to_parquet(DATA_DIR / "fact_telemetry.parquet", index=False)
+    if partitioned_telemetry:
+        # Hive layout: data/fact_telemetry/site_id=.../date=.../*.parquet
+        write_table_batch(telemetry_df, "fact_telemetry", DATA_DIR, replace=True)
+    else:
+        clear_table_files("fact_telemetry", DATA_DIR)
+        telemetry_df.to_parquet(DATA_DIR / "fact_telemetry.parquet", index=False)
     logger.info(f"Telemetry: {len(telemetry_df):,} records")
 
     dispatch_df = generate_fact_dispatch(sites_df, services_df, start_date, NUM_DAYS)
@@ -1411,9 +1323,7 @@ def main():
     # Generate Bronze layer (raw streaming simulation)
     generate_bronze_layer(telemetry_df, events_df, sites_df)
 
-    # Generate Gold layer (aggregates and rollups)
-    generate_gold_layer(sites_df, telemetry_df, settlement_df, events_df)
-
+    # The Gold layer (aggregates and rollups) is computed by the loader, see db/gold.py
     logger.info("Data generation complete!")
     logger.info(f"Files saved to: {DATA_DIR}")
 
@@ -1437,8 +1347,14 @@ def main():
     print(f"  - Forecasts: {len(forecasts_df):,}")
     print(f"  - Insights: {len(insights_df):,}")
     print(f"\nBronze Layer: {BRONZE_DIR}")
-    print(f"Gold Layer: {GOLD_DIR}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate synthetic BESS Analytics data")
+    parser.add_argument(
+        "--partitioned-telemetry",
+        action="store_true",
+        help="Write fact_telemetry partitioned by site_id and date",
+    )
+    args = parser.parse_args()
+    main(partitioned_telemetry=args.partitioned_telemetry)
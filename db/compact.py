@@ -0,0 +1,246 @@
+"""
+BESS Analytics - Parquet Compaction
+
+Micro-batch ingest and repeated generator runs leave many small Parquet files
+under ``data/``. This maintenance command rewrites each table's files into
+one file per table (or per hive partition), sorted by the table's cluster
+keys, with a target row-group size and zstd compression. Column statistics
+are written as usual, so zone maps and partition pruning keep working.
+
+Run with ``python -m db.compact``; it prints file counts, bytes and scan
+times for the standard query set before and after compacting. Views that
+list Parquet files (external tables, partitioned views) are then re-pointed
+at the new files, in a newly published snapshot when snapshots are in use.
+"""
+
+import argparse
+import os
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+import duckdb
+from loguru import logger
+
+from db.partitions import PARTITION_COLUMNS, is_partition_file
+from db.pruning import STANDARD_QUERIES
+from db.snapshot import publish_file_views
+
+DEFAULT_ROW_GROUP_SIZE = 122880
+COMPRESSION = "zstd"
+
+
+def _data_dir() -> Path:
+    from db import loader
+
+    return loader.DATA_DIR
+
+
+def compactable_tables() -> list[str]:
+    """Tables with Parquet files under the data directory."""
+    data_dir = _data_dir()
+    tables = {p.stem for p in data_dir.glob("*.parquet")}
+    tables |= {t for t in PARTITION_COLUMNS if (data_dir / t).is_dir()}
+    return sorted(tables)
+
+
+def _file_columns(conn: duckdb.DuckDBPyConnection, files: list[Path]) -> list[str]:
+    file_list = ", ".join(f"'{f}'" for f in files)
+    return [
+        row[0] for row in conn.execute(
+            f"DESCRIBE SELECT * FROM read_parquet([{file_list}], hive_partitioning = false, union_by_name = true)"
+        ).fetchall()
+    ]
+
+
+def _rewrite(
+    conn: duckdb.DuckDBPyConnection,
+    table: str,
+    files: list[Path],
+    target: Path,
+    row_group_size: int,
+):
+    """Rewrite ``files`` into ``target`` sorted by cluster keys, then drop the originals."""
+    from db.loader import CLUSTER_KEYS
+
+    columns = _file_columns(conn, files)
+    keys = [k for k in CLUSTER_KEYS.get(table, []) if k in columns]
+    order_by = "ORDER BY " + ", ".join(keys) if keys else ""
+    file_list = ", ".join(f"'{f}'" for f in files)
+
+    # Written under a non-Parquet name first, so loaders never see a partial file
+    staging = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    conn.execute(f"""
+        COPY (
+            SELECT * FROM read_parquet([{file_list}], hive_partitioning = false, union_by_name = true)
+            {order_by}
+        ) TO '{staging}' (FORMAT parquet, COMPRESSION {COMPRESSION}, ROW_GROUP_SIZE {int(row_group_size)})
+    """)
+    os.replace(staging, target)
+    for f in files:
+        if f != target:
+            f.unlink()
+
+
+def compact_table(
+    conn: duckdb.DuckDBPyConnection,
+    table: str,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    min_files: int = 2,
+) -> int:
+    """
+    Compact one table's files; returns the number of files rewritten.
+
+    Plain and micro-batch files are merged into ``data/<table>.parquet``.
+    Hive-partitioned files are merged per partition directory, keeping the
+    partition values in the path only. Groups with fewer than ``min_files``
+    files are left alone (``min_files=1`` also re-sorts and re-compresses
+    single files).
+    """
+    from db.loader import source_files
+
+    files = source_files(table)
+    groups = defaultdict(list)
+    for f in files:
+        if is_partition_file(f):
+            groups[f.parent].append(f)
+        else:
+            groups[None].append(f)
+
+    rewritten = 0
+    for directory, group in groups.items():
+        if len(group) < min_files:
+            continue
+        if directory is None:
+            target = _data_dir() / f"{table}.parquet"
+        else:
+            target = directory / f"part-{uuid.uuid4().hex}.parquet"
+        _rewrite(conn, table, group, target, row_group_size)
+        rewritten += len(group)
+
+    if rewritten:
+        logger.info(f"  Compacted {table}: {rewritten} files")
+    return rewritten
+
+
+def _file_summary(tables: Iterable[str]) -> dict[str, tuple[int, int]]:
+    """File count and total bytes per table."""
+    from db.loader import source_files
+
+    summary = {}
+    for table in tables:
+        files = source_files(table)
+        summary[table] = (len(files), sum(f.stat().st_size for f in files))
+    return summary
+
+
+def _scan_times(conn: duckdb.DuckDBPyConnection, repeat: int = 3) -> dict[str, float]:
+    """Best-of-``repeat`` seconds to run each standard query over the Parquet files."""
+    from db.loader import WATERMARK_COLUMNS, _parquet_source, source_files
+
+    times = {}
+    for query in STANDARD_QUERIES:
+        table = query["table"]
+        files = source_files(table)
+        if not files or table not in WATERMARK_COLUMNS:
+            continue
+
+        source = _parquet_source(files)
+        latest = conn.execute(f"SELECT MAX(ts) FROM {source}").fetchone()[0]
+        sql = f"SELECT COUNT(*) FROM {source} WHERE ts >= ?"
+        params = [latest - query["window"]]
+        for column in ("site_id", "tag"):
+            if column in query:
+                sql += f" AND {column} = ?"
+                params.append(query[column])
+
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        times[query["name"]] = best
+    return times
+
+
+def compact(
+    tables: Optional[Iterable[str]] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    min_files: int = 2,
+) -> dict:
+    """
+    Compact the given tables (default: all) and report the effect.
+
+    Returns ``{"tables": [...], "scans": [...], "external_views": [...]}`` with
+    per-table file counts and bytes and per-query scan seconds, each before
+    and after, and the external tables whose views were re-pointed at the
+    compacted files.
+    """
+    tables = list(tables) if tables else compactable_tables()
+    conn = duckdb.connect()
+
+    files_before = _file_summary(tables)
+    scans_before = _scan_times(conn)
+
+    logger.info("Compacting Parquet files...")
+    rewritten = 0
+    for table in tables:
+        rewritten += compact_table(conn, table, row_group_size=row_group_size, min_files=min_files)
+
+    # External and partitioned views list the files that were just replaced
+    external_views = publish_file_views() if rewritten else []
+
+    files_after = _file_summary(tables)
+    scans_after = _scan_times(conn)
+    conn.close()
+
+    return {
+        "tables": [
+            {
+                "table": table,
+                "files_before": files_before[table][0],
+                "files_after": files_after[table][0],
+                "bytes_before": files_before[table][1],
+                "bytes_after": files_after[table][1],
+            }
+            for table in tables
+        ],
+        "scans": [
+            {"query": name, "seconds_before": seconds, "seconds_after": scans_after.get(name)}
+            for name, seconds in scans_before.items()
+        ],
+        "external_views": external_views,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact BESS Analytics Parquet files")
+    parser.add_argument("--table", action="append", help="Table to compact (repeatable; default: all)")
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=DEFAULT_ROW_GROUP_SIZE,
+        help="Rows per row group in the rewritten files",
+    )
+    parser.add_argument(
+        "--min-files",
+        type=int,
+        default=2,
+        help="Only compact groups with at least this many files (1 also rewrites single files)",
+    )
+    args = parser.parse_args()
+    report = compact(args.table, row_group_size=args.row_group_size, min_files=args.min_files)
+
+    print(f"{'Table':<28} {'Files':>13} {'Bytes':>25}")
+    for row in report["tables"]:
+        files = f"{row['files_before']} -> {row['files_after']}"
+        size = f"{row['bytes_before']:,} -> {row['bytes_after']:,}"
+        print(f"{row['table']:<28} {files:>13} {size:>25}")
+    print(f"\n{'Query':<45} {'Before (ms)':>12} {'After (ms)':>12}")
+    for row in report["scans"]:
+        print(f"{row['query']:<45} {row['seconds_before'] * 1000:>12.1f} {row['seconds_after'] * 1000:>12.1f}")
+    if report["external_views"]:
+        print(f"\nRe-pointed external views: {', '.join(report['external_views'])}")
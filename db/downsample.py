@@ -0,0 +1,84 @@
+"""
+BESS Analytics - Time-Series Downsampling
+
+A chart a few thousand pixels wide cannot show more than a few thousand
+points per series, however long the selected range. ``downsample_query``
+wraps a time-series query so DuckDB returns a bounded number of rows per
+series, using per-pixel min/max selection: the range of each series is cut
+into equal time buckets and, per bucket, the rows holding the minimum and
+maximum of every value column are kept, together with the first and last
+row. Spikes and dips therefore survive downsampling, unlike with averaging.
+"""
+
+from typing import Optional
+
+# Smallest max_points that leaves room for one bucket plus the end points
+MIN_POINTS = 4
+
+_HELPER_COLUMNS = ["_offset", "_span", "_n", "_rn", "_bucket"]
+
+
+def bucket_count(max_points: int, value_columns: int) -> int:
+    """Buckets per series so that at most ``max_points`` rows are kept."""
+    return max(1, (max_points - 2) // (2 * value_columns))
+
+
+def downsample_query(
+    query: str,
+    max_points: int,
+    value_columns: list[str],
+    series_column: Optional[str] = None,
+    ts_column: str = "ts",
+) -> str:
+    """
+    Wrap ``query`` to return at most ``max_points`` rows per series.
+
+    ``series_column`` splits long-format results (e.g. one series per
+    ``tag``); leave it None for wide results, whose value columns are kept
+    together so every returned row stays complete. Series that already fit
+    are returned unchanged.
+    """
+    buckets = bucket_count(max(max_points, MIN_POINTS), len(value_columns))
+    series = f"PARTITION BY {series_column}" if series_column else ""
+    per_bucket = f"PARTITION BY {series_column + ', ' if series_column else ''}_bucket"
+
+    ranks, keep = [], []
+    for i, column in enumerate(value_columns):
+        ranks.append(
+            f"row_number() OVER ({per_bucket} ORDER BY {column} ASC NULLS LAST, {ts_column}) as _lo_{i}"
+        )
+        ranks.append(
+            f"row_number() OVER ({per_bucket} ORDER BY {column} DESC NULLS LAST, {ts_column}) as _hi_{i}"
+        )
+        keep.append(f"_lo_{i} = 1 OR _hi_{i} = 1")
+    helpers = _HELPER_COLUMNS + [f"_{side}_{i}" for i in range(len(value_columns)) for side in ("lo", "hi")]
+    order_by = f"{ts_column}, {series_column}" if series_column else ts_column
+
+    return f"""
+        WITH _source AS (
+            {query}
+        ),
+        _framed AS (
+            SELECT
+                *,
+                epoch({ts_column}) - MIN(epoch({ts_column})) OVER ({series}) as _offset,
+                MAX(epoch({ts_column})) OVER ({series}) - MIN(epoch({ts_column})) OVER ({series}) as _span,
+                COUNT(*) OVER ({series}) as _n,
+                row_number() OVER ({series} ORDER BY {ts_column}) as _rn
+            FROM _source
+        ),
+        _bucketed AS (
+            SELECT
+                *,
+                LEAST(CAST(FLOOR(_offset * {buckets} / NULLIF(_span, 0)) AS BIGINT), {buckets - 1}) as _bucket
+            FROM _framed
+        ),
+        _ranked AS (
+            SELECT *, {", ".join(ranks)}
+            FROM _bucketed
+        )
+        SELECT * EXCLUDE ({", ".join(helpers)})
+        FROM _ranked
+        WHERE _n <= {int(max_points)} OR _rn = 1 OR _rn = _n OR {" OR ".join(keep)}
+        ORDER BY {order_by}
+    """
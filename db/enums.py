@@ -0,0 +1,154 @@
+"""
+BESS Analytics - Dictionary-Typed Identifier Columns
+
+``site_id``, ``asset_id`` and ``tag`` repeat a handful of distinct strings on
+every fact row. The loader stores them as DuckDB ENUMs, which keeps one
+small integer per row and makes ``GROUP BY site_id, tag`` and
+``WHERE tag IN (...)`` compare integers instead of strings.
+
+Enum types are seeded from ``dim_site``, ``dim_asset`` and the tag registry
+and only ever grow: values found in newly loaded files are appended before
+the files are loaded, and the stored enum columns that will receive them are
+widened to the new type. Each batch of new values is sorted, so ``ORDER BY``
+on an enum column matches string order within the values seeded together;
+later additions sort after them.
+"""
+
+from typing import Optional
+
+import duckdb
+from loguru import logger
+
+from db.telemetry import TELEMETRY_TAGS
+
+# Identifier column -> enum type name
+ENUM_TYPES = {
+    "site_id": "site_id_enum",
+    "asset_id": "asset_id_enum",
+    "tag": "tag_enum",
+}
+
+# Where each enum's registered values come from
+ENUM_SEEDS = {
+    "site_id": "SELECT site_id FROM dim_site",
+    "asset_id": "SELECT asset_id FROM dim_asset",
+}
+
+
+def enum_values(conn: duckdb.DuckDBPyConnection, column: str) -> set[str]:
+    """Get the values of a column's enum type, or an empty set if it does not exist."""
+    return set(_ordered_values(conn, f"NULL::{ENUM_TYPES[column]}"))
+
+
+def enum_columns(conn: duckdb.DuckDBPyConnection, source: str) -> list[str]:
+    """Identifier columns present in a FROM-clause source."""
+    columns = [row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+    return [c for c in columns if c in ENUM_TYPES]
+
+
+def source_enum_values(conn: duckdb.DuckDBPyConnection, source: str) -> dict[str, set[str]]:
+    """Distinct identifier values in a FROM-clause source."""
+    values = {}
+    for column in enum_columns(conn, source):
+        values[column] = {
+            row[0]
+            for row in conn.execute(
+                f"SELECT DISTINCT {column} FROM {source} WHERE {column} IS NOT NULL"
+            ).fetchall()
+        }
+    return values
+
+
+def enum_select(columns: list[str]) -> str:
+    """SELECT list that casts identifier columns to their enum types."""
+    if not columns:
+        return "*"
+    casts = ", ".join(f"CAST({c} AS {ENUM_TYPES[c]}) AS {c}" for c in columns)
+    return f"* REPLACE ({casts})"
+
+
+def _members(values: list[str]) -> str:
+    return ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+
+
+def ensure_enum_types(
+    conn: duckdb.DuckDBPyConnection,
+    values: dict[str, set[str]],
+    incoming: Optional[dict[str, Optional[dict[str, set[str]]]]] = None,
+):
+    """
+    Create or extend the enum types to cover the registry and ``values``.
+
+    A type is only recreated when its value set grows, and new values are
+    appended after the existing ones so stored codes keep their meaning.
+    Enum columns already stored in the database keep an inline copy of the
+    type they were created with; see ``_widen_columns`` for which of them
+    are re-typed. ``incoming`` maps each fact table about to be loaded to
+    the identifier values its new files hold, or to None when the table is
+    rebuilt from scratch (and so gets the new type anyway).
+    """
+    for column, type_name in ENUM_TYPES.items():
+        current = _ordered_values(conn, f"NULL::{type_name}")
+        wanted = set(values.get(column, set()))
+        if column == "tag":
+            wanted |= set(TELEMETRY_TAGS)
+        elif column in ENUM_SEEDS:
+            try:
+                wanted |= {row[0] for row in conn.execute(ENUM_SEEDS[column]).fetchall() if row[0]}
+            except duckdb.CatalogException:
+                pass
+        added = sorted(wanted - set(current))
+        if added:
+            conn.execute(f"DROP TYPE IF EXISTS {type_name}")
+            conn.execute(f"CREATE TYPE {type_name} AS ENUM ({_members(current + added)})")
+            logger.info(f"  Enum {type_name}: {len(current) + len(added)} values ({len(added)} new)")
+
+        if current:
+            _widen_columns(conn, column, type_name, incoming or {}, grew=bool(added))
+
+
+def _ordered_values(conn: duckdb.DuckDBPyConnection, typed_null: str) -> list[str]:
+    """Values of an enum type in code order, or an empty list if it does not exist."""
+    try:
+        return conn.execute(f"SELECT enum_range({typed_null})").fetchone()[0]
+    except duckdb.CatalogException:
+        return []
+
+
+def _widen_columns(
+    conn: duckdb.DuckDBPyConnection,
+    column: str,
+    type_name: str,
+    incoming: dict[str, Optional[dict[str, set[str]]]],
+    grew: bool,
+):
+    """
+    Re-type the stored enum columns named ``column`` that need values of ``type_name``.
+
+    ALTER rewrites the column, so a fact table is only widened when its new
+    files hold values its stored type lacks, which leaves unchanged history
+    alone. Tables not loaded from files (derived tables) can receive any
+    value from the facts they are built from, so they are widened whenever
+    the type ``grew``.
+    """
+    tables = conn.execute("""
+        SELECT c.table_name, c.data_type
+        FROM duckdb_columns() c
+        JOIN duckdb_tables() t
+          ON t.database_name = c.database_name
+         AND t.schema_name = c.schema_name
+         AND t.table_name = c.table_name
+        WHERE c.database_name = current_database()
+          AND c.column_name = ?
+          AND c.data_type LIKE 'ENUM%'
+    """, [column]).fetchall()
+    for table, data_type in tables:
+        if table in incoming:
+            if incoming[table] is None:
+                continue
+            stored = set(_ordered_values(conn, f"NULL::{data_type}"))
+            if incoming[table].get(column, set()) <= stored:
+                continue
+        elif not grew:
+            continue
+        conn.execute(f"ALTER TABLE {table} ALTER {column} TYPE {type_name}")
@@ -0,0 +1,153 @@
+"""
+BESS Analytics - Gold Layer
+
+Computes the Gold rollup tables in DuckDB as a loader stage, instead of
+building them in pandas at data generation time. Each table remembers the
+source high-water mark it was built from; later refreshes delete and
+recompute only the buckets (days or months) at or after that mark.
+
+``agg_telemetry_15min`` is the 15-minute telemetry tier maintained by
+``db/retention.py``.
+"""
+
+import duckdb
+from loguru import logger
+
+# Gold tables in dependency order. ``query`` is evaluated with a row filter on
+# ``ts_column`` of ``source``; ``bucket`` is the table column holding the
+# ``grain`` ('day' or 'month') the rows are keyed by. Sources without a
+# watermark (``ts_column`` None) are small and rebuilt on every load.
+GOLD_TABLES = {
+    "agg_site_daily": {
+        "source": "fact_telemetry_wide",
+        "ts_column": "ts",
+        "grain": "day",
+        "bucket": "date",
+        "query": """
+            WITH daily AS (
+                SELECT
+                    CAST(ts AS DATE) as date,
+                    site_id,
+                    COALESCE(MAX(soc_pct) - MIN(soc_pct), 0) as dod_pct,
+                    AVG(soh_pct) as avg_soh_pct,
+                    MAX(temp_c_max) as max_temp_c,
+                    COALESCE(SUM(-p_kw) FILTER (WHERE p_kw < 0), 0) / 60 / 1000 as energy_charged_mwh,
+                    COALESCE(SUM(p_kw) FILTER (WHERE p_kw > 0), 0) / 60 / 1000 as energy_discharged_mwh
+                FROM fact_telemetry_wide
+                WHERE {filter}
+                GROUP BY CAST(ts AS DATE), site_id
+            )
+            SELECT
+                d.*,
+                CASE
+                    WHEN s.bess_mwh > 0
+                    THEN (d.energy_charged_mwh + d.energy_discharged_mwh) / (2 * s.bess_mwh)
+                    ELSE 0
+                END as cycles_equivalent
+            FROM daily d
+            JOIN dim_site s ON s.site_id = d.site_id
+        """,
+    },
+    "agg_site_monthly": {
+        "source": "agg_site_daily",
+        "ts_column": "date",
+        "grain": "month",
+        "bucket": "month",
+        "query": """
+            SELECT
+                strftime(date, '%Y-%m') as month,
+                site_id,
+                AVG(dod_pct) as dod_pct,
+                AVG(avg_soh_pct) as avg_soh_pct,
+                MAX(max_temp_c) as max_temp_c,
+                SUM(energy_charged_mwh) as energy_charged_mwh,
+                SUM(energy_discharged_mwh) as energy_discharged_mwh,
+                SUM(cycles_equivalent) as cycles_equivalent
+            FROM agg_site_daily
+            WHERE {filter}
+            GROUP BY strftime(date, '%Y-%m'), site_id
+        """,
+    },
+    "agg_revenue_daily": {
+        "source": "fact_settlement",
+        "ts_column": "date",
+        "grain": "day",
+        "bucket": "date",
+        "query": """
+            SELECT
+                date,
+                site_id,
+                service_id,
+                SUM(revenue_gbp) as revenue_gbp,
+                SUM(energy_mwh) as energy_mwh,
+                SUM(revenue_gbp) / NULLIF(SUM(energy_mwh), 0) as revenue_per_mwh
+            FROM fact_settlement
+            WHERE {filter}
+            GROUP BY date, site_id, service_id
+        """,
+    },
+    "agg_events_daily": {
+        "source": "fact_events",
+        "ts_column": None,
+        "grain": "day",
+        "bucket": "date",
+        "query": """
+            SELECT
+                CAST(start_ts AS DATE) as date,
+                site_id,
+                event_type,
+                severity,
+                COUNT(event_id) as event_count
+            FROM fact_events
+            WHERE {filter}
+            GROUP BY ALL
+        """,
+    },
+}
+
+
+def _bucket_start(spec: dict) -> str:
+    """Expression for the first bucket touched at or after a bound timestamp."""
+    start = f"DATE_TRUNC('{spec['grain']}', CAST(? AS TIMESTAMP))"
+    if spec["grain"] == "month":
+        return f"strftime({start}, '%Y-%m')"
+    return f"CAST({start} AS DATE)"
+
+
+def refresh_gold_tables(conn: duckdb.DuckDBPyConnection, full_refresh: bool = False):
+    """Bring every Gold table up to date with its source table."""
+    from db.loader import get_watermark, range_filter, refresh_ranges, table_exists, view_exists
+
+    logger.info("Refreshing Gold layer...")
+
+    for table, spec in GOLD_TABLES.items():
+        source = spec["source"]
+        if not (table_exists(conn, source) or view_exists(conn, source)):
+            continue
+
+        source_watermark = get_watermark(conn, source) if spec["ts_column"] else None
+        built_from = get_watermark(conn, table) if table_exists(conn, table) else None
+
+        if full_refresh or built_from is None or spec["ts_column"] is None:
+            conn.execute(f"""
+                CREATE OR REPLACE TABLE {table} AS
+                {spec["query"].format(filter="TRUE")}
+                ORDER BY site_id, {spec["bucket"]}
+            """)
+            logger.info(f"  Built {table}")
+        else:
+            ranges = refresh_ranges(conn, source, table, f"1 {spec['grain']}")
+            if not ranges:
+                continue
+            for start, end, site_ids in ranges:
+                filter_sql, params = range_filter(spec["bucket"], start, end, site_ids, _bucket_start(spec))
+                conn.execute(f"DELETE FROM {table} WHERE {filter_sql}", params)
+                filter_sql, params = range_filter(spec["ts_column"], start, end, site_ids)
+                conn.execute(f"INSERT INTO {table} BY NAME " + spec["query"].format(filter=filter_sql), params)
+            logger.info(f"  Refreshed {table} from {ranges[0][0].date()}")
+
+        if spec["ts_column"]:
+            conn.execute(
+                "INSERT OR REPLACE INTO _load_watermarks VALUES (?, ?, ?, now())",
+                [table, spec["ts_column"], source_watermark],
+            )
@@ -0,0 +1,148 @@
+"""
+BESS Analytics - Portfolio KPI Snapshot
+
+Computes the portfolio KPIs behind ``/metrics/portfolio`` in a single query.
+The "latest" anchors come from the loader watermarks instead of a
+``SELECT MAX(...)`` per source. Availability and state of health are read
+from the hourly telemetry tier and the Gold ``agg_site_daily`` table rather
+than the telemetry-heavy views. The loader stores the default-range result in
+``portfolio_kpi_snapshot`` once per load, so the common request reads one row.
+
+Without a date range the KPIs match the dashboard definitions: revenue month
+to date, availability over the last 7 days, faults active in the last hour
+and SOH on the latest day. ``start_date``/``end_date`` move those windows:
+revenue and availability cover the range, and faults and SOH are taken as of
+its end.
+"""
+
+from datetime import date
+from typing import Optional
+
+import duckdb
+from loguru import logger
+
+SNAPSHOT_TABLE = "portfolio_kpi_snapshot"
+
+# Sites whose average availability over the window is below this are flagged
+AVAILABILITY_TARGET_PCT = 95
+
+PORTFOLIO_KPI_QUERY = f"""
+    WITH anchors AS (
+        SELECT
+            CAST(MAX(high_water_mark) FILTER (WHERE table_name = 'fact_settlement') AS DATE) as settlement_day,
+            MAX(high_water_mark) FILTER (WHERE table_name = 'fact_telemetry') as telemetry_ts
+        FROM _load_watermarks
+    ),
+    bounds AS (
+        SELECT
+            CAST($start_date AS DATE) as start_date,
+            CAST($end_date AS DATE) as end_date,
+            COALESCE(CAST($end_date AS DATE), settlement_day) as revenue_day,
+            LEAST(CAST(telemetry_ts AS DATE), COALESCE(CAST($end_date AS DATE), CAST(telemetry_ts AS DATE))) as telemetry_day,
+            CASE
+                WHEN $end_date IS NULL THEN telemetry_ts
+                ELSE LEAST(telemetry_ts, CAST($end_date AS DATE) + INTERVAL '1 day')
+            END as as_of
+        FROM anchors
+    ),
+    sites AS (
+        SELECT
+            COUNT(*) as total_sites,
+            COALESCE(SUM(bess_mw), 0) as total_mw,
+            COALESCE(SUM(bess_mwh), 0) as total_mwh
+        FROM dim_site
+    ),
+    revenue AS (
+        SELECT COALESCE(SUM(revenue_gbp), 0) as revenue_mtd
+        FROM fact_settlement, bounds b
+        WHERE date <= b.revenue_day
+        AND date >= COALESCE(b.start_date, DATE_TRUNC('month', b.revenue_day))
+    ),
+    site_days AS (
+        SELECT
+            site_id,
+            CAST(ts_1hour AS DATE) as date,
+            AVG(avg_value) * 100 as availability_pct
+        FROM agg_telemetry_1hour, bounds b
+        WHERE tag = 'controller_status'
+        AND ts_1hour >= COALESCE(b.start_date, b.telemetry_day - INTERVAL '7 days')
+        AND ts_1hour < b.telemetry_day + INTERVAL '1 day'
+        GROUP BY site_id, CAST(ts_1hour AS DATE)
+    ),
+    availability AS (
+        SELECT COALESCE(AVG(availability_pct), 0) as avg_availability_pct
+        FROM site_days
+    ),
+    below_target AS (
+        SELECT COUNT(*) as sites_below_target
+        FROM (
+            SELECT site_id
+            FROM site_days
+            GROUP BY site_id
+            HAVING AVG(availability_pct) < {AVAILABILITY_TARGET_PCT}
+        )
+    ),
+    faults AS (
+        SELECT COUNT(*) as active_faults
+        FROM fact_events, bounds b
+        WHERE event_type IN ('fault', 'trip')
+        AND end_ts > b.as_of - INTERVAL '1 hour'
+        AND (b.end_date IS NULL OR start_ts <= b.as_of)
+    ),
+    health_day AS (
+        SELECT MAX(date) as date
+        FROM agg_site_daily, bounds b
+        WHERE date <= b.telemetry_day
+        AND (b.start_date IS NULL OR date >= b.start_date)
+    ),
+    health AS (
+        SELECT COALESCE(AVG(avg_soh_pct), 0) as avg_soh_pct
+        FROM agg_site_daily
+        WHERE date = (SELECT date FROM health_day)
+    )
+    SELECT
+        total_sites,
+        total_mw,
+        total_mwh,
+        revenue_mtd,
+        avg_availability_pct,
+        active_faults,
+        avg_soh_pct,
+        sites_below_target
+    FROM sites, revenue, availability, faults, health, below_target
+"""
+
+
+def refresh_portfolio_kpi_snapshot(conn: duckdb.DuckDBPyConnection):
+    """Store the default-range portfolio KPIs for this load."""
+    from db.loader import table_exists
+
+    if not all(table_exists(conn, t) for t in ("agg_telemetry_1hour", "agg_site_daily")):
+        return
+    try:
+        conn.execute(
+            f"CREATE OR REPLACE TABLE {SNAPSHOT_TABLE} AS {PORTFOLIO_KPI_QUERY}",
+            {"start_date": None, "end_date": None},
+        )
+    except duckdb.Error as e:
+        # Leave broken sources to snapshot validation; never serve a stale snapshot
+        logger.warning(f"  Skipped {SNAPSHOT_TABLE}: {e}")
+        conn.execute(f"DROP TABLE IF EXISTS {SNAPSHOT_TABLE}")
+        return
+    logger.info(f"  Built {SNAPSHOT_TABLE}")
+
+
+def portfolio_kpi_snapshot(
+    conn: duckdb.DuckDBPyConnection,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> dict:
+    """Portfolio KPIs for a date range; the default range is read from the stored snapshot."""
+    from db.loader import table_exists
+
+    if start_date is None and end_date is None and table_exists(conn, SNAPSHOT_TABLE):
+        cursor = conn.execute(f"SELECT * FROM {SNAPSHOT_TABLE}")
+    else:
+        cursor = conn.execute(PORTFOLIO_KPI_QUERY, {"start_date": start_date, "end_date": end_date})
+    columns = [d[0] for d in cursor.description]
+    return dict(zip(columns, cursor.fetchone()))
@@ -4,29 +4,678 @@ BESS Analytics - DuckDB Database Loader
 Loads Parquet files into DuckDB and creates analytical views.
 """
 
+import argparse
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 import duckdb
 from loguru import logger
 
+from db.enums import enum_columns, enum_select, ensure_enum_types, source_enum_values
+from db.gold import refresh_gold_tables
+from db.kpi import refresh_portfolio_kpi_snapshot
+from db.materialize import MATERIALIZED_VIEWS, create_aggregate_view, refresh_materialized_views
+from db.partitions import DERIVED_PARTITION_COLUMNS, create_partitioned_views, is_partition_file
+from db.report import peak_rss_mb, timed, write_report
+from db.retention import apply_retention, refresh_telemetry_tiers, retained_bucket_start
+from db.snapshot import DEFAULT_KEEP_SNAPSHOTS, build_snapshot, current_snapshot, resolve_db_path
+from db.telemetry import refresh_current_telemetry, refresh_wide_telemetry
+
 DATA_DIR = Path(__file__).parent.parent / "data"
-GOLD_DIR = DATA_DIR / "gold"
 DB_PATH = DATA_DIR / "bess_analytics.duckdb"
 
+# Concurrent cursors used to load independent tables
+DEFAULT_LOAD_WORKERS = 4
+
+# Scale for the data-completeness shortfall in revenue loss allocation
+MINUTES_PER_DAY = 1440
+
+
+def get_connection(
+    db_path: Optional[Path] = None,
+    row_group_size: Optional[int] = None,
+    read_only: bool = False,
+) -> duckdb.DuckDBPyConnection:
+    """
+    Get DuckDB connection.
+
+    Without ``db_path`` this is the live database: the published snapshot if
+    there is one (see ``db/snapshot.py``), else ``DB_PATH``. Readers such as
+    the dashboards pass ``read_only=True`` so they can share the file with the
+    API. A published snapshot is never opened for writing; refreshes build a
+    new snapshot instead.
+
+    ``row_group_size`` sets the rows per row group for tables written through
+    this connection; smaller row groups give finer-grained zone-map pruning.
+    """
+    if db_path is None and not read_only and current_snapshot(DB_PATH) is not None:
+        raise RuntimeError(
+            f"{DB_PATH.name} is served from published snapshots; refresh it with "
+            "`python -m db.loader`, which builds and publishes a new snapshot, "
+            "instead of writing to the live one"
+        )
+    path = Path(db_path) if db_path else resolve_db_path(DB_PATH)
+
+    try:
+        if row_group_size is None:
+            return duckdb.connect(str(path), read_only=read_only)
+        conn = duckdb.connect()
+        options = f"ROW_GROUP_SIZE {int(row_group_size)}" + (", READ_ONLY" if read_only else "")
+        conn.execute(f"ATTACH '{path}' AS bess ({options})")
+        conn.execute("USE bess")
+        return conn
+    except duckdb.IOException as e:
+        if "lock" not in str(e).lower():
+            raise
+        raise RuntimeError(
+            f"{path} is locked by another process, such as the API or a dashboard. "
+            "Refresh with `python -m db.loader`, which writes a new snapshot and never "
+            f"the file readers hold open. ({e})"
+        ) from e
+
+
+# Append-only fact tables and the column used as their incremental high-water mark.
+# Tables whose rows are updated in place (events, maintenance, balancing actions,
+# insights) are small and are always reloaded in full.
+WATERMARK_COLUMNS = {
+    "fact_telemetry": "ts",
+    "fact_dispatch": "ts",
+    "fact_settlement": "date",
+    "fact_data_quality": "ts_hour",
+    "forecast_revenue": "date",
+    "fact_corrected_signals": "ts",
+    "fact_constraints": "ts",
+    "fact_cell_telemetry": "ts",
+    "fact_imbalance": "ts",
+    "fact_forecasts": "ts",
+}
+
+# Sort keys used when loading with clustering enabled, so the min/max zone maps
+# of each row group cover a narrow range of sites, tags and timestamps.
+CLUSTER_KEYS = {
+    "fact_telemetry": ["site_id", "tag", "ts"],
+    "fact_dispatch": ["site_id", "ts"],
+    "fact_settlement": ["site_id", "date"],
+    "fact_data_quality": ["site_id", "ts_hour"],
+    "fact_corrected_signals": ["site_id", "ts"],
+    "fact_constraints": ["site_id", "ts"],
+    "fact_cell_telemetry": ["site_id", "rack_id", "ts"],
+    "fact_imbalance": ["site_id", "ts"],
+    "fact_forecasts": ["site_id", "ts"],
+}
+
+# Columns identifying one reading of each append-only fact table. Overlapping
+# micro-batches repeat rows; both full and incremental loads keep one per key.
+NATURAL_KEYS = {
+    "fact_telemetry": ["ts", "site_id", "asset_id", "tag"],
+    "fact_dispatch": ["ts", "site_id", "service_id"],
+    "fact_settlement": ["date", "site_id", "service_id"],
+    "fact_data_quality": ["ts_hour", "site_id"],
+    "forecast_revenue": ["date", "site_id"],
+    "fact_corrected_signals": ["ts", "site_id"],
+    "fact_constraints": ["ts", "site_id", "constraint_type"],
+    "fact_cell_telemetry": ["ts", "site_id", "rack_id", "cell_id"],
+    "fact_imbalance": ["ts", "site_id", "rack_id"],
+    "fact_forecasts": ["ts", "site_id", "horizon_min"],
+}
+
+
+def source_files(table: str) -> list[Path]:
+    """
+    List the Parquet files backing a table.
+
+    A table is read from ``data/<table>.parquet`` plus any micro-batch or
+    hive-partitioned files under ``data/<table>/``.
+    """
+    files = []
+    parquet_path = DATA_DIR / f"{table}.parquet"
+    if parquet_path.exists():
+        files.append(parquet_path)
+    batch_dir = DATA_DIR / table
+    if batch_dir.is_dir():
+        files.extend(sorted(batch_dir.rglob("*.parquet")))
+    return files
+
+
+def _parquet_source(files: list[Path], filename: bool = False) -> str:
+    """
+    Build a FROM-clause source over a list of files.
+
+    Hive-partitioned files take their partition values from the path; derived
+    partition columns (``date``) are dropped so rows match the table schema.
+    With ``filename`` each row also carries the path of its file.
+    """
+    plain = [f for f in files if not is_partition_file(f)]
+    hive = [f for f in files if is_partition_file(f)]
+    options = ", filename = true" if filename else ""
+
+    selects = []
+    if plain:
+        file_list = ", ".join(f"'{f}'" for f in plain)
+        selects.append(f"SELECT * FROM read_parquet([{file_list}], union_by_name = true{options})")
+    if hive:
+        file_list = ", ".join(f"'{f}'" for f in hive)
+        derived = ", ".join(sorted(DERIVED_PARTITION_COLUMNS))
+        selects.append(
+            f"SELECT * EXCLUDE ({derived}) "
+            f"FROM read_parquet([{file_list}], hive_partitioning = true, union_by_name = true{options})"
+        )
+    return "(" + " UNION ALL BY NAME ".join(selects) + ")"
+
+
+def _deduplicated_source(table: str, files: list[Path]) -> str:
+    """
+    Build a FROM-clause source over a table's files with one row per natural key.
+
+    Where overlapping files repeat a key, the row from the first file in path
+    order is kept. Tables without ``NATURAL_KEYS`` are read as they are.
+    """
+    if table not in NATURAL_KEYS:
+        return _parquet_source(files)
+    return f"""(
+        SELECT * EXCLUDE (filename)
+        FROM {_parquet_source(files, filename=True)}
+        QUALIFY row_number() OVER (PARTITION BY {", ".join(NATURAL_KEYS[table])} ORDER BY filename) = 1
+    )"""
 
-def get_connection(db_path: Optional[Path] = None) -> duckdb.DuckDBPyConnection:
-    """Get DuckDB connection."""
-    path = db_path or DB_PATH
-    return duckdb.connect(str(path))
 
+def _ensure_load_state(conn: duckdb.DuckDBPyConnection):
+    """Create the manifest and watermark bookkeeping tables."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _load_manifest (
+            table_name VARCHAR,
+            file_path VARCHAR,
+            file_size BIGINT,
+            file_mtime DOUBLE,
+            loaded_at TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _load_watermarks (
+            table_name VARCHAR PRIMARY KEY,
+            watermark_column VARCHAR,
+            high_water_mark TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _load_changes (
+            table_name VARCHAR,
+            site_id VARCHAR,
+            changed_from TIMESTAMP,
+            changed_at TIMESTAMP
+        )
+    """)
+
+
+def table_exists(conn: duckdb.DuckDBPyConnection, table: str) -> bool:
+    """Check whether a base table exists in the database."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [table]
+    ).fetchone()[0] > 0
+
+
+def view_exists(conn: duckdb.DuckDBPyConnection, view: str) -> bool:
+    """Check whether a view exists in the database."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM duckdb_views() WHERE view_name = ? AND NOT internal", [view]
+    ).fetchone()[0] > 0
+
+
+def _unloaded_files(conn: duckdb.DuckDBPyConnection, table: str, files: list[Path]) -> list[Path]:
+    """Return files that are not yet in the manifest or have changed on disk."""
+    manifest = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute(
+            "SELECT file_path, file_size, file_mtime FROM _load_manifest WHERE table_name = ?",
+            [table],
+        ).fetchall()
+    }
+    unloaded = []
+    for f in files:
+        stat = f.stat()
+        if manifest.get(str(f)) != (stat.st_size, stat.st_mtime):
+            unloaded.append(f)
+    return unloaded
+
+
+def _record_files(conn: duckdb.DuckDBPyConnection, table: str, files: list[Path]):
+    """Record files as loaded in the manifest."""
+    for f in files:
+        stat = f.stat()
+        conn.execute(
+            "DELETE FROM _load_manifest WHERE table_name = ? AND file_path = ?",
+            [table, str(f)],
+        )
+        conn.execute(
+            "INSERT INTO _load_manifest VALUES (?, ?, ?, ?, now())",
+            [table, str(f), stat.st_size, stat.st_mtime],
+        )
+
+
+def _update_watermark(conn: duckdb.DuckDBPyConnection, table: str):
+    """Advance the table's high-water mark to its current maximum."""
+    column = WATERMARK_COLUMNS[table]
+    conn.execute(f"""
+        INSERT OR REPLACE INTO _load_watermarks
+        SELECT '{table}', '{column}', CAST(MAX({column}) AS TIMESTAMP), now()
+        FROM {table}
+    """)
+
+
+def get_watermark(conn: duckdb.DuckDBPyConnection, table: str) -> Optional[datetime]:
+    """Get the high-water mark of an incrementally loaded table."""
+    row = conn.execute(
+        "SELECT high_water_mark FROM _load_watermarks WHERE table_name = ?", [table]
+    ).fetchone()
+    return row[0] if row else None
+
+
+def record_change(conn: duckdb.DuckDBPyConnection, table: str, changes: dict[str, datetime]):
+    """
+    Note that rows of ``table`` at or before its high-water mark changed.
+
+    ``changes`` maps each affected site_id to its earliest changed timestamp.
+    """
+    conn.executemany(
+        "INSERT INTO _load_changes VALUES (?, ?, ?, now())",
+        [[table, site_id, changed_from] for site_id, changed_from in changes.items()],
+    )
+
+
+def _bucket_floor(conn: duckdb.DuckDBPyConnection, value, bucket: str) -> datetime:
+    """Floor a timestamp to the start of its ``bucket`` (e.g. ``'15 minutes'``, ``'1 day'``)."""
+    return conn.execute(
+        f"SELECT time_bucket(INTERVAL '{bucket}', CAST(? AS TIMESTAMP))", [value]
+    ).fetchone()[0]
+
+
+def refresh_ranges(
+    conn: duckdb.DuckDBPyConnection, source: str, table: str, bucket: str = "1 minute"
+) -> list[tuple[datetime, Optional[datetime], Optional[list[str]]]]:
+    """
+    Get the ranges of a table derived from ``source`` that must be recomputed.
+
+    Each range is ``(start, end, site_ids)``: the ``bucket``-aligned span from
+    ``start`` up to ``end`` (open when None) for ``site_ids`` (every site when
+    None). Rows beyond the source high-water mark the table was built from
+    give an open range over every site. Rows loaded into ``source`` at or
+    before that mark since the table's last refresh (late or same-minute
+    batches) give a range for only the sites they belong to, ending where the
+    open range starts; they are recorded in turn for tables derived from
+    ``table``. No range starts before the history ``source`` still holds
+    after retention (see ``retained_bucket_start``), so buckets whose raw rows
+    were purged are kept as they are. Returns an empty list if nothing changed.
+    """
+    built_from, refreshed_at = conn.execute(
+        "SELECT high_water_mark, updated_at FROM _load_watermarks WHERE table_name = ?", [table]
+    ).fetchone()
+    source_watermark = get_watermark(conn, source)
+    retained = retained_bucket_start(conn, source, bucket)
+    open_start = None
+    if source_watermark is not None and source_watermark > built_from:
+        open_start = _bucket_floor(conn, built_from, bucket)
+        if retained is not None:
+            open_start = max(open_start, retained)
+
+    late = conn.execute("""
+        SELECT site_id, MIN(changed_from) FROM _load_changes
+        WHERE table_name = ? AND changed_at > ?
+        GROUP BY site_id
+    """, [source, refreshed_at]).fetchall()
+    changes = {}
+    for site_id, changed_from in late:
+        start = _bucket_floor(conn, changed_from, bucket)
+        if retained is not None:
+            start = max(start, retained)
+        if open_start is None or start < open_start:
+            changes[site_id] = start
+    if changes:
+        record_change(conn, table, changes)
+
+    by_start = {}
+    for site_id, start in changes.items():
+        by_start.setdefault(start, []).append(site_id)
+    ranges = [(start, open_start, sorted(sites)) for start, sites in sorted(by_start.items())]
+    if open_start is not None:
+        ranges.append((open_start, None, None))
+    return ranges
+
+
+def range_filter(
+    column: str, start: datetime, end: Optional[datetime], site_ids: Optional[list[str]], bound: str = "?"
+) -> tuple[str, list]:
+    """
+    SQL filter and parameters selecting one range from ``refresh_ranges``.
+
+    ``bound`` is the expression each timestamp is compared through, with a
+    single ``?`` placeholder (e.g. to cast it to the column's bucket type).
+    """
+    filter_sql, params = f"{column} >= {bound}", [start]
+    if end is not None:
+        filter_sql += f" AND {column} < {bound}"
+        params.append(end)
+    if site_ids is not None:
+        filter_sql += f" AND site_id IN ({', '.join('?' for _ in site_ids)})"
+        params.extend(site_ids)
+    return filter_sql, params
+
+
+def _footer_watermark(conn: duckdb.DuckDBPyConnection, table: str, files: list[Path]):
+    """Set the table's high-water mark from Parquet column statistics, without a scan."""
+    column = WATERMARK_COLUMNS[table]
+    file_list = ", ".join(f"'{f}'" for f in files)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO _load_watermarks
+        SELECT '{table}', '{column}', MAX(TRY_CAST(stats_max_value AS TIMESTAMP)), now()
+        FROM parquet_metadata([{file_list}])
+        WHERE path_in_schema = '{column}'
+    """)
+
+
+def _order_by(table: str, cluster: bool) -> str:
+    """ORDER BY clause that clusters a table's rows, if requested."""
+    if cluster and table in CLUSTER_KEYS:
+        return "ORDER BY " + ", ".join(CLUSTER_KEYS[table])
+    return ""
+
+
+def _uses_enums(table: str) -> bool:
+    """Whether a table stores its identifier columns as enums (dimensions seed them)."""
+    return not table.startswith("dim_")
+
+
+def _full_load(conn: duckdb.DuckDBPyConnection, table: str, files: list[Path], cluster: bool = False):
+    """Rebuild a table from all of its source files."""
+    source = _deduplicated_source(table, files)
+    columns = enum_select(enum_columns(conn, source)) if _uses_enums(table) else "*"
+    conn.execute(f"""
+        CREATE OR REPLACE TABLE {table} AS
+        SELECT {columns} FROM {source}
+        {_order_by(table, cluster)}
+    """)
+    conn.execute("DELETE FROM _load_manifest WHERE table_name = ?", [table])
+    conn.execute("DELETE FROM _load_changes WHERE table_name = ?", [table])
+    _record_files(conn, table, files)
+    if table in WATERMARK_COLUMNS:
+        _update_watermark(conn, table)
+
+
+def _external_load(conn: duckdb.DuckDBPyConnection, table: str, files: list[Path]) -> bool:
+    """
+    Expose a table as a view over its Parquet files instead of copying them.
+
+    The view is only recreated when the set of source files has changed; the
+    return value says whether it was.
+    """
+    if view_exists(conn, table) and not _unloaded_files(conn, table, files):
+        loaded = {
+            row[0] for row in conn.execute(
+                "SELECT file_path FROM _load_manifest WHERE table_name = ?", [table]
+            ).fetchall()
+        }
+        if loaded == {str(f) for f in files}:
+            return False
+
+    if table_exists(conn, table):
+        conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM {_parquet_source(files)}")
+    conn.execute("DELETE FROM _load_manifest WHERE table_name = ?", [table])
+    _record_files(conn, table, files)
+    if table in WATERMARK_COLUMNS:
+        _footer_watermark(conn, table, files)
+    return True
+
+
+def external_tables(conn: duckdb.DuckDBPyConnection) -> list[str]:
+    """Tables currently exposed as views over their Parquet files."""
+    if not table_exists(conn, "_load_manifest"):
+        return []
+    return [
+        row[0] for row in conn.execute("""
+            SELECT DISTINCT m.table_name
+            FROM _load_manifest m
+            JOIN duckdb_views() v ON v.view_name = m.table_name AND NOT v.internal
+            ORDER BY 1
+        """).fetchall()
+    ]
+
+
+def refresh_file_views(conn: duckdb.DuckDBPyConnection) -> list[str]:
+    """
+    Re-point the views that list Parquet files at the files now on disk.
+
+    External tables and partitioned views name their files explicitly, so
+    they must be refreshed whenever files are replaced outside a load (e.g.
+    by ``db.compact``). Returns the external tables whose views changed.
+    """
+    refreshed = [
+        table for table in external_tables(conn)
+        if source_files(table) and _external_load(conn, table, source_files(table))
+    ]
+    create_partitioned_views(conn, DATA_DIR)
+    return refreshed
+
+
+def _incremental_load(
+    conn: duckdb.DuckDBPyConnection, table: str, files: list[Path], cluster: bool = False
+) -> int:
+    """
+    Append rows from new or changed files whose natural key is not loaded yet.
+
+    Only the unloaded files are scanned, and only the table's rows from the
+    batch's earliest timestamp on are probed for existing keys, so the cost is
+    proportional to the size of the new batch rather than to the table's
+    history. Rows at or before the high-water mark (a late site, an
+    overlapping batch) are recorded per site with ``record_change`` so that
+    derived tables recompute those sites from them.
+    """
+    new_files = _unloaded_files(conn, table, files)
+    if not new_files:
+        return 0
+
+    column = WATERMARK_COLUMNS[table]
+    key = NATURAL_KEYS[table]
+    watermark = get_watermark(conn, table)
+    earliest = _footer_min(conn, table, new_files)
+
+    bound, params = (f"t.{column} >= ?", [earliest]) if earliest is not None else ("TRUE", [])
+
+    pending = f"_pending_{table}"
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {pending} AS
+        SELECT * FROM {_deduplicated_source(table, new_files)} s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {table} t
+            WHERE {bound}
+            AND {" AND ".join(f"t.{k} = s.{k}" for k in key)}
+        )
+    """, params)
+    appended = conn.execute(f"SELECT COUNT(*) FROM {pending}").fetchone()[0]
+    late = []
+    if appended:
+        conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {pending} {_order_by(table, cluster)}")
+        if watermark is not None:
+            late = conn.execute(f"""
+                SELECT site_id, CAST(MIN({column}) AS TIMESTAMP) FROM {pending}
+                WHERE {column} <= ? GROUP BY site_id
+            """, [watermark]).fetchall()
+    conn.execute(f"DROP TABLE {pending}")
 
-def load_data(conn: Optional[duckdb.DuckDBPyConnection] = None) -> duckdb.DuckDBPyConnection:
-    """Load all Parquet files into DuckDB tables."""
+    _record_files(conn, table, new_files)
+    _update_watermark(conn, table)
+    if late:
+        record_change(conn, table, dict(late))
+    return appended
+
+
+def _footer_min(conn: duckdb.DuckDBPyConnection, table: str, files: list[Path]) -> Optional[datetime]:
+    """Earliest watermark-column value in ``files``, from Parquet column statistics."""
+    column = WATERMARK_COLUMNS[table]
+    file_list = ", ".join(f"'{f}'" for f in files)
+    return conn.execute(f"""
+        SELECT MIN(TRY_CAST(stats_min_value AS TIMESTAMP))
+        FROM parquet_metadata([{file_list}])
+        WHERE path_in_schema = '{column}'
+    """).fetchone()[0]
+
+
+def _cursor(conn: duckdb.DuckDBPyConnection) -> duckdb.DuckDBPyConnection:
+    """Open a cursor that uses the same default database as ``conn``."""
+    database = conn.execute("SELECT current_database()").fetchone()[0]
+    cursor = conn.cursor()
+    cursor.execute(f'USE "{database}"')
+    return cursor
+
+
+def _parquet_row_count(conn: duckdb.DuckDBPyConnection, files: list[Path]) -> int:
+    """Count rows from the Parquet footers without scanning any data."""
+    file_list = ", ".join(f"'{f}'" for f in files)
+    return conn.execute(
+        f"SELECT COALESCE(SUM(num_rows), 0) FROM parquet_file_metadata([{file_list}])"
+    ).fetchone()[0]
+
+
+def _is_incremental(conn: duckdb.DuckDBPyConnection, table: str, full_refresh: bool) -> bool:
+    """Whether a table is appended to rather than rebuilt on this load."""
+    return table in WATERMARK_COLUMNS and not full_refresh and table_exists(conn, table)
+
+
+def _pending_enum_values(
+    cursor: duckdb.DuckDBPyConnection, table: str, full_refresh: bool
+) -> dict[str, set[str]]:
+    """Distinct identifier values in the files this load will read for a table."""
+    try:
+        files = source_files(table)
+        if files and _is_incremental(cursor, table, full_refresh):
+            files = _unloaded_files(cursor, table, files)
+        if not files:
+            return {}
+        return source_enum_values(cursor, _parquet_source(files))
+    finally:
+        cursor.close()
+
+
+def _load_table(
+    cursor: duckdb.DuckDBPyConnection,
+    table: str,
+    full_refresh: bool,
+    cluster: bool,
+    external: bool = False,
+) -> dict:
+    """
+    Load one base table from its source files on a dedicated cursor.
+
+    Returns the table's entry for the load report: mode, wall time, rows
+    loaded, bytes of Parquet read and the process-wide peak RSS afterwards.
+    """
+    started = time.perf_counter()
+    entry = {"mode": "missing", "rows": 0, "bytes_read": 0}
+    try:
+        files = source_files(table)
+        if not files:
+            logger.warning(f"  Missing: {DATA_DIR / f'{table}.parquet'}")
+        elif external:
+            entry["mode"] = "external"
+            if _external_load(cursor, table, files):
+                entry["rows"] = _parquet_row_count(cursor, files)
+                logger.info(f"  External {table}: {entry['rows']:,} rows")
+        else:
+            # A table previously exposed as an external view is copied in from scratch
+            if view_exists(cursor, table):
+                cursor.execute(f"DROP VIEW {table}")
+            if _is_incremental(cursor, table, full_refresh):
+                new_files = _unloaded_files(cursor, table, files)
+                entry["mode"] = "incremental"
+                entry["rows"] = _incremental_load(cursor, table, files, cluster=cluster)
+                entry["bytes_read"] = sum(f.stat().st_size for f in new_files)
+                logger.info(f"  Appended {table}: {entry['rows']:,} rows")
+            else:
+                _full_load(cursor, table, files, cluster=cluster)
+                entry["mode"] = "full"
+                entry["rows"] = _parquet_row_count(cursor, files)
+                entry["bytes_read"] = sum(f.stat().st_size for f in files)
+                logger.info(f"  Loaded {table}: {entry['rows']:,} rows")
+    finally:
+        cursor.close()
+    entry["seconds"] = round(time.perf_counter() - started, 4)
+    # Tables load concurrently, so this is the process-wide high-water mark
+    # when the table finished, not the table's own usage
+    entry["process_peak_rss_mb"] = peak_rss_mb()
+    return entry
+
+
+def load_data(
+    conn: Optional[duckdb.DuckDBPyConnection] = None,
+    full_refresh: bool = False,
+    materialize: bool = False,
+    cluster: bool = False,
+    workers: int = DEFAULT_LOAD_WORKERS,
+    external: Iterable[str] = (),
+    retention_days: Optional[int] = None,
+    report_dir: Optional[Path] = None,
+) -> duckdb.DuckDBPyConnection:
+    """
+    Load all Parquet files into DuckDB tables.
+
+    Append-only fact tables (see ``WATERMARK_COLUMNS``) are loaded
+    incrementally: only files missing from the load manifest are read, and
+    only their rows whose ``NATURAL_KEYS`` are not in the table yet are
+    appended. A full load keeps one row per key as well, so overlapping
+    micro-batches give the same rows either way. Pass ``full_refresh=True``
+    to rebuild every table from scratch.
+
+    With ``materialize=True`` the heavy daily aggregate views are served from
+    tables refreshed for the days touched by this load.
+
+    With ``cluster=True`` fact tables are written sorted by ``CLUSTER_KEYS``
+    so that site and time-range filters can skip most row groups.
+
+    Base tables are loaded concurrently on ``workers`` cursors, and logged row
+    counts come from Parquet footer metadata rather than table scans.
+
+    Tables named in ``external`` are not copied: they are created as views over
+    their Parquet files (including the hive-partitioned layout), which makes
+    startup near-instant for read-only replicas. Small dimensions can stay
+    materialized while large fact tables are left external.
+
+    Copied fact tables store ``site_id``, ``asset_id`` and ``tag`` as enums
+    (see ``db/enums.py``); queries compare them with plain strings as before.
+
+    Every load extends the 15-minute and hourly telemetry tiers. With
+    ``retention_days`` set, raw telemetry older than that many days before
+    the watermark is then purged (see ``db/retention.py``).
+
+    Each load writes a JSON performance report (see ``db/report.py``) to
+    ``report_dir``, by default ``data/load_reports/``, with per-table load
+    and per-view creation times.
+    """
     if conn is None:
         conn = get_connection()
 
-    logger.info("Loading data into DuckDB...")
+    started = time.perf_counter()
+    external = set(external)
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "options": {
+            "full_refresh": full_refresh,
+            "materialize": materialize,
+            "cluster": cluster,
+            "workers": workers,
+            "external": sorted(external),
+            "retention_days": retention_days,
+        },
+        "tables": {},
+        "stages": {},
+    }
+    stages = report["stages"]
+
+    logger.info("Loading data into DuckDB{}...".format(" (full refresh)" if full_refresh else ""))
+    _ensure_load_state(conn)
 
     # Load dimension tables
     tables = [
@@ -53,58 +702,117 @@ def load_data(conn: Optional[duckdb.DuckDBPyConnection] = None) -> duckdb.DuckDB
         "fact_insights_findings",
     ]
 
-    for table in tables:
-        parquet_path = DATA_DIR / f"{table}.parquet"
-        if parquet_path.exists():
-            conn.execute(f"""
-                CREATE OR REPLACE TABLE {table} AS
-                SELECT * FROM read_parquet('{parquet_path}')
-            """)
-            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-            logger.info(f"  Loaded {table}: {count:,} rows")
-        else:
-            logger.warning(f"  Missing: {parquet_path}")
-
-    # Load Gold layer aggregate tables (if they exist)
-    gold_tables = [
-        "agg_telemetry_15min",
-        "agg_site_daily",
-        "agg_site_monthly",
-        "agg_revenue_daily",
-        "agg_events_daily",
-    ]
+    dimensions = [t for t in tables if not _uses_enums(t)]
+    facts = [t for t in tables if _uses_enums(t)]
+
+    # Base tables are independent of each other, so each one is loaded on its
+    # own cursor. Dimensions go first because they seed the identifier enums
+    # that the copied fact tables are typed with; enum types are grown to
+    # cover any new identifiers before the fact loads start. Derived tables
+    # and views below need them all and run after.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        with timed(stages, "dimensions"):
+            futures = {
+                table: pool.submit(_load_table, _cursor(conn), table, full_refresh, cluster, table in external)
+                for table in dimensions
+            }
+            for table, future in futures.items():
+                report["tables"][table] = future.result()
+
+        with timed(stages, "enum_types"):
+            pending = {
+                table: pool.submit(_pending_enum_values, _cursor(conn), table, full_refresh)
+                for table in facts
+                if table not in external
+            }
+            enum_values = {}
+            incoming = {}
+            for table, future in pending.items():
+                table_values = future.result()
+                for column, values in table_values.items():
+                    enum_values.setdefault(column, set()).update(values)
+                # Tables rebuilt from scratch are created with the new types
+                incoming[table] = table_values if _is_incremental(conn, table, full_refresh) else None
+            ensure_enum_types(conn, enum_values, incoming)
+
+        with timed(stages, "facts"):
+            futures = {
+                table: pool.submit(_load_table, _cursor(conn), table, full_refresh, cluster, table in external)
+                for table in facts
+            }
+            for table, future in futures.items():
+                report["tables"][table] = future.result()
+
+    # Expose hive-partitioned fact files for partition-pruned reads
+    with timed(stages, "partitioned_views"):
+        create_partitioned_views(conn, DATA_DIR)
+
+    # Keep the wide (one column per tag) and latest-value telemetry tables in step
+    with timed(stages, "wide_telemetry"):
+        refresh_wide_telemetry(conn, full_refresh=full_refresh)
+    with timed(stages, "current_telemetry"):
+        refresh_current_telemetry(conn, full_refresh=full_refresh)
+
+    # Downsampled 15-minute and hourly telemetry tiers
+    with timed(stages, "telemetry_tiers"):
+        refresh_telemetry_tiers(conn, full_refresh=full_refresh)
 
-    for table in gold_tables:
-        parquet_path = GOLD_DIR / f"{table}.parquet"
-        if parquet_path.exists():
-            conn.execute(f"""
-                CREATE OR REPLACE TABLE {table} AS
-                SELECT * FROM read_parquet('{parquet_path}')
-            """)
-            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-            logger.info(f"  Loaded Gold/{table}: {count:,} rows")
+    # Gold rollups, recomputed for the days and months touched by this load
+    with timed(stages, "gold"):
+        refresh_gold_tables(conn, full_refresh=full_refresh)
+
+    # Default-range portfolio KPIs, read by the API without recomputing
+    with timed(stages, "kpi_snapshot"):
+        refresh_portfolio_kpi_snapshot(conn)
+
+    if materialize:
+        with timed(stages, "materialized_views"):
+            refresh_materialized_views(conn, full_refresh=full_refresh)
+
+    # Raw minutes beyond the retention window live on only in the tiers
+    if retention_days is not None:
+        with timed(stages, "retention"):
+            apply_retention(conn, retention_days)
 
     # Create analytical views
-    create_views(conn)
+    with timed(stages, "views"):
+        report["views"] = create_views(conn, materialized=materialize)
 
-    logger.info("Database loading complete!")
+    report["total_seconds"] = round(time.perf_counter() - started, 4)
+    report["peak_rss_mb"] = peak_rss_mb()
+    path = write_report(report, report_dir or DATA_DIR / "load_reports")
+
+    logger.info(f"Database loading complete in {report['total_seconds']:.1f}s (report: {path})")
     return conn
 
 
-def create_views(conn: duckdb.DuckDBPyConnection):
-    """Create analytical views for dashboards."""
+def create_views(conn: duckdb.DuckDBPyConnection, materialized: bool = False) -> dict[str, float]:
+    """
+    Create analytical views for dashboards.
+
+    With ``materialized`` the heavy daily aggregates read from the ``mv_*``
+    tables maintained by ``refresh_materialized_views``.
+
+    Returns the creation time of each view, in seconds, for the load report.
+    """
     logger.info("Creating analytical views...")
+    timings = {}
+
+    def execute(sql: str):
+        view = re.search(r"CREATE OR REPLACE VIEW (\w+)", sql).group(1)
+        with timed(timings, view):
+            conn.execute(sql)
 
     # View: Site summary with latest telemetry
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_site_latest_telemetry AS
         WITH latest AS (
             SELECT
                 site_id,
                 tag,
-                value,
-                ROW_NUMBER() OVER (PARTITION BY site_id, tag ORDER BY ts DESC) as rn
-            FROM fact_telemetry
+                arg_max(value, ts) as value
+            FROM cur_telemetry
+            GROUP BY site_id, tag
         )
         SELECT
             s.*,
@@ -113,13 +821,13 @@ def create_views(conn: duckdb.DuckDBPyConnection):
             MAX(CASE WHEN l.tag = 'soh_pct' THEN l.value END) as latest_soh_pct,
             MAX(CASE WHEN l.tag = 'controller_status' THEN l.value END) as controller_status
         FROM dim_site s
-        LEFT JOIN latest l ON s.site_id = l.site_id AND l.rn = 1
+        LEFT JOIN latest l ON s.site_id = l.site_id
         GROUP BY s.site_id, s.name, s.country, s.grid_connection_mw, s.bess_mw,
                  s.bess_mwh, s.cod_date, s.vendor_controller, s.latitude, s.longitude
     """)
 
     # View: Daily revenue by site
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_daily_revenue AS
         SELECT
             date,
@@ -132,7 +840,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Revenue with forecast comparison
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_revenue_vs_forecast AS
         SELECT
             r.date,
@@ -144,28 +852,15 @@ def create_views(conn: duckdb.DuckDBPyConnection):
         LEFT JOIN forecast_revenue f ON r.date = f.date AND r.site_id = f.site_id
     """)
 
-    # View: Site availability (based on controller status)
-    conn.execute("""
-        CREATE OR REPLACE VIEW v_site_availability AS
-        WITH hourly_status AS (
-            SELECT
-                site_id,
-                DATE_TRUNC('hour', ts) as hour,
-                AVG(CASE WHEN tag = 'controller_status' THEN value ELSE NULL END) as avg_status
-            FROM fact_telemetry
-            GROUP BY site_id, DATE_TRUNC('hour', ts)
-        )
-        SELECT
-            site_id,
-            DATE_TRUNC('day', hour) as date,
-            AVG(avg_status) * 100 as availability_pct,
-            COUNT(*) as hours_measured
-        FROM hourly_status
-        GROUP BY site_id, DATE_TRUNC('day', hour)
-    """)
+    # Telemetry-heavy daily aggregates, optionally over materialized tables:
+    # v_site_availability, v_dispatch_compliance, v_battery_health,
+    # v_data_quality_daily and v_response_time
+    for view in MATERIALIZED_VIEWS:
+        with timed(timings, view):
+            create_aggregate_view(conn, view, materialized=materialized)
 
     # View: Event summary by site and type
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_event_summary AS
         SELECT
             site_id,
@@ -179,7 +874,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Active events (not yet ended)
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_active_events AS
         SELECT *
         FROM fact_events
@@ -187,7 +882,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Partner revenue share calculation
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_partner_revenue AS
         SELECT
             p.partner_id,
@@ -203,53 +898,8 @@ def create_views(conn: duckdb.DuckDBPyConnection):
         JOIN v_daily_revenue r ON p.site_id = r.site_id
     """)
 
-    # View: Dispatch compliance
-    conn.execute("""
-        CREATE OR REPLACE VIEW v_dispatch_compliance AS
-        SELECT
-            site_id,
-            DATE_TRUNC('day', ts) as date,
-            COUNT(*) as dispatch_count,
-            AVG(CASE
-                WHEN command_kw = 0 THEN 100
-                ELSE LEAST(100, (actual_kw / NULLIF(command_kw, 0)) * 100)
-            END) as compliance_pct,
-            SUM(ABS(command_kw - actual_kw)) / 1000 as total_deviation_mw
-        FROM fact_dispatch
-        GROUP BY site_id, DATE_TRUNC('day', ts)
-    """)
-
-    # View: Battery health trends
-    conn.execute("""
-        CREATE OR REPLACE VIEW v_battery_health AS
-        SELECT
-            site_id,
-            DATE_TRUNC('day', ts) as date,
-            AVG(CASE WHEN tag = 'soh_pct' THEN value END) as avg_soh,
-            AVG(CASE WHEN tag = 'soc_pct' THEN value END) as avg_soc,
-            AVG(CASE WHEN tag = 'temp_c_avg' THEN value END) as avg_temp,
-            MAX(CASE WHEN tag = 'temp_c_max' THEN value END) as max_temp,
-            MAX(CASE WHEN tag = 'cycle_count' THEN value END) as cycle_count
-        FROM fact_telemetry
-        WHERE tag IN ('soh_pct', 'soc_pct', 'temp_c_avg', 'temp_c_max', 'cycle_count')
-        GROUP BY site_id, DATE_TRUNC('day', ts)
-    """)
-
-    # View: Data quality trends
-    conn.execute("""
-        CREATE OR REPLACE VIEW v_data_quality_daily AS
-        SELECT
-            site_id,
-            DATE_TRUNC('day', ts_hour) as date,
-            AVG(completeness_pct) as avg_completeness,
-            MIN(completeness_pct) as min_completeness,
-            SUM(missing_tags_count) as total_missing_tags
-        FROM fact_data_quality
-        GROUP BY site_id, DATE_TRUNC('day', ts_hour)
-    """)
-
     # View: Vendor benchmarking
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_vendor_benchmark AS
         SELECT
             s.vendor_controller as vendor,
@@ -264,7 +914,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Revenue loss attribution
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_revenue_loss_attribution AS
         SELECT
             rvf.date,
@@ -292,19 +942,65 @@ def create_views(conn: duckdb.DuckDBPyConnection):
         LEFT JOIN v_data_quality_daily dq ON rvf.site_id = dq.site_id AND rvf.date = dq.date
     """)
 
-    # View: Response time from telemetry (comms_latency_ms -> seconds)
-    conn.execute("""
-        CREATE OR REPLACE VIEW v_response_time AS
+    # View: Revenue loss allocated across causes in GBP. The completeness
+    # shortfall is expressed as minutes of the day without data, so the three
+    # operational causes share a unit; together they claim the share of a
+    # positive gap matching the share of the day they cover, split in
+    # proportion to their minutes, and the remainder is market conditions.
+    execute(f"""
+        CREATE OR REPLACE VIEW v_revenue_loss_allocation AS
+        WITH weighted AS (
+            SELECT
+                *,
+                GREATEST(COALESCE(revenue_gap, 0), 0) as loss_gbp,
+                fault_minutes + trip_minutes
+                    + GREATEST(100 - data_completeness, 0) / 100 * {MINUTES_PER_DAY} as cause_minutes,
+                GREATEST(100 - data_completeness, 0) / 100 * {MINUTES_PER_DAY} as data_gap_minutes
+            FROM v_revenue_loss_attribution
+        ),
+        allocated AS (
+            SELECT
+                *,
+                loss_gbp * LEAST(cause_minutes / {MINUTES_PER_DAY}, 1)
+                    * COALESCE(fault_minutes / NULLIF(cause_minutes, 0), 0) as loss_faults_gbp,
+                loss_gbp * LEAST(cause_minutes / {MINUTES_PER_DAY}, 1)
+                    * COALESCE(trip_minutes / NULLIF(cause_minutes, 0), 0) as loss_trips_gbp,
+                loss_gbp * LEAST(cause_minutes / {MINUTES_PER_DAY}, 1)
+                    * COALESCE(data_gap_minutes / NULLIF(cause_minutes, 0), 0) as loss_data_gaps_gbp
+            FROM weighted
+        ),
+        split AS (
+            SELECT
+                *,
+                loss_gbp - loss_faults_gbp - loss_trips_gbp - loss_data_gaps_gbp as loss_market_gbp
+            FROM allocated
+        )
         SELECT
+            date,
             site_id,
-            AVG(value) / 1000.0 as avg_response_sec
-        FROM fact_telemetry
-        WHERE tag = 'comms_latency_ms'
-        GROUP BY site_id
+            site_name,
+            forecast_revenue,
+            actual_revenue,
+            revenue_gap,
+            fault_minutes,
+            trip_minutes,
+            data_completeness,
+            loss_faults_gbp,
+            loss_trips_gbp,
+            loss_data_gaps_gbp,
+            loss_market_gbp,
+            -- Cause holding the largest share of the day's loss
+            CASE
+                WHEN loss_gbp = 0 THEN 'Other'
+                WHEN loss_faults_gbp + loss_trips_gbp >= GREATEST(loss_data_gaps_gbp, loss_market_gbp) THEN 'Faults/Trips'
+                WHEN loss_data_gaps_gbp >= loss_market_gbp THEN 'Data Gaps'
+                ELSE 'Market Conditions'
+            END as loss_category
+        FROM split
     """)
 
     # View: SLA compliance
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_sla_compliance AS
         SELECT
             sla.sla_id,
@@ -339,7 +1035,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     # ============== Edge Intelligence Views ==============
 
     # View: Latest corrected signals per site
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_latest_corrected_signals AS
         SELECT DISTINCT ON (site_id)
             site_id, ts, soc_pct_raw, soc_pct_corrected, soe_mwh_corrected,
@@ -350,7 +1046,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Active constraints
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_active_constraints AS
         SELECT *
         FROM fact_constraints
@@ -361,7 +1057,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Imbalance summary by rack
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_imbalance_summary AS
         SELECT
             site_id,
@@ -378,7 +1074,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Pending balancing actions
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_pending_balancing_actions AS
         SELECT *
         FROM fact_balancing_actions
@@ -389,7 +1085,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Latest forecast summary per site
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_forecast_summary AS
         WITH latest AS (
             SELECT
@@ -413,7 +1109,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Active insights (unresolved)
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_active_insights AS
         SELECT *
         FROM fact_insights_findings
@@ -424,7 +1120,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Insights summary by category and severity
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_insights_summary AS
         SELECT
             site_id,
@@ -438,7 +1134,7 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     # View: Site signal health overview
-    conn.execute("""
+    execute("""
         CREATE OR REPLACE VIEW v_site_signal_health AS
         SELECT
             site_id,
@@ -452,14 +1148,100 @@ def create_views(conn: duckdb.DuckDBPyConnection):
     """)
 
     logger.info("Views created successfully (including Edge Intelligence views)")
+    return timings
+
 
+def init_database(
+    full_refresh: bool = False,
+    materialize: bool = False,
+    cluster: bool = False,
+    row_group_size: Optional[int] = None,
+    workers: int = DEFAULT_LOAD_WORKERS,
+    external: Iterable[str] = (),
+    retention_days: Optional[int] = None,
+) -> duckdb.DuckDBPyConnection:
+    """
+    Initialize the database in place and load all data.
 
-def init_database() -> duckdb.DuckDBPyConnection:
-    """Initialize database and load all data."""
-    conn = get_connection()
-    load_data(conn)
+    Refused once snapshots are published; use ``build_snapshot`` (or the
+    command line) to refresh them.
+    """
+    conn = get_connection(row_group_size=row_group_size)
+    load_data(
+        conn,
+        full_refresh=full_refresh,
+        materialize=materialize,
+        cluster=cluster,
+        workers=workers,
+        external=external,
+        retention_days=retention_days,
+    )
     return conn
 
 
 if __name__ == "__main__":
-    init_database()
+    parser = argparse.ArgumentParser(
+        description="Load BESS Analytics Parquet data into a new DuckDB snapshot and publish it"
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild every table from scratch instead of appending new rows",
+    )
+    parser.add_argument(
+        "--materialize",
+        action="store_true",
+        help="Serve the heavy daily aggregate views from incrementally refreshed tables",
+    )
+    parser.add_argument(
+        "--cluster",
+        action="store_true",
+        help="Write fact tables sorted by site, tag and time for zone-map pruning",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=None,
+        help="Rows per row group for tables written by this load (DuckDB default: 122880)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_LOAD_WORKERS,
+        help="Number of tables to load concurrently",
+    )
+    parser.add_argument(
+        "--external",
+        nargs="*",
+        metavar="TABLE",
+        default=None,
+        help="Expose tables as views over their Parquet files instead of copying them "
+        "(all append-only fact tables if no names are given)",
+    )
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=None,
+        help="Keep raw 1-minute telemetry for this many days; older history is served "
+        "from the 15-minute and hourly tiers",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=DEFAULT_KEEP_SNAPSHOTS,
+        help="Number of snapshots to keep on disk",
+    )
+    args = parser.parse_args()
+    if args.external is not None and not args.external:
+        args.external = list(WATERMARK_COLUMNS)
+    # Readers keep serving the live snapshot until the new one is validated and published
+    build_snapshot(
+        keep=args.keep,
+        full_refresh=args.full_refresh,
+        materialize=args.materialize,
+        cluster=args.cluster,
+        row_group_size=args.row_group_size,
+        workers=args.workers,
+        external=args.external or (),
+        retention_days=args.retention_days,
+    )
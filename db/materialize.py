@@ -0,0 +1,179 @@
+"""
+BESS Analytics - Materialized Analytical Views
+
+The telemetry-heavy daily aggregates behind the portfolio and SLA endpoints can
+be stored as tables keyed by (site_id, date). Each refresh recomputes only the
+days at or after the table's last refresh watermark, and the plain views remain
+available as the fallback when materialization is disabled.
+"""
+
+import duckdb
+from loguru import logger
+
+# Daily aggregates keyed by (site_id, date). ``daily`` is evaluated with a row
+# filter on ``ts_column``; ``rollup`` shapes the daily rows into the public view.
+MATERIALIZED_VIEWS = {
+    "v_site_availability": {
+        "table": "mv_site_availability",
+        "source": "fact_telemetry",
+        "ts_column": "ts",
+        "daily": """
+            WITH hourly_status AS (
+                SELECT
+                    site_id,
+                    DATE_TRUNC('hour', ts) as hour,
+                    AVG(CASE WHEN tag = 'controller_status' THEN value ELSE NULL END) as avg_status
+                FROM fact_telemetry
+                WHERE {filter}
+                GROUP BY site_id, DATE_TRUNC('hour', ts)
+            )
+            SELECT
+                site_id,
+                DATE_TRUNC('day', hour) as date,
+                AVG(avg_status) * 100 as availability_pct,
+                COUNT(*) as hours_measured
+            FROM hourly_status
+            GROUP BY site_id, DATE_TRUNC('day', hour)
+        """,
+        "rollup": "SELECT * FROM {daily}",
+    },
+    "v_dispatch_compliance": {
+        "table": "mv_dispatch_compliance",
+        "source": "fact_dispatch",
+        "ts_column": "ts",
+        "daily": """
+            SELECT
+                site_id,
+                DATE_TRUNC('day', ts) as date,
+                COUNT(*) as dispatch_count,
+                AVG(CASE
+                    WHEN command_kw = 0 THEN 100
+                    ELSE LEAST(100, (actual_kw / NULLIF(command_kw, 0)) * 100)
+                END) as compliance_pct,
+                SUM(ABS(command_kw - actual_kw)) / 1000 as total_deviation_mw
+            FROM fact_dispatch
+            WHERE {filter}
+            GROUP BY site_id, DATE_TRUNC('day', ts)
+        """,
+        "rollup": "SELECT * FROM {daily}",
+    },
+    "v_battery_health": {
+        "table": "mv_battery_health",
+        "source": "fact_telemetry_wide",
+        "ts_column": "ts",
+        "daily": """
+            SELECT
+                site_id,
+                DATE_TRUNC('day', ts) as date,
+                AVG(soh_pct) as avg_soh,
+                AVG(soc_pct) as avg_soc,
+                AVG(temp_c_avg) as avg_temp,
+                MAX(temp_c_max) as max_temp,
+                MAX(cycle_count) as cycle_count
+            FROM fact_telemetry_wide
+            WHERE COALESCE(soh_pct, soc_pct, temp_c_avg, temp_c_max, cycle_count) IS NOT NULL
+            AND {filter}
+            GROUP BY site_id, DATE_TRUNC('day', ts)
+        """,
+        "rollup": "SELECT * FROM {daily}",
+    },
+    "v_data_quality_daily": {
+        "table": "mv_data_quality_daily",
+        "source": "fact_data_quality",
+        "ts_column": "ts_hour",
+        "daily": """
+            SELECT
+                site_id,
+                DATE_TRUNC('day', ts_hour) as date,
+                AVG(completeness_pct) as avg_completeness,
+                MIN(completeness_pct) as min_completeness,
+                SUM(missing_tags_count) as total_missing_tags
+            FROM fact_data_quality
+            WHERE {filter}
+            GROUP BY site_id, DATE_TRUNC('day', ts_hour)
+        """,
+        "rollup": "SELECT * FROM {daily}",
+    },
+    # Response time is reported per site, so the daily table keeps sums and
+    # counts that roll up to the same average as the raw data.
+    "v_response_time": {
+        "table": "mv_response_time",
+        "source": "fact_telemetry",
+        "ts_column": "ts",
+        "daily": """
+            SELECT
+                site_id,
+                DATE_TRUNC('day', ts) as date,
+                SUM(value) as latency_ms_sum,
+                COUNT(value) as sample_count
+            FROM fact_telemetry
+            WHERE tag = 'comms_latency_ms'
+            AND {filter}
+            GROUP BY site_id, DATE_TRUNC('day', ts)
+        """,
+        "rollup": """
+            SELECT
+                site_id,
+                SUM(latency_ms_sum) / SUM(sample_count) / 1000.0 as avg_response_sec
+            FROM {daily}
+            GROUP BY site_id
+        """,
+    },
+}
+
+
+def create_aggregate_view(conn: duckdb.DuckDBPyConnection, view: str, materialized: bool = False):
+    """Create one aggregate view, over its materialized table or the live facts."""
+    spec = MATERIALIZED_VIEWS[view]
+    if materialized:
+        daily = spec["table"]
+    else:
+        daily = "(" + spec["daily"].format(filter="TRUE") + ")"
+    conn.execute(f"CREATE OR REPLACE VIEW {view} AS " + spec["rollup"].format(daily=daily))
+
+
+def refresh_materialized_views(conn: duckdb.DuckDBPyConnection, full_refresh: bool = False):
+    """
+    Bring every materialized table up to date with its source fact table.
+
+    Each table remembers the source high-water mark it was built from. Days at
+    or after that mark are deleted and recomputed, as are the days of sites
+    that received late rows; other days are untouched.
+    """
+    from db.loader import get_watermark, range_filter, refresh_ranges, table_exists, view_exists
+
+    logger.info("Refreshing materialized views...")
+
+    for spec in MATERIALIZED_VIEWS.values():
+        table = spec["table"]
+        source = spec["source"]
+        column = spec["ts_column"]
+
+        if not (table_exists(conn, source) or view_exists(conn, source)):
+            continue
+
+        source_watermark = get_watermark(conn, source)
+        built_from = get_watermark(conn, table) if table_exists(conn, table) else None
+
+        if full_refresh or built_from is None:
+            conn.execute(f"""
+                CREATE OR REPLACE TABLE {table} AS
+                {spec["daily"].format(filter="TRUE")}
+                ORDER BY site_id, date
+            """)
+            logger.info(f"  Built {table}")
+        else:
+            ranges = refresh_ranges(conn, source, table, "1 day")
+            if not ranges:
+                continue
+            for start, end, site_ids in ranges:
+                filter_sql, params = range_filter("date", start, end, site_ids)
+                conn.execute(f"DELETE FROM {table} WHERE {filter_sql}", params)
+                filter_sql, params = range_filter(column, start, end, site_ids)
+                conn.execute(f"INSERT INTO {table} " + spec["daily"].format(filter=filter_sql), params)
+            logger.info(f"  Refreshed {table} from {ranges[0][0].date()}")
+
+        conn.execute(
+            "INSERT OR REPLACE INTO _load_watermarks VALUES (?, ?, ?, now())",
+            [table, column, source_watermark],
+        )
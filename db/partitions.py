@@ -0,0 +1,119 @@
+"""
+BESS Analytics - Partitioned Parquet Layout
+
+Writes and locates hive-partitioned fact data (``<table>/site_id=.../date=.../*.parquet``)
+so that site and day filters prune whole files instead of scanning one monolithic file.
+"""
+
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+import pandas as pd
+
+# Hive partition columns per table. ``date`` is derived from ``ts`` when writing
+# and dropped again when the files are loaded into the table.
+PARTITION_COLUMNS = {
+    "fact_telemetry": ["site_id", "date"],
+}
+DERIVED_PARTITION_COLUMNS = {"date"}
+
+
+def partitioned_view_name(table: str) -> str:
+    """Name of the view that exposes a table's partitioned files."""
+    return f"{table}_partitioned"
+
+
+def is_partition_file(path: Path) -> bool:
+    """Check whether a file lives under a ``key=value`` partition directory."""
+    return any("=" in part for part in path.parent.parts)
+
+
+def clear_table_files(table: str, data_dir: Path):
+    """Delete a table's source files: ``<table>.parquet`` and everything under ``<table>/``."""
+    (data_dir / f"{table}.parquet").unlink(missing_ok=True)
+    shutil.rmtree(data_dir / table, ignore_errors=True)
+
+
+def write_table_batch(df: pd.DataFrame, table: str, data_dir: Path, replace: bool = False) -> Path:
+    """
+    Write a batch of rows into ``data_dir/<table>/``.
+
+    Partitioned tables are written in hive layout; other tables get a single
+    uniquely named micro-batch file that the loader will pick up on its next run.
+    With ``replace`` the batch is the table's full history: its existing files,
+    monolithic or partitioned, are deleted first so reruns do not duplicate rows.
+    """
+    table_dir = data_dir / table
+    if replace:
+        clear_table_files(table, data_dir)
+    table_dir.mkdir(parents=True, exist_ok=True)
+
+    if table in PARTITION_COLUMNS:
+        df = df.copy()
+        df["date"] = pd.to_datetime(df["ts"]).dt.strftime("%Y-%m-%d")
+        df.to_parquet(table_dir, partition_cols=PARTITION_COLUMNS[table], index=False)
+    else:
+        df.to_parquet(table_dir / f"batch-{uuid.uuid4().hex}.parquet", index=False)
+
+    return table_dir
+
+
+def create_partitioned_views(conn: duckdb.DuckDBPyConnection, data_dir: Path):
+    """
+    Expose each partitioned table's files as a hive-partitioned view.
+
+    Rows not yet in hive layout (a monolithic ``<table>.parquet`` or plain
+    micro-batches) are unioned in with their partition columns derived, so the
+    view always holds the table's full history. Like the loaded table, the
+    view keeps one row per ``NATURAL_KEYS`` entry, from the first file in path
+    order. The partition columns are part of the dedup window, so site and
+    day filters still prune files through it.
+    """
+    from db.loader import NATURAL_KEYS
+
+    for table in PARTITION_COLUMNS:
+        table_dir = data_dir / table
+        files = sorted(table_dir.rglob("*.parquet")) if table_dir.is_dir() else []
+        if not any(is_partition_file(f) for f in files):
+            conn.execute(f"DROP VIEW IF EXISTS {partitioned_view_name(table)}")
+            continue
+
+        hive_glob = "/".join(f"{c}=*" for c in PARTITION_COLUMNS[table])
+        selects = [
+            f"SELECT * FROM read_parquet('{table_dir}/{hive_glob}/*.parquet', "
+            "hive_partitioning = true, filename = true)"
+        ]
+        plain = [f for f in files if not is_partition_file(f)]
+        monolithic = data_dir / f"{table}.parquet"
+        if monolithic.exists():
+            plain.insert(0, monolithic)
+        if plain:
+            file_list = ", ".join(f"'{f}'" for f in plain)
+            selects.append(
+                f"SELECT *, CAST(ts AS DATE) AS date FROM read_parquet([{file_list}], filename = true)"
+            )
+
+        window = list(dict.fromkeys(PARTITION_COLUMNS[table] + NATURAL_KEYS[table]))
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW {partitioned_view_name(table)} AS
+            SELECT * EXCLUDE (filename)
+            FROM ({" UNION ALL BY NAME ".join(selects)})
+            QUALIFY row_number() OVER (PARTITION BY {", ".join(window)} ORDER BY filename) = 1
+        """)
+
+
+def partitioned_source(conn: duckdb.DuckDBPyConnection, table: str) -> Optional[str]:
+    """
+    Get the partitioned view for a table, if the loader created one.
+
+    Queries against the view should filter on the partition columns
+    (e.g. ``site_id`` and ``date``) so DuckDB can skip unrelated files.
+    """
+    view = partitioned_view_name(table)
+    exists = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_views() WHERE view_name = ?", [view]
+    ).fetchone()[0]
+    return view if exists else None
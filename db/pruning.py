@@ -0,0 +1,132 @@
+"""
+BESS Analytics - Zone-Map Pruning Report
+
+Estimates how many row groups DuckDB can skip for the standard dashboard
+queries, using the per-row-group min/max statistics from ``pragma_storage_info``.
+Run after a load with ``python -m db.pruning`` to compare clustered and
+unclustered layouts.
+"""
+
+import re
+from datetime import timedelta
+from typing import Optional
+
+import duckdb
+
+STATS_PATTERN = re.compile(r"Min: (.*?), Max: (.*?)(?:, Has Unicode|\])")
+
+# Standard dashboard access patterns: table plus a range predicate per column.
+# Timestamps are given as offsets back from the table's latest ts.
+STANDARD_QUERIES = [
+    {
+        "name": "Historian: one site, one tag, last day",
+        "table": "fact_telemetry",
+        "site_id": "SITE001",
+        "tag": "soc_pct",
+        "window": timedelta(days=1),
+    },
+    {
+        "name": "Telemetry API: one site, last 7 days",
+        "table": "fact_telemetry",
+        "site_id": "SITE002",
+        "window": timedelta(days=7),
+    },
+    {
+        "name": "Real-time ops: all sites, last 2 hours",
+        "table": "fact_telemetry",
+        "window": timedelta(hours=2),
+    },
+    {
+        "name": "Wide telemetry: one site, last day",
+        "table": "fact_telemetry_wide",
+        "site_id": "SITE001",
+        "window": timedelta(days=1),
+    },
+    {
+        "name": "Dispatch: one site, last day",
+        "table": "fact_dispatch",
+        "site_id": "SITE003",
+        "window": timedelta(days=1),
+    },
+    {
+        "name": "Corrected signals: one site, last day",
+        "table": "fact_corrected_signals",
+        "site_id": "SITE001",
+        "window": timedelta(days=1),
+    },
+]
+
+
+def _row_group_ranges(conn: duckdb.DuckDBPyConnection, table: str, column: str) -> dict[int, tuple]:
+    """Min/max of a column per row group, parsed from the storage statistics."""
+    ranges = {}
+    rows = conn.execute(f"""
+        SELECT row_group_id, stats
+        FROM pragma_storage_info('{table}')
+        WHERE column_name = ? AND segment_type <> 'VALIDITY'
+    """, [column]).fetchall()
+    for row_group_id, stats in rows:
+        match = STATS_PATTERN.search(stats or "")
+        if not match:
+            continue
+        low, high = match.groups()
+        current = ranges.get(row_group_id)
+        if current:
+            low, high = min(low, current[0]), max(high, current[1])
+        ranges[row_group_id] = (low, high)
+    return ranges
+
+
+def _overlaps(bounds: Optional[tuple], low: str, high: str) -> bool:
+    # Missing statistics mean the row group cannot be skipped
+    return bounds is None or not (bounds[1] < low or bounds[0] > high)
+
+
+def pruning_report(conn: duckdb.DuckDBPyConnection) -> list[dict]:
+    """
+    Report row groups scanned versus skippable for each standard query.
+
+    Equality predicates and ISO-formatted timestamp ranges are compared against
+    the zone-map strings directly, which matches DuckDB's ordering for both.
+    """
+    report = []
+    for query in STANDARD_QUERIES:
+        table = query["table"]
+        exists = conn.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [table]
+        ).fetchone()[0]
+        if not exists:
+            continue
+
+        latest = conn.execute(f"SELECT MAX(ts) FROM {table}").fetchone()[0]
+        predicates = {"ts": (str(latest - query["window"]), str(latest))}
+        for column in ("site_id", "tag"):
+            if column in query:
+                predicates[column] = (query[column], query[column])
+
+        ranges = {column: _row_group_ranges(conn, table, column) for column in predicates}
+        row_groups = sorted(set().union(*[r.keys() for r in ranges.values()]))
+        scanned = [
+            rg for rg in row_groups
+            if all(_overlaps(ranges[c].get(rg), low, high) for c, (low, high) in predicates.items())
+        ]
+
+        report.append({
+            "query": query["name"],
+            "table": table,
+            "row_groups": len(row_groups),
+            "row_groups_scanned": len(scanned),
+            "pruned_pct": round(100 * (1 - len(scanned) / len(row_groups)), 1) if row_groups else 0.0,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    from db.snapshot import resolve_db_path
+
+    conn = duckdb.connect(str(resolve_db_path()), read_only=True)
+    print(f"{'Query':<45} {'Table':<24} {'Scanned':>12} {'Pruned':>8}")
+    for row in pruning_report(conn):
+        scanned = f"{row['row_groups_scanned']}/{row['row_groups']}"
+        print(f"{row['query']:<45} {row['table']:<24} {scanned:>12} {row['pruned_pct']:>7}%")
+    conn.close()
@@ -0,0 +1,137 @@
+"""
+BESS Analytics - Load Performance Reports
+
+Every ``load_data`` run writes a JSON report to ``data/load_reports/`` with,
+per base table, the load mode, wall time, rows, bytes read and the process
+peak RSS when the table finished; the creation time of each analytical view;
+the time of each derived stage; and the total.
+
+Base tables load concurrently and share one process, so the per-table
+``process_peak_rss_mb`` is the process-wide high-water mark at that point,
+not memory used by the table itself.
+
+Compare two reports to spot loader regressions across releases or data growth:
+
+    python -m db.report data/load_reports/load-A.json data/load_reports/load-B.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Relative slowdown above which a comparison row is flagged
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def timed(timings: dict, name: str):
+    """Record the wall time of a block, in seconds, under ``timings[name]``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 4)
+
+
+def write_report(report: dict, directory: Path) -> Path:
+    """Write a load report as ``load-<timestamp>.json`` and return its path."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"load-{datetime.now():%Y%m%dT%H%M%S%f}.json"
+    path.write_text(json.dumps(report, indent=2, default=str))
+    return path
+
+
+def compare_reports(old: dict, new: dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> list[dict]:
+    """
+    Diff two load reports.
+
+    Returns one row per table, view, stage and the total, with old and new seconds,
+    the relative change, and whether it exceeds ``threshold``. Table rows also
+    carry the row and byte counts, so slowdowns can be told apart from growth.
+    """
+
+    def row(kind: str, name: str, before: Optional[float], after: Optional[float], **extra) -> dict:
+        change = (after - before) / before if before and after is not None else None
+        return {
+            "kind": kind,
+            "name": name,
+            "seconds_before": before,
+            "seconds_after": after,
+            "change": round(change, 3) if change is not None else None,
+            "regression": change is not None and change > threshold,
+            **extra,
+        }
+
+    rows = []
+    old_tables, new_tables = old.get("tables", {}), new.get("tables", {})
+    for table in sorted(set(old_tables) | set(new_tables)):
+        before, after = old_tables.get(table, {}), new_tables.get(table, {})
+        rows.append(row(
+            "table", table, before.get("seconds"), after.get("seconds"),
+            rows_before=before.get("rows"), rows_after=after.get("rows"),
+            bytes_before=before.get("bytes_read"), bytes_after=after.get("bytes_read"),
+        ))
+    old_views, new_views = old.get("views", {}), new.get("views", {})
+    for view in sorted(set(old_views) | set(new_views)):
+        rows.append(row("view", view, old_views.get(view), new_views.get(view)))
+    old_stages, new_stages = old.get("stages", {}), new.get("stages", {})
+    for stage in list(dict.fromkeys([*old_stages, *new_stages])):
+        rows.append(row("stage", stage, old_stages.get(stage), new_stages.get(stage)))
+    rows.append(row(
+        "total", "total", old.get("total_seconds"), new.get("total_seconds"),
+        peak_rss_mb_before=old.get("peak_rss_mb"), peak_rss_mb_after=new.get("peak_rss_mb"),
+    ))
+    return rows
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    return f"{seconds:.3f}" if seconds is not None else "-"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two BESS Analytics load reports")
+    parser.add_argument("old", type=Path, help="Baseline report")
+    parser.add_argument("new", type=Path, help="Report to compare against the baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="Relative slowdown flagged as a regression (0.2 = 20%%)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the comparison as JSON")
+    args = parser.parse_args()
+
+    rows = compare_reports(
+        json.loads(args.old.read_text()), json.loads(args.new.read_text()), threshold=args.threshold
+    )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'':<6} {'Name':<28} {'Before (s)':>11} {'After (s)':>11} {'Change':>8}")
+        for r in rows:
+            change = f"{r['change']:+.0%}" if r["change"] is not None else "-"
+            flag = "  REGRESSION" if r["regression"] else ""
+            print(
+                f"{r['kind']:<6} {r['name']:<28} {_format_seconds(r['seconds_before']):>11} "
+                f"{_format_seconds(r['seconds_after']):>11} {change:>8}{flag}"
+            )
+    sys.exit(1 if any(r["regression"] for r in rows) else 0)
@@ -0,0 +1,201 @@
+"""
+BESS Analytics - Telemetry Retention Tiers
+
+Keeps ``fact_telemetry`` at 1-minute resolution for a limited window and
+serves older history from downsampled tiers:
+
+- ``agg_telemetry_15min``: avg/min/max/std/count per (15 min, site_id, tag)
+- ``agg_telemetry_1hour``: the same per (1 hour, site_id, tag)
+
+Tiers are refreshed from the raw rows appended by each load, before raw rows
+older than the retention window are purged. ``telemetry_tier`` picks the
+cheapest tier that can answer a query at a given resolution and start time.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import duckdb
+from loguru import logger
+
+from db.telemetry import WIDE_TABLE
+
+RAW_TABLE = "fact_telemetry"
+
+# Tables purged by ``apply_retention``. Tables derived from them can only be
+# recomputed for the history they still hold.
+RETAINED_TABLES = (RAW_TABLE, WIDE_TABLE)
+
+# Finest to coarsest. Each tier stores one row per bucket, site and tag.
+TELEMETRY_TIERS = [
+    {"table": RAW_TABLE, "minutes": 1, "bucket": "ts"},
+    {"table": "agg_telemetry_15min", "minutes": 15, "bucket": "ts_15min"},
+    {"table": "agg_telemetry_1hour", "minutes": 60, "bucket": "ts_1hour"},
+]
+
+
+def _bucket_expr(minutes: int, column: str = "ts") -> str:
+    """Expression flooring a timestamp to a tier's bucket."""
+    return f"time_bucket(INTERVAL '{minutes} minutes', {column})"
+
+
+def _tier_query(tier: dict, filter_sql: str = "TRUE") -> str:
+    """Aggregate raw telemetry into one tier's buckets."""
+    return f"""
+        SELECT
+            {_bucket_expr(tier["minutes"])} as {tier["bucket"]},
+            site_id,
+            tag,
+            AVG(value) as avg_value,
+            MIN(value) as min_value,
+            MAX(value) as max_value,
+            STDDEV_SAMP(value) as std_value,
+            COUNT(*) as sample_count
+        FROM {RAW_TABLE}
+        WHERE {filter_sql}
+        GROUP BY ALL
+    """
+
+
+def refresh_telemetry_tiers(conn: duckdb.DuckDBPyConnection, full_refresh: bool = False):
+    """
+    Build or extend the downsampled telemetry tiers.
+
+    Each tier remembers the raw high-water mark it was built from; buckets at
+    or after that mark are deleted and recomputed from the raw rows, so a
+    partially filled bucket is completed by the next load. Late rows
+    recompute only their own sites' buckets (see ``refresh_ranges``).
+    """
+    from db.loader import get_watermark, range_filter, refresh_ranges, table_exists, view_exists
+
+    if not (table_exists(conn, RAW_TABLE) or view_exists(conn, RAW_TABLE)):
+        return
+
+    source_watermark = get_watermark(conn, RAW_TABLE)
+    for tier in TELEMETRY_TIERS[1:]:
+        table, bucket = tier["table"], tier["bucket"]
+        built_from = get_watermark(conn, table) if table_exists(conn, table) else None
+
+        if full_refresh or built_from is None:
+            conn.execute(f"""
+                CREATE OR REPLACE TABLE {table} AS
+                {_tier_query(tier)}
+                ORDER BY site_id, tag, {bucket}
+            """)
+            logger.info(f"  Built {table}")
+        else:
+            ranges = refresh_ranges(conn, RAW_TABLE, table, f"{tier['minutes']} minutes")
+            if not ranges:
+                continue
+            for start, end, site_ids in ranges:
+                filter_sql, params = range_filter(bucket, start, end, site_ids)
+                conn.execute(f"DELETE FROM {table} WHERE {filter_sql}", params)
+                filter_sql, params = range_filter("ts", start, end, site_ids)
+                conn.execute(f"INSERT INTO {table} {_tier_query(tier, filter_sql)}", params)
+            logger.info(f"  Refreshed {table} from {ranges[0][0]}")
+
+        conn.execute(
+            "INSERT OR REPLACE INTO _load_watermarks VALUES (?, 'ts', ?, now())",
+            [table, source_watermark],
+        )
+
+
+def apply_retention(conn: duckdb.DuckDBPyConnection, retention_days: int):
+    """
+    Purge raw and wide telemetry older than ``retention_days`` before the watermark.
+
+    Run after the tiers are refreshed, so purged minutes are already
+    summarized. External (view-backed) telemetry is left untouched.
+    """
+    from db.loader import get_watermark, table_exists
+
+    watermark = get_watermark(conn, RAW_TABLE)
+    if watermark is None or not table_exists(conn, RAW_TABLE):
+        return
+
+    cutoff = watermark - timedelta(days=retention_days)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _retention (
+            table_name VARCHAR PRIMARY KEY,
+            retained_from TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    """)
+    for table in RETAINED_TABLES:
+        if table_exists(conn, table):
+            purged = conn.execute(f"DELETE FROM {table} WHERE ts < ?", [cutoff]).fetchone()[0]
+            if purged:
+                logger.info(f"  Purged {table}: {purged:,} rows before {cutoff}")
+    conn.execute("INSERT OR REPLACE INTO _retention VALUES (?, ?, now())", [RAW_TABLE, cutoff])
+
+
+def raw_retained_from(conn: duckdb.DuckDBPyConnection) -> Optional[datetime]:
+    """Earliest timestamp still held at raw resolution, or None if nothing was purged."""
+    try:
+        row = conn.execute(
+            "SELECT retained_from FROM _retention WHERE table_name = ?", [RAW_TABLE]
+        ).fetchone()
+    except duckdb.CatalogException:
+        return None
+    return row[0] if row else None
+
+
+def retained_bucket_start(conn: duckdb.DuckDBPyConnection, source: str, bucket: str) -> Optional[datetime]:
+    """
+    Start of the first ``bucket`` that ``source`` still holds in full.
+
+    None if ``source`` is not purged by retention or nothing was purged yet.
+    Buckets derived from ``source`` before this point cannot be rebuilt from it.
+    """
+    retained_from = raw_retained_from(conn) if source in RETAINED_TABLES else None
+    if retained_from is None:
+        return None
+    return conn.execute(f"""
+        SELECT CASE WHEN bucket_start < retained_from THEN bucket_start + INTERVAL '{bucket}' ELSE bucket_start END
+        FROM (
+            SELECT CAST(? AS TIMESTAMP) as retained_from,
+                   time_bucket(INTERVAL '{bucket}', CAST(? AS TIMESTAMP)) as bucket_start
+        )
+    """, [retained_from, retained_from]).fetchone()[0]
+
+
+def telemetry_tier(
+    conn: duckdb.DuckDBPyConnection,
+    resolution_minutes: int,
+    start: Optional[datetime] = None,
+) -> dict:
+    """
+    Pick the cheapest telemetry tier for a query.
+
+    The coarsest tier whose bucket evenly divides the requested resolution is
+    used, so hourly and daily charts never read raw minutes. Raw resolution
+    is used only when it is needed and still retained for ``start`` (no start
+    means the full history); otherwise the finest available tier is used.
+    """
+    from db.loader import table_exists
+
+    available = [
+        tier for tier in TELEMETRY_TIERS
+        if tier["table"] == RAW_TABLE or table_exists(conn, tier["table"])
+    ]
+    best = [tier for tier in available if resolution_minutes % tier["minutes"] == 0][-1]
+    if best["table"] != RAW_TABLE:
+        return best
+
+    retained_from = raw_retained_from(conn)
+    if retained_from is None or (start is not None and start >= retained_from):
+        return best
+    return available[1] if len(available) > 1 else best
+
+
+def tier_source(tier: dict) -> str:
+    """
+    FROM-clause source exposing a downsampled tier as ``ts, site_id, tag`` plus aggregates.
+
+    Averages over coarser buckets must be weighted by ``sample_count``.
+    """
+    return f"""(
+        SELECT {tier["bucket"]} as ts, site_id, tag, avg_value, min_value,
+               max_value, sample_count
+        FROM {tier["table"]}
+    )"""
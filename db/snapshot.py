@@ -0,0 +1,220 @@
+"""
+BESS Analytics - Database Snapshots
+
+Builds each refresh into a new versioned DuckDB file and publishes it by
+atomically rewriting a pointer file, so readers never see a half-loaded
+database and never contend with the loader for the file lock.
+
+Layout, next to the configured database path (``data/bess_analytics.duckdb``):
+
+    data/snapshots/bess_analytics-<timestamp>.duckdb   versioned snapshots
+    data/bess_analytics.current                        name of the live snapshot
+
+Readers call ``resolve_db_path()`` when they open a connection; connections
+already open keep querying the snapshot they started on. Snapshots are built
+by ``python -m db.loader``, the single refresh command.
+"""
+
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import duckdb
+from loguru import logger
+
+# Tables that must exist and hold rows before a snapshot is published
+REQUIRED_TABLES = ["dim_site", "dim_asset", "fact_telemetry", "fact_dispatch", "fact_settlement"]
+
+# Snapshots kept on disk after a publish (the live one plus its predecessors,
+# so that queries still running on the previous snapshot can finish)
+DEFAULT_KEEP_SNAPSHOTS = 2
+
+
+def _default_db_path() -> Path:
+    from db import loader
+
+    return loader.DB_PATH
+
+
+def snapshot_dir(db_path: Optional[Path] = None) -> Path:
+    """Directory holding the versioned snapshots of a database."""
+    db_path = Path(db_path or _default_db_path())
+    return db_path.parent / "snapshots"
+
+
+def pointer_path(db_path: Optional[Path] = None) -> Path:
+    """Pointer file naming the live snapshot of a database."""
+    db_path = Path(db_path or _default_db_path())
+    return db_path.with_suffix(".current")
+
+
+def current_snapshot(db_path: Optional[Path] = None) -> Optional[Path]:
+    """Get the live snapshot, or None if no snapshot has been published."""
+    pointer = pointer_path(db_path)
+    try:
+        name = pointer.read_text().strip()
+    except FileNotFoundError:
+        return None
+    snapshot = snapshot_dir(db_path) / name
+    return snapshot if name and snapshot.exists() else None
+
+
+def resolve_db_path(db_path: Optional[Path] = None) -> Path:
+    """Path readers should open: the live snapshot, else the database itself."""
+    return current_snapshot(db_path) or Path(db_path or _default_db_path())
+
+
+def validate_snapshot(conn: duckdb.DuckDBPyConnection):
+    """
+    Check that a freshly built snapshot is complete enough to serve.
+
+    Every required table must hold rows and every view must bind, so a load
+    that failed half-way or left a view referencing a missing table is never
+    published.
+    """
+    for table in REQUIRED_TABLES:
+        try:
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        except duckdb.CatalogException:
+            raise RuntimeError(f"Snapshot is missing required table {table}")
+        if count == 0:
+            raise RuntimeError(f"Snapshot table {table} is empty")
+
+    views = conn.execute(
+        "SELECT view_name FROM duckdb_views() WHERE NOT internal AND database_name = current_database()"
+    ).fetchall()
+    for (view,) in views:
+        try:
+            conn.execute(f"SELECT * FROM {view} LIMIT 0")
+        except duckdb.Error as e:
+            raise RuntimeError(f"Snapshot view {view} is invalid: {e}")
+
+
+def publish_snapshot(snapshot: Path, db_path: Optional[Path] = None):
+    """Atomically point readers at a snapshot."""
+    pointer = pointer_path(db_path)
+    staging = pointer.with_suffix(".current.tmp")
+    staging.write_text(snapshot.name)
+    os.replace(staging, pointer)
+    logger.info(f"Published snapshot {snapshot.name}")
+
+
+def prune_snapshots(db_path: Optional[Path] = None, keep: int = DEFAULT_KEEP_SNAPSHOTS):
+    """Delete all but the newest ``keep`` snapshots, never the live one."""
+    live = current_snapshot(db_path)
+    snapshots = sorted(snapshot_dir(db_path).glob("*.duckdb"), reverse=True)
+    for snapshot in snapshots[max(1, keep):]:
+        if snapshot != live:
+            snapshot.unlink()
+            wal = snapshot.with_suffix(".duckdb.wal")
+            if wal.exists():
+                wal.unlink()
+            logger.info(f"Removed snapshot {snapshot.name}")
+
+
+def _copy_database(source: Path, target: Path):
+    shutil.copyfile(source, target)
+    wal = source.with_suffix(".duckdb.wal")
+    if wal.exists():
+        shutil.copyfile(wal, target.with_suffix(".duckdb.wal"))
+
+
+def _snapshot_name(db_path: Path) -> Path:
+    return snapshot_dir(db_path) / f"{db_path.stem}-{datetime.now():%Y%m%dT%H%M%S%f}.duckdb"
+
+
+def build_snapshot(
+    db_path: Optional[Path] = None,
+    keep: int = DEFAULT_KEEP_SNAPSHOTS,
+    full_refresh: bool = False,
+    materialize: bool = False,
+    cluster: bool = False,
+    row_group_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    external: Iterable[str] = (),
+    retention_days: Optional[int] = None,
+) -> Path:
+    """
+    Build, validate and publish a new snapshot.
+
+    The new snapshot starts as a copy of the live one (or of the database
+    file, on first use) so that incremental loading still applies; a full
+    refresh starts from an empty file. The live snapshot is untouched until
+    the new one has loaded, validated and been checkpointed.
+    """
+    from db.loader import DEFAULT_LOAD_WORKERS, get_connection, load_data
+
+    db_path = Path(db_path or _default_db_path())
+    directory = snapshot_dir(db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    snapshot = _snapshot_name(db_path)
+
+    base = resolve_db_path(db_path)
+    if not full_refresh and base.exists():
+        _copy_database(base, snapshot)
+
+    logger.info(f"Building snapshot {snapshot.name}...")
+    conn = get_connection(snapshot, row_group_size=row_group_size)
+    try:
+        load_data(
+            conn,
+            full_refresh=full_refresh,
+            materialize=materialize,
+            cluster=cluster,
+            workers=workers or DEFAULT_LOAD_WORKERS,
+            external=external,
+            retention_days=retention_days,
+        )
+        validate_snapshot(conn)
+        conn.execute("CHECKPOINT")
+    except Exception:
+        conn.close()
+        snapshot.unlink(missing_ok=True)
+        raise
+    conn.close()
+
+    publish_snapshot(snapshot, db_path)
+    prune_snapshots(db_path, keep=keep)
+    return snapshot
+
+
+def publish_file_views(db_path: Optional[Path] = None, keep: int = DEFAULT_KEEP_SNAPSHOTS) -> list[str]:
+    """
+    Re-point the live database's Parquet-backed views at the files now on disk.
+
+    Run after files are rewritten outside a load (``db.compact``). With
+    published snapshots the change goes into a new snapshot copied from the
+    live one; otherwise the database file is updated in place. Returns the
+    external tables whose views changed.
+    """
+    from db.loader import get_connection, refresh_file_views
+
+    db_path = Path(db_path or _default_db_path())
+    live = current_snapshot(db_path)
+    if live is None:
+        if not db_path.exists():
+            return []
+        conn = get_connection(db_path)
+        try:
+            return refresh_file_views(conn)
+        finally:
+            conn.close()
+
+    snapshot = _snapshot_name(db_path)
+    _copy_database(live, snapshot)
+    conn = get_connection(snapshot)
+    try:
+        refreshed = refresh_file_views(conn)
+        validate_snapshot(conn)
+        conn.execute("CHECKPOINT")
+    except Exception:
+        conn.close()
+        snapshot.unlink(missing_ok=True)
+        raise
+    conn.close()
+
+    publish_snapshot(snapshot, db_path)
+    prune_snapshots(db_path, keep=keep)
+    return refreshed
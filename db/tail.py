@@ -0,0 +1,93 @@
+"""
+BESS Analytics - Telemetry Ingest Tail
+
+Follows the Bronze telemetry micro-batches (``data/bronze/telemetry/*.jsonl``)
+as controllers and BMSs deliver them, returning only readings written since
+the previous poll. New files are picked up and files still being appended to
+are read from where the last poll stopped, so live views can be fed straight
+from ingest instead of re-querying DuckDB.
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
+def bronze_telemetry_dir() -> Path:
+    """Directory the raw telemetry micro-batches are delivered to."""
+    from db.loader import DATA_DIR
+
+    return DATA_DIR / "bronze" / "telemetry"
+
+
+def _reading(line: str) -> dict:
+    record = json.loads(line)
+    return {
+        "site_id": record["site"],
+        "tag": record["tag"],
+        "ts": record["timestamp"],
+        "value": record["value"],
+    }
+
+
+class TelemetryTail:
+    """Incremental reader of the Bronze telemetry micro-batch files."""
+
+    def __init__(self, directory: Optional[Path] = None, from_start: bool = False):
+        """
+        Tail ``directory`` (default: the Bronze telemetry directory).
+
+        Unless ``from_start`` is set, data already on disk is skipped and only
+        readings written after construction are returned.
+        """
+        self.directory = directory or bronze_telemetry_dir()
+        self._offsets: dict[Path, int] = {}
+        if not from_start:
+            for path in self._files():
+                self._offsets[path] = path.stat().st_size
+
+    def _files(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.jsonl"))
+
+    def poll(self) -> list[dict]:
+        """New ``site_id``/``tag``/``ts``/``value`` readings since the last poll."""
+        readings = []
+        for path in self._files():
+            offset = self._offsets.get(path, 0)
+            size = path.stat().st_size
+            if size < offset:
+                # The file was rewritten; read it again from the start
+                offset = 0
+            if size == offset:
+                continue
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+            lines = data.split(b"\n")
+            # The last segment may be a record still being written
+            tail = lines.pop()
+            for line in lines:
+                offset += len(line) + 1
+                readings.extend(self._parse(path, line))
+            if tail:
+                try:
+                    readings.append(_reading(tail.decode()))
+                    offset += len(tail)
+                except (ValueError, KeyError):
+                    pass
+            self._offsets[path] = offset
+        return readings
+
+    def _parse(self, path: Path, line: bytes) -> list[dict]:
+        if not line.strip():
+            return []
+        try:
+            return [_reading(line.decode())]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Skipped malformed telemetry record in {path.name}: {e}")
+            return []
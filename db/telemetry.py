@@ -0,0 +1,155 @@
+"""
+BESS Analytics - Derived Telemetry Tables
+
+Maintains two tables derived from the long-format ``fact_telemetry``:
+- ``fact_telemetry_wide``: one row per (site_id, ts) and one DOUBLE column per
+  registered tag, so multi-tag reads scan only the columns they need
+- ``cur_telemetry``: the latest value and timestamp per (site_id, asset_id, tag),
+  so latest-value lookups cost O(sites x tags) instead of O(history)
+"""
+
+import duckdb
+from loguru import logger
+
+# Tag registry: every tag emitted by the controller and BMS feeds
+CONTROLLER_TAGS = [
+    "p_kw",
+    "q_kvar",
+    "v_pu",
+    "f_hz",
+    "controller_status",
+    "comms_latency_ms",
+    "comms_drop_rate",
+    "inverter_efficiency_pct",
+    "cooling_status",
+]
+BATTERY_TAGS = [
+    "soc_pct",
+    "soh_pct",
+    "temp_c_avg",
+    "temp_c_max",
+    "voltage_v",
+    "current_a",
+    "cycle_count",
+]
+TELEMETRY_TAGS = CONTROLLER_TAGS + BATTERY_TAGS
+
+WIDE_TABLE = "fact_telemetry_wide"
+CURRENT_TABLE = "cur_telemetry"
+
+
+def _pivot_query(filter_sql: str = "TRUE") -> str:
+    """Pivot long-format telemetry rows into one column per registered tag."""
+    columns = ",\n".join(
+        f"CAST(MAX(value) FILTER (WHERE tag = '{tag}') AS DOUBLE) as {tag}"
+        for tag in TELEMETRY_TAGS
+    )
+    return f"""
+        SELECT
+            site_id,
+            ts,
+            {columns}
+        FROM fact_telemetry
+        WHERE {filter_sql}
+        GROUP BY site_id, ts
+    """
+
+
+def refresh_wide_telemetry(conn: duckdb.DuckDBPyConnection, full_refresh: bool = False):
+    """
+    Build or extend the wide telemetry table.
+
+    The table remembers the ``fact_telemetry`` high-water mark it was built
+    from; later refreshes re-pivot only the minutes from that mark on, and
+    the minutes of sites that received late rows (see ``refresh_ranges``).
+    """
+    from db.loader import get_watermark, range_filter, refresh_ranges, table_exists, view_exists
+
+    if not (table_exists(conn, "fact_telemetry") or view_exists(conn, "fact_telemetry")):
+        return
+
+    source_watermark = get_watermark(conn, "fact_telemetry")
+    built_from = get_watermark(conn, WIDE_TABLE) if table_exists(conn, WIDE_TABLE) else None
+
+    if full_refresh or built_from is None:
+        conn.execute(f"""
+            CREATE OR REPLACE TABLE {WIDE_TABLE} AS
+            {_pivot_query()}
+            ORDER BY site_id, ts
+        """)
+        logger.info(f"  Built {WIDE_TABLE}")
+    else:
+        ranges = refresh_ranges(conn, "fact_telemetry", WIDE_TABLE)
+        if not ranges:
+            return
+        appended = 0
+        for start, end, site_ids in ranges:
+            filter_sql, params = range_filter("ts", start, end, site_ids)
+            conn.execute(f"DELETE FROM {WIDE_TABLE} WHERE {filter_sql}", params)
+            appended += conn.execute(
+                f"INSERT INTO {WIDE_TABLE} {_pivot_query(filter_sql)} ORDER BY site_id, ts",
+                params,
+            ).fetchone()[0]
+        logger.info(f"  Refreshed {WIDE_TABLE} from {ranges[0][0]}: {appended:,} rows")
+
+    conn.execute(
+        "INSERT OR REPLACE INTO _load_watermarks VALUES (?, 'ts', ?, now())",
+        [WIDE_TABLE, source_watermark],
+    )
+
+
+def refresh_current_telemetry(conn: duckdb.DuckDBPyConnection, full_refresh: bool = False):
+    """
+    Upsert the latest value per (site_id, asset_id, tag) into ``cur_telemetry``.
+
+    Only rows from the table's watermark on are scanned, and an existing entry
+    is replaced only by a reading that is at least as recent.
+    """
+    from db.loader import get_watermark, range_filter, refresh_ranges, table_exists, view_exists
+
+    if not (table_exists(conn, "fact_telemetry") or view_exists(conn, "fact_telemetry")):
+        return
+
+    source_watermark = get_watermark(conn, "fact_telemetry")
+    built_from = get_watermark(conn, CURRENT_TABLE) if table_exists(conn, CURRENT_TABLE) else None
+
+    if full_refresh or built_from is None:
+        conn.execute(f"""
+            CREATE OR REPLACE TABLE {CURRENT_TABLE} (
+                site_id VARCHAR,
+                asset_id VARCHAR,
+                tag VARCHAR,
+                value DOUBLE,
+                ts TIMESTAMP,
+                PRIMARY KEY (site_id, asset_id, tag)
+            )
+        """)
+        filter_sql, params = "TRUE", []
+    else:
+        ranges = refresh_ranges(conn, "fact_telemetry", CURRENT_TABLE)
+        if not ranges:
+            return
+        filters = [range_filter("ts", *r) for r in ranges]
+        filter_sql = " OR ".join(f"({f})" for f, _ in filters)
+        params = [p for _, range_params in filters for p in range_params]
+
+    conn.execute(f"""
+        INSERT INTO {CURRENT_TABLE}
+        SELECT site_id, asset_id, tag, arg_max(value, ts), MAX(ts)
+        FROM fact_telemetry
+        WHERE {filter_sql}
+        GROUP BY site_id, asset_id, tag
+        ON CONFLICT DO UPDATE SET value = EXCLUDED.value, ts = EXCLUDED.ts
+        WHERE EXCLUDED.ts >= {CURRENT_TABLE}.ts
+    """, params)
+    logger.info(f"  Updated {CURRENT_TABLE}")
+
+    conn.execute(
+        "INSERT OR REPLACE INTO _load_watermarks VALUES (?, 'ts', ?, now())",
+        [CURRENT_TABLE, source_watermark],
+    )
+
+
+def has_wide_columns(tags: list[str]) -> bool:
+    """Check whether every tag has a column in the wide table."""
+    return all(tag in TELEMETRY_TAGS for tag in tags)
@@ -0,0 +1,78 @@
+"""
+BESS Analytics - Shared test fixtures
+"""
+
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+REPO_DATA_DIR = Path(__file__).parent.parent / "data"
+
+TELEMETRY_START = datetime(2024, 3, 14)
+SITES = ["SITE001", "SITE002", "SITE003"]
+CONTROLLER_TAGS = ["p_kw", "v_pu", "controller_status", "comms_latency_ms"]
+BATTERY_TAGS = ["soc_pct", "soh_pct", "temp_c_avg", "temp_c_max", "cycle_count"]
+
+
+def make_telemetry(start: datetime, minutes: int) -> pd.DataFrame:
+    """Build a small long-format telemetry frame for every test site."""
+    rng = np.random.default_rng(0)
+    ts = [start + timedelta(minutes=m) for m in range(minutes)]
+    frames = []
+    for i, site_id in enumerate(SITES):
+        for tag in CONTROLLER_TAGS + BATTERY_TAGS:
+            asset = f"{site_id}_CTRL" if tag in CONTROLLER_TAGS else f"{site_id}_RACK01"
+            frames.append(pd.DataFrame({
+                "ts": ts,
+                "site_id": site_id,
+                "asset_id": asset,
+                "tag": tag,
+                "value": rng.normal(50 + i, 1, minutes).round(3),
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Copy the shipped Parquet files to a temp dir with two days of telemetry."""
+    import db.loader as loader
+
+    target = tmp_path / "data"
+    shutil.copytree(REPO_DATA_DIR, target, ignore=shutil.ignore_patterns("*.duckdb*"))
+    make_telemetry(TELEMETRY_START, 2 * 1440).to_parquet(target / "fact_telemetry.parquet", index=False)
+
+    monkeypatch.setattr(loader, "DATA_DIR", target)
+    monkeypatch.setattr(loader, "DB_PATH", target / "bess_analytics.duckdb")
+    return target
+
+
+@pytest.fixture
+def loaded_db(data_dir):
+    """A fully loaded DuckDB connection over the temp data dir."""
+    from db.loader import get_connection, load_data
+
+    conn = get_connection()
+    load_data(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def api_client(data_dir, monkeypatch):
+    """A FastAPI test client over a freshly loaded database file."""
+    from fastapi.testclient import TestClient
+
+    import api.main as api_main
+    from db.loader import init_database
+
+    init_database().close()
+    monkeypatch.setattr(api_main, "DB_PATH", data_dir / "bess_analytics.duckdb")
+    return TestClient(api_main.app)
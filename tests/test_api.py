@@ -0,0 +1,971 @@
+"""
+BESS Analytics - API Tests
+
+Tests for FastAPI endpoints against a small loaded database.
+"""
+
+import duckdb
+import pytest
+
+
+class TestTelemetryEndpoints:
+    """Tests for telemetry and site metric endpoints."""
+
+    def test_telemetry_returns_one_column_per_tag(self, api_client):
+        """Test that registered tags are returned as columns from the wide table."""
+        response = api_client.get(
+            "/metrics/telemetry",
+            params={"site_id": "SITE001", "tags": "soc_pct,p_kw", "resolution": "1hour"},
+        )
+        rows = response.json()
+
+        assert response.status_code == 200
+        assert len(rows) == 48
+        assert set(rows[0]) == {"ts", "p_kw", "soc_pct"}
+
+    def test_telemetry_matches_long_format_aggregation(self, api_client, data_dir):
+        """Test that wide-table reads agree with an aggregation of the raw rows."""
+        import pandas as pd
+
+        raw = pd.read_parquet(data_dir / "fact_telemetry.parquet")
+        raw = raw[(raw["site_id"] == "SITE002") & (raw["tag"] == "soh_pct")]
+        expected = raw.groupby(raw["ts"].dt.floor("D"))["value"].mean().tolist()
+
+        rows = api_client.get(
+            "/metrics/telemetry",
+            params={"site_id": "SITE002", "tags": "soh_pct", "resolution": "1day"},
+        ).json()
+
+        assert [r["soh_pct"] for r in rows] == pytest.approx(expected)
+
+    def test_date_bounded_telemetry_reads_partitions(self, data_dir, monkeypatch):
+        """Test that a date-bounded read of registered tags goes through the partitioned view."""
+        import pandas as pd
+        from fastapi.testclient import TestClient
+
+        import api.main as api_main
+        from db.loader import init_database
+        from db.partitions import partitioned_source, write_table_batch
+
+        monolithic = data_dir / "fact_telemetry.parquet"
+        write_table_batch(pd.read_parquet(monolithic), "fact_telemetry", data_dir)
+        monolithic.unlink()
+        init_database().close()
+        monkeypatch.setattr(api_main, "DB_PATH", data_dir / "bess_analytics.duckdb")
+        client = TestClient(api_main.app)
+
+        params = {"site_id": "SITE002", "tags": "soc_pct,p_kw", "resolution": "5min"}
+        unbounded = client.get("/metrics/telemetry", params=params).json()
+        sources = []
+
+        def spy(conn, table):
+            sources.append(partitioned_source(conn, table))
+            return sources[-1]
+
+        monkeypatch.setattr(api_main, "partitioned_source", spy)
+        bounded = client.get(
+            "/metrics/telemetry", params={**params, "start_date": "2024-03-15", "end_date": "2024-03-15"}
+        ).json()
+
+        assert sources == ["fact_telemetry_partitioned"]
+        assert bounded == pytest.approx(unbounded[288:])
+
+    def test_site_metrics_reports_latest_values(self, api_client, data_dir):
+        """Test that site metrics report the most recent reading per tag."""
+        import pandas as pd
+
+        raw = pd.read_parquet(data_dir / "fact_telemetry.parquet")
+        latest = raw[(raw["site_id"] == "SITE003") & (raw["tag"] == "soc_pct")].sort_values("ts").iloc[-1]
+
+        body = api_client.get("/metrics/site/SITE003").json()
+
+        assert body["current_soc_pct"] == pytest.approx(latest["value"])
+
+    def test_bulk_site_metrics_match_single_site(self, api_client):
+        """Test that /metrics/sites returns the same fields as per-site calls, for every site."""
+        bulk = api_client.get("/metrics/sites").json()
+        sites = [s["site_id"] for s in api_client.get("/sites").json()]
+
+        assert [m["site_id"] for m in bulk] == sorted(sites)
+        for metrics in bulk:
+            single = api_client.get(f"/metrics/site/{metrics['site_id']}").json()
+            assert metrics == pytest.approx(single)
+
+    def test_bulk_site_metrics_filter(self, api_client):
+        """Test that site_ids limits the bulk response, and unknown sites are a 404 per site."""
+        body = api_client.get("/metrics/sites", params={"site_ids": "SITE003,SITE001"}).json()
+
+        assert [m["site_id"] for m in body] == ["SITE001", "SITE003"]
+        assert api_client.get("/metrics/site/NOPE").status_code == 404
+
+
+class TestPortfolioKPIs:
+    """Tests for the single-pass portfolio KPI snapshot."""
+
+    def test_default_range_matches_view_definitions(self, api_client, data_dir):
+        """Test that the snapshot agrees with the KPIs computed from the analytical views."""
+        from db.snapshot import resolve_db_path
+
+        conn = duckdb.connect(str(resolve_db_path(data_dir / "bess_analytics.duckdb")), read_only=True)
+        revenue = conn.execute("""
+            SELECT SUM(revenue_gbp) FROM fact_settlement
+            WHERE date >= DATE_TRUNC('month', (SELECT MAX(date) FROM fact_settlement))
+        """).fetchone()[0]
+        availability = conn.execute("""
+            SELECT AVG(availability_pct) FROM v_site_availability
+            WHERE date >= (SELECT MAX(date) FROM v_site_availability) - INTERVAL '7 days'
+        """).fetchone()[0]
+        soh = conn.execute("""
+            SELECT AVG(avg_soh) FROM v_battery_health
+            WHERE date = (SELECT MAX(date) FROM v_battery_health)
+        """).fetchone()[0]
+        faults = conn.execute("""
+            SELECT COUNT(*) FROM fact_events
+            WHERE event_type IN ('fault', 'trip')
+            AND end_ts > (SELECT MAX(ts) FROM fact_telemetry) - INTERVAL '1 hour'
+        """).fetchone()[0]
+        conn.close()
+
+        body = api_client.get("/metrics/portfolio").json()
+
+        assert body["revenue_mtd"] == pytest.approx(revenue)
+        assert body["avg_availability_pct"] == pytest.approx(availability)
+        assert body["avg_soh_pct"] == pytest.approx(soh)
+        assert body["active_faults"] == faults
+
+    def test_date_range_is_honored(self, api_client, data_dir):
+        """Test that revenue covers exactly the requested date range."""
+        import pandas as pd
+
+        settlement = pd.read_parquet(data_dir / "fact_settlement.parquet")
+        dates = pd.to_datetime(settlement["date"])
+        start, end = dates.min() + pd.Timedelta(days=3), dates.min() + pd.Timedelta(days=9)
+        expected = settlement.loc[(dates >= start) & (dates <= end), "revenue_gbp"].sum()
+
+        body = api_client.get(
+            "/metrics/portfolio",
+            params={"start_date": start.date().isoformat(), "end_date": end.date().isoformat()},
+        ).json()
+
+        assert body["revenue_mtd"] == pytest.approx(expected)
+        assert body["revenue_mtd"] != api_client.get("/metrics/portfolio").json()["revenue_mtd"]
+
+
+class TestRevenueLossAllocation:
+    """Tests for the set-based revenue loss allocation."""
+
+    def test_allocations_sum_to_gap(self, api_client):
+        """Test that each day's positive gap is fully split across causes."""
+        rows = api_client.get("/metrics/revenue_loss").json()
+
+        assert rows
+        for row in rows:
+            allocated = (
+                row["loss_faults_gbp"] + row["loss_trips_gbp"]
+                + row["loss_data_gaps_gbp"] + row["loss_market_gbp"]
+            )
+            assert allocated == pytest.approx(max(row["revenue_gap"] or 0, 0), abs=1e-6)
+            assert min(row["loss_faults_gbp"], row["loss_trips_gbp"], row["loss_data_gaps_gbp"]) >= 0
+            assert row["loss_market_gbp"] >= -1e-6
+
+    def test_split_follows_cause_minutes(self, loaded_db):
+        """Test that operational causes share the gap in proportion to their minutes."""
+        conn = loaded_db
+        conn.execute("""
+            CREATE OR REPLACE VIEW v_revenue_loss_attribution AS
+            SELECT * FROM (VALUES
+                (DATE '2024-01-01', 'S1', 'Site 1', 1000.0, 280.0, 720.0, 360.0, 0.0, 50.0),
+                (DATE '2024-01-02', 'S1', 'Site 1', 1000.0, 900.0, 100.0, 0.0, 144.0, 100.0),
+                (DATE '2024-01-03', 'S1', 'Site 1', 1000.0, 1100.0, -100.0, 600.0, 0.0, 100.0)
+            ) t(date, site_id, site_name, forecast_revenue, actual_revenue, revenue_gap,
+                fault_minutes, trip_minutes, data_completeness)
+        """)
+        rows = conn.execute("""
+            SELECT loss_faults_gbp, loss_trips_gbp, loss_data_gaps_gbp, loss_market_gbp, loss_category
+            FROM v_revenue_loss_allocation ORDER BY date
+        """).fetchall()
+
+        # 360 fault minutes + 720 minutes without data cover 75% of the day
+        assert rows[0][:4] == pytest.approx((180.0, 0.0, 360.0, 180.0))
+        assert rows[0][4] == "Data Gaps"
+        assert rows[1][:4] == pytest.approx((0.0, 10.0, 0.0, 90.0))
+        assert rows[1][4] == "Market Conditions"
+        assert rows[2][:4] == pytest.approx((0.0, 0.0, 0.0, 0.0))
+        assert rows[2][4] == "Other"
+
+
+class TestTelemetryTiers:
+    """Tests for resolution-aware routing of telemetry reads."""
+
+    @pytest.fixture
+    def retained_client(self, data_dir, monkeypatch):
+        """A test client over a database keeping one day of raw telemetry."""
+        from fastapi.testclient import TestClient
+
+        import api.main as api_main
+        from db.loader import init_database
+
+        init_database(retention_days=1).close()
+        monkeypatch.setattr(api_main, "DB_PATH", data_dir / "bess_analytics.duckdb")
+        return TestClient(api_main.app)
+
+    def test_hourly_reads_match_raw_aggregation(self, retained_client, data_dir):
+        """Test that hourly values served from the tier equal raw hourly means."""
+        import pandas as pd
+
+        raw = pd.read_parquet(data_dir / "fact_telemetry.parquet")
+        raw = raw[(raw["site_id"] == "SITE001") & (raw["tag"] == "temp_c_avg")]
+        expected = raw.groupby(raw["ts"].dt.floor("h"))["value"].mean().tolist()
+
+        rows = retained_client.get(
+            "/metrics/telemetry",
+            params={"site_id": "SITE001", "tags": "temp_c_avg", "resolution": "1hour"},
+        ).json()
+
+        assert [r["temp_c_avg"] for r in rows] == pytest.approx(expected)
+
+    def test_purged_range_falls_back_to_finest_tier(self, retained_client):
+        """Test that minute reads of purged history are served at 15-minute resolution."""
+        rows = retained_client.get(
+            "/metrics/telemetry",
+            params={
+                "site_id": "SITE001",
+                "tags": "soc_pct",
+                "resolution": "1min",
+                "start_date": "2024-03-14",
+                "end_date": "2024-03-14",
+            },
+        ).json()
+
+        assert len(rows) == 96
+
+
+class TestConnectionPool:
+    """Tests for the shared read-only connection behind API requests."""
+
+    def test_requests_share_one_connection(self, api_client):
+        """Test that consecutive requests are served from the same pooled connection."""
+        import api.main as api_main
+
+        api_client.get("/sites")
+        conn = api_main.pool._conn
+        api_client.get("/metrics/site/SITE001")
+
+        assert conn is not None
+        assert api_main.pool._conn is conn
+        assert api_main.pool._in_use[id(conn)] == 0
+
+    def test_retired_connection_closes_after_last_cursor(self, data_dir):
+        """Test that a superseded snapshot stays readable until its cursors are released."""
+        from api.pool import ConnectionPool
+        from db.snapshot import build_snapshot, resolve_db_path
+
+        first = build_snapshot()
+        pool = ConnectionPool(resolve_db_path)
+        cursor = pool.cursor()
+        old = pool._conn
+
+        second = build_snapshot()
+        fresh = pool.cursor()
+
+        assert pool.path == second != first
+        assert cursor.execute("SELECT COUNT(*) FROM dim_site").fetchone()[0] > 0
+
+        pool.release(cursor)
+        with pytest.raises(duckdb.ConnectionException):
+            old.execute("SELECT 1")
+        pool.release(fresh)
+        pool.close()
+
+    def test_lifespan_opens_and_closes_pool(self, data_dir, monkeypatch):
+        """Test that application startup connects the pool and shutdown closes it."""
+        from fastapi.testclient import TestClient
+
+        import api.main as api_main
+        from db.loader import init_database
+
+        init_database().close()
+        monkeypatch.setattr(api_main, "DB_PATH", data_dir / "bess_analytics.duckdb")
+
+        with TestClient(api_main.app) as client:
+            assert api_main.pool.path == data_dir / "bess_analytics.duckdb"
+            assert client.get("/health").json()["status"] == "healthy"
+
+        assert api_main.pool.path is None
+
+
+class TestResponseCache:
+    """Tests for data-version-aware response caching and conditional requests."""
+
+    def test_repeated_request_is_served_from_cache(self, api_client):
+        """Test that a second identical request is a cache hit with the same body and ETag."""
+        first = api_client.get("/metrics/vendor_benchmark")
+        second = api_client.get("/metrics/vendor_benchmark")
+
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+        assert second.headers["ETag"] == first.headers["ETag"]
+
+    def test_query_parameter_order_shares_entry(self, api_client):
+        """Test that reordered query parameters hit the same cache entry."""
+        api_client.get("/metrics/events?site_id=SITE001&limit=5")
+        response = api_client.get("/metrics/events?limit=5&site_id=SITE001")
+
+        assert response.headers["X-Cache"] == "HIT"
+
+    def test_matching_etag_returns_not_modified(self, api_client):
+        """Test that If-None-Match with the current ETag returns 304 and no body."""
+        tag = api_client.get("/metrics/portfolio").headers["ETag"]
+
+        response = api_client.get("/metrics/portfolio", headers={"If-None-Match": tag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == tag
+
+    def test_new_data_version_invalidates(self, data_dir, monkeypatch):
+        """Test that publishing a new snapshot changes the ETag and refills the cache."""
+        from fastapi.testclient import TestClient
+
+        import api.main as api_main
+        from db.snapshot import build_snapshot
+
+        monkeypatch.setattr(api_main, "DB_PATH", data_dir / "bess_analytics.duckdb")
+        client = TestClient(api_main.app)
+        build_snapshot()
+        tag = client.get("/metrics/sla_report").headers["ETag"]
+
+        build_snapshot(full_refresh=True)
+        response = client.get("/metrics/sla_report", headers={"If-None-Match": tag})
+
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.headers["ETag"] != tag
+
+    def test_snapshot_swap_mid_request_tags_served_version(self, api_client, monkeypatch):
+        """Test that a body read from another snapshot is tagged with it but not cached."""
+        import api.main as api_main
+        from api.cache import etag
+
+        api_client.get("/health")
+        served = api_main.pool.data_version()
+        monkeypatch.setattr(api_main.pool, "data_version", lambda: "stale@0")
+        api_main.response_cache.clear()
+
+        response = api_client.get("/metrics/pipeline")
+
+        assert response.headers["ETag"] == etag(served, "/metrics/pipeline")
+        assert api_main.response_cache.get("stale@0", "/metrics/pipeline") is None
+
+    def test_slow_response_from_old_version_keeps_newer_entries(self):
+        """Test that storing a body from a previous version neither evicts nor rolls back the cache."""
+        from api.cache import ResponseCache
+
+        cache = ResponseCache()
+        cache.get("v2", "fresh")
+        cache.put("v2", "fresh", b"new", "application/json")
+        cache.put("v1", "slow", b"old", "application/json")
+
+        assert cache.get("v2", "fresh") == (b"new", "application/json", {})
+        assert cache.get("v2", "slow") is None
+
+    def test_cache_respects_byte_budget(self):
+        """Test that the LRU evicts by total body size and skips oversized bodies."""
+        from api.cache import ResponseCache
+
+        cache = ResponseCache(max_entries=10, max_bytes=10)
+        cache.get("v1", "a")
+        cache.put("v1", "a", b"12345", "application/json")
+        cache.put("v1", "b", b"12345", "application/json")
+        cache.put("v1", "c", b"123", "application/json")
+        cache.put("v1", "huge", b"x" * 11, "application/json")
+
+        assert cache.get("v1", "a") is None
+        assert cache.get("v1", "b") is not None
+        assert cache.get("v1", "c") is not None
+        assert cache.get("v1", "huge") is None
+        assert cache.size_bytes == 8
+
+    def test_health_is_not_cached(self, api_client):
+        """Test that routes outside the cached prefixes carry no ETag."""
+        assert "ETag" not in api_client.get("/health").headers
+
+
+class TestColumnarOutput:
+    """Tests for Arrow and Parquet output negotiation."""
+
+    PARAMS = {"site_id": "SITE001", "tags": "soc_pct,p_kw", "resolution": "1hour"}
+
+    def test_arrow_stream_matches_json(self, api_client):
+        """Test that ?format=arrow returns an Arrow IPC stream with the JSON rows."""
+        import pyarrow as pa
+
+        rows = api_client.get("/metrics/telemetry", params=self.PARAMS).json()
+        response = api_client.get("/metrics/telemetry", params={**self.PARAMS, "format": "arrow"})
+        table = pa.ipc.open_stream(response.content).read_all()
+
+        assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+        assert table.num_rows == len(rows)
+        assert table.column("soc_pct").to_pylist() == pytest.approx([r["soc_pct"] for r in rows])
+
+    def test_accept_header_selects_parquet(self, api_client):
+        """Test that an Accept header negotiates Parquet output."""
+        import io
+
+        import pyarrow.parquet as pq
+
+        response = api_client.get(
+            "/metrics/events",
+            params={"site_id": "SITE001"},
+            headers={"Accept": "application/vnd.apache.parquet"},
+        )
+        table = pq.read_table(io.BytesIO(response.content))
+
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        assert set(table.column("site_id").to_pylist()) <= {"SITE001"}
+        assert "ETag" in response.headers
+
+    def test_pivoted_telemetry_streams_as_arrow(self, api_client):
+        """Test that long-format telemetry (unregistered tags) is also served as Arrow."""
+        import pyarrow as pa
+
+        params = {"site_id": "SITE001", "tags": "soc_pct", "resolution": "1day", "start_date": "2024-03-14"}
+        rows = api_client.get("/metrics/telemetry", params={**params, "tags": "soc_pct,no_such_tag"}).json()
+        response = api_client.get(
+            "/metrics/telemetry",
+            params={**params, "tags": "soc_pct,no_such_tag", "format": "arrow"},
+        )
+
+        assert pa.ipc.open_stream(response.content).read_all().num_rows == len(rows)
+
+    def test_unknown_format_is_rejected(self, api_client):
+        """Test that an unsupported format is a 400."""
+        response = api_client.get("/metrics/events", params={"format": "xml"})
+
+        assert response.status_code == 400
+
+
+class TestJSONEncoding:
+    """Tests for the direct JSON encoding of bulk results."""
+
+    def test_matches_default_encoder(self, monkeypatch):
+        """Test that orjson output equals the jsonable_encoder fallback, with NaN as null."""
+        import json
+        from decimal import Decimal
+
+        import numpy as np
+        import pandas as pd
+
+        import api.formats as formats
+
+        rows = [{
+            "ts": pd.Timestamp("2024-03-14 10:15:30.5"),
+            "date": pd.Timestamp("2024-03-14").date(),
+            "value": float("nan"),
+            "count": np.int64(3),
+            "revenue": Decimal("12.50"),
+            "missing": pd.NaT,
+        }]
+        fast = json.loads(formats.RecordsResponse(rows).body)
+        monkeypatch.setattr(formats, "orjson", None)
+        fallback = json.loads(formats.RecordsResponse(rows).body)
+
+        assert fast == fallback
+        assert fast[0]["value"] is None
+        assert fast[0]["ts"] == "2024-03-14T10:15:30.500000"
+
+    def test_pivoted_telemetry_nulls(self, api_client):
+        """Test that cells missing after a pivot are null in JSON."""
+        params = {"site_id": "SITE001", "tags": "soc_pct,no_such_tag", "resolution": "1day"}
+        response = api_client.get("/metrics/telemetry", params=params)
+
+        assert response.status_code == 200
+        assert all(isinstance(row["soc_pct"], (float, type(None))) for row in response.json())
+
+    def test_openapi_keeps_response_models(self, api_client):
+        """Test that bulk endpoints still document their row models."""
+        paths = api_client.get("/openapi.json").json()["paths"]
+
+        def item_ref(path):
+            schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+            return schema["items"]["$ref"]
+
+        assert item_ref("/metrics/sites").endswith("/SiteMetrics")
+        assert item_ref("/metrics/events").endswith("/EventRecord")
+        assert item_ref("/metrics/revenue_loss").endswith("/RevenueLossRecord")
+
+
+class TestDownsampling:
+    """Tests for server-side min/max downsampling of telemetry."""
+
+    PARAMS = {"site_id": "SITE001", "tags": "soc_pct,p_kw", "resolution": "1min"}
+
+    def test_max_points_bounds_rows_and_keeps_extremes(self, api_client):
+        """Test that downsampled telemetry fits max_points and keeps each tag's min and max."""
+        full = api_client.get("/metrics/telemetry", params=self.PARAMS).json()
+        sampled = api_client.get("/metrics/telemetry", params={**self.PARAMS, "max_points": 200}).json()
+
+        assert len(full) == 2 * 1440
+        assert len(sampled) <= 200
+        for tag in ("soc_pct", "p_kw"):
+            assert max(r[tag] for r in sampled) == max(r[tag] for r in full)
+            assert min(r[tag] for r in sampled) == min(r[tag] for r in full)
+        assert sampled[0]["ts"] == full[0]["ts"]
+        assert sampled[-1]["ts"] == full[-1]["ts"]
+
+    def test_long_format_tags_are_downsampled_per_tag(self, api_client):
+        """Test that tags read from the long table share the point budget."""
+        params = {**self.PARAMS, "tags": "soc_pct,no_such_tag", "max_points": 100}
+
+        rows = api_client.get("/metrics/telemetry", params=params).json()
+
+        assert 0 < len(rows) <= 100
+
+    def test_budget_too_small_for_tags_is_rejected(self, api_client):
+        """Test that max_points below the per-tag minimum is refused rather than exceeded."""
+        tags = "soc_pct,p_kw,no_such_tag,other_tag,last_tag"
+
+        response = api_client.get("/metrics/telemetry", params={**self.PARAMS, "tags": tags, "max_points": 10})
+        rows = api_client.get("/metrics/telemetry", params={**self.PARAMS, "tags": tags, "max_points": 20}).json()
+
+        assert response.status_code == 422
+        assert 0 < len(rows) <= 20
+
+    def test_short_series_are_unchanged(self, api_client):
+        """Test that a series already under max_points is returned in full."""
+        params = {**self.PARAMS, "resolution": "1hour"}
+
+        full = api_client.get("/metrics/telemetry", params=params).json()
+        sampled = api_client.get("/metrics/telemetry", params={**params, "max_points": 1000}).json()
+
+        assert sampled == full
+
+
+class TestCursorPagination:
+    """Tests for keyset cursor pagination of listing endpoints."""
+
+    def _pages(self, client, path: str, limit: int, **params) -> list[list[dict]]:
+        pages, cursor = [], None
+        while True:
+            query = {**params, "limit": limit, **({"cursor": cursor} if cursor else {})}
+            response = client.get(path, params=query)
+            assert response.status_code == 200
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return pages
+
+    @pytest.mark.parametrize("path,id_column", [
+        ("/metrics/events", "event_id"),
+        ("/edge/balancing_actions", "action_id"),
+        ("/edge/insights", "finding_id"),
+    ])
+    def test_pages_cover_every_row_once(self, api_client, path, id_column):
+        """Test that walking the cursors returns each row exactly once, in order."""
+        everything = api_client.get(path, params={"limit": 1000}).json()
+        pages = self._pages(api_client, path, limit=7)
+        walked = [row for page in pages for row in page]
+
+        assert all(len(page) == 7 for page in pages[:-1])
+        assert [r[id_column] for r in walked] == [r[id_column] for r in everything]
+
+    def test_composite_key_pages_are_stable(self, api_client, data_dir):
+        """Test that rows sharing a timestamp are split across pages without loss."""
+        import pandas as pd
+
+        imbalance = pd.read_parquet(data_dir / "fact_imbalance.parquet")
+        expected = (imbalance["site_id"] == "SITE001").sum()
+
+        pages = self._pages(api_client, "/edge/imbalance", limit=5000, site_id="SITE001")
+        walked = [(r["ts"], r["rack_id"]) for page in pages for r in page]
+
+        assert len(walked) == len(set(walked)) == expected
+
+    def test_last_page_has_no_cursor(self, api_client):
+        """Test that a page holding the remaining rows carries no next cursor."""
+        response = api_client.get("/metrics/events", params={"limit": 1000})
+
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_cached_page_keeps_cursor(self, api_client):
+        """Test that a cache hit replays the next-page cursor."""
+        first = api_client.get("/metrics/events", params={"limit": 5})
+        second = api_client.get("/metrics/events", params={"limit": 5})
+
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+    def test_malformed_cursor_is_rejected(self, api_client):
+        """Test that a tampered cursor is a 400, not a server error."""
+        response = api_client.get("/metrics/events", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+    def test_envelope_carries_cursor_in_body(self, api_client):
+        """Test that envelope=true pages can be walked from the body alone."""
+        everything = api_client.get("/metrics/events", params={"limit": 1000}).json()
+
+        walked, cursor = [], None
+        while True:
+            params = {"limit": 7, "envelope": "true", **({"cursor": cursor} if cursor else {})}
+            body = api_client.get("/metrics/events", params=params).json()
+            walked.extend(body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert [r["event_id"] for r in walked] == [r["event_id"] for r in everything]
+
+    @pytest.mark.parametrize("path", ["/metrics/events", "/edge/constraints"])
+    def test_non_positive_limit_is_rejected(self, api_client, path):
+        """Test that limit=0 is a validation error rather than a server error."""
+        assert api_client.get(path, params={"limit": 0}).status_code == 422
+
+    def test_paged_query_rejects_empty_pages(self, loaded_db):
+        """Test that paged_query itself refuses a limit below one."""
+        from fastapi import HTTPException
+
+        from api.pagination import paged_query
+
+        with pytest.raises(HTTPException) as error:
+            paged_query(loaded_db, "SELECT * FROM fact_events", [], [("event_id", "ASC")], 0)
+
+        assert error.value.status_code == 400
+
+
+class TestQueryExecution:
+    """Tests for bounded, interruptible query execution."""
+
+    SLOW_QUERY = "SELECT SUM(hash(i)) FROM range(1000000000000) r(i)"
+
+    def _slow(self, conn):
+        return lambda: conn.execute(self.SLOW_QUERY).fetchone()
+
+    def test_timeout_interrupts_query(self):
+        """Test that a query over its time budget is interrupted and reported as 504."""
+        import asyncio
+        import time
+
+        from fastapi import HTTPException
+
+        from api.executor import QueryExecutor
+
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+        started = time.perf_counter()
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(executor.run(self._slow(conn), conn, timeout=0.3))
+
+        assert error.value.status_code == 504
+        assert time.perf_counter() - started < 5
+        assert executor.admitted == 0
+        assert conn.execute("SELECT 42").fetchone()[0] == 42
+        executor.shutdown()
+
+    def test_saturation_returns_503_with_retry_after(self):
+        """Test that requests beyond the worker and queue limits are refused."""
+        import asyncio
+
+        from fastapi import HTTPException
+
+        from api.executor import QueryExecutor
+
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+
+        async def burst():
+            running = asyncio.create_task(executor.run(self._slow(conn), conn, timeout=1))
+            await asyncio.sleep(0.1)
+            with pytest.raises(HTTPException) as error:
+                await executor.run(lambda: 1, None)
+            with pytest.raises(HTTPException):
+                await running
+            return error.value
+
+        error = asyncio.run(burst())
+
+        assert error.status_code == 503
+        assert error.headers["Retry-After"] == "1"
+        executor.shutdown()
+
+    def test_client_disconnect_cancels_query(self):
+        """Test that a query is interrupted once its client has gone away."""
+        import asyncio
+        import time
+        from types import SimpleNamespace
+
+        from fastapi import HTTPException
+
+        from api.executor import CLIENT_CLOSED_REQUEST, QueryExecutor
+
+        async def is_disconnected():
+            return True
+
+        request = SimpleNamespace(is_disconnected=is_disconnected, url=SimpleNamespace(path="/test"))
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+        started = time.perf_counter()
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(executor.run(self._slow(conn), conn, timeout=60, request=request))
+
+        assert error.value.status_code == CLIENT_CLOSED_REQUEST
+        assert time.perf_counter() - started < 5
+        executor.shutdown()
+
+    def test_columnar_stream_holds_slot_until_sent(self):
+        """Test that an Arrow body read from the cursor keeps its executor slot until drained."""
+        import asyncio
+
+        import pyarrow as pa
+
+        from api.executor import QueryExecutor
+        from api.formats import query_response
+
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+
+        async def fetch():
+            response = await executor.run(
+                lambda: query_response(conn, "SELECT * FROM range(200000) r(i)", [], "arrow"), conn
+            )
+            held = executor.admitted
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            return held, body
+
+        held, body = asyncio.run(fetch())
+
+        assert held == 1
+        assert executor.admitted == 0
+        assert pa.ipc.open_stream(body).read_all().num_rows == 200000
+        executor.shutdown()
+
+    def test_discarded_stream_releases_slot(self):
+        """Test that a columnar response dropped without being sent or iterated gives back its slot."""
+        import asyncio
+        import gc
+
+        from api.executor import QueryExecutor
+        from api.formats import query_response
+
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+
+        async def discard():
+            response = await executor.run(lambda: query_response(conn, "SELECT * FROM range(10) r(i)", [], "arrow"), conn)
+            held = executor.admitted
+            del response
+            gc.collect()
+            return held
+
+        assert asyncio.run(discard()) == 1
+        assert executor.admitted == 0
+        executor.shutdown()
+
+    def test_stream_failing_before_body_releases_slot(self):
+        """Test that a columnar response whose client is gone before the first chunk gives back its slot."""
+        import asyncio
+
+        from starlette.requests import ClientDisconnect
+
+        from api.executor import QueryExecutor
+        from api.formats import query_response
+
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client went away")
+
+        async def serve():
+            response = await executor.run(lambda: query_response(conn, "SELECT * FROM range(10) r(i)", [], "arrow"), conn)
+            # Newer Starlette reports the failed send as a client disconnect
+            with pytest.raises((OSError, ClientDisconnect)):
+                await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+            return response
+
+        # The response is still referenced, so only sending it can have released the slot
+        response = asyncio.run(serve())
+
+        assert executor.admitted == 0
+        assert response.on_close is not None
+        executor.shutdown()
+
+    def test_release_from_worker_threads_returns_every_slot(self):
+        """Test that slots given back from other threads, twice each, are counted exactly once."""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        from api.executor import QueryExecutor
+        from api.formats import query_response
+
+        executor = QueryExecutor(workers=4, queue_depth=200)
+        conn = duckdb.connect()
+
+        async def admit_and_release():
+            with ThreadPoolExecutor(max_workers=8) as workers:
+                pending = []
+                for _ in range(100):
+                    response = await executor.run(lambda: query_response(conn, "SELECT 1 AS i", [], "arrow"), conn)
+                    # Release off the event loop while it keeps admitting
+                    pending += [workers.submit(response.on_close) for _ in range(2)]
+                for future in pending:
+                    future.result()
+
+        asyncio.run(admit_and_release())
+
+        assert executor.admitted == 0
+        executor.shutdown()
+
+    def test_columnar_stream_past_budget_is_interrupted(self):
+        """Test that a streamed result is cut off and its query interrupted when the budget runs out."""
+        import asyncio
+        import time
+
+        from api.executor import QueryExecutor
+        from api.formats import query_response
+
+        executor = QueryExecutor(workers=1, queue_depth=0)
+        conn = duckdb.connect()
+        endless = "SELECT hash(i) AS h FROM range(1000000000000) r(i)"
+        started = time.perf_counter()
+
+        async def fetch():
+            response = await executor.run(lambda: query_response(conn, endless, [], "arrow"), conn, timeout=0.5)
+            async for _ in response.body_iterator:
+                pass
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(fetch())
+
+        assert time.perf_counter() - started < 5
+        assert executor.admitted == 0
+        assert conn.execute("SELECT 42").fetchone()[0] == 42
+        executor.shutdown()
+
+    def test_route_past_budget_returns_504(self, api_client, monkeypatch):
+        """Test that a route whose query outlives its budget answers 504 and the API recovers."""
+        import api.executor as api_executor
+
+        run = api_executor.executor.run
+
+        async def no_budget(fn, conn, timeout, request=None):
+            return await run(fn, conn, timeout=0, request=request)
+
+        monkeypatch.setattr(api_executor.executor, "run", no_budget)
+        response = api_client.get("/metrics/grid_code")
+        monkeypatch.setattr(api_executor.executor, "run", run)
+
+        assert response.status_code == 504
+        assert api_client.get("/metrics/grid_code").status_code == 200
+
+
+class TestTelemetryStream:
+    """Tests for the live telemetry push stream."""
+
+    @staticmethod
+    def _write(path, records, mode="w"):
+        import json
+
+        with open(path, mode) as f:
+            f.write("\n".join(json.dumps({"asset": "A1", "quality": "good", **r}) for r in records))
+
+    @staticmethod
+    def _record(site, tag, minute, value):
+        return {"site": site, "tag": tag, "timestamp": f"2024-03-15T00:{minute:02d}:00", "value": value}
+
+    def test_tail_returns_only_new_readings(self, tmp_path):
+        """Test that the tail skips existing data and follows new and growing files."""
+        from db.tail import TelemetryTail
+
+        self._write(tmp_path / "SITE001_old.jsonl", [self._record("SITE001", "p_kw", 0, 1.0)])
+        tail = TelemetryTail(tmp_path)
+        assert tail.poll() == []
+
+        self._write(tmp_path / "SITE002_new.jsonl", [self._record("SITE002", "p_kw", 1, 2.0)])
+        with open(tmp_path / "SITE001_old.jsonl", "a") as f:
+            f.write('\n{"site": "SITE001", "tag": "p_kw", "timesta')
+        assert tail.poll() == [{"site_id": "SITE002", "tag": "p_kw", "ts": "2024-03-15T00:01:00", "value": 2.0}]
+
+        # The partial record is returned once it is complete
+        with open(tmp_path / "SITE001_old.jsonl", "a") as f:
+            f.write('mp": "2024-03-15T00:02:00", "value": 3.0}\n')
+        assert [r["value"] for r in tail.poll()] == [3.0]
+        assert tail.poll() == []
+
+    def test_subscribers_get_filtered_readings(self, tmp_path):
+        """Test that each subscriber receives only new readings for its sites and tags."""
+        import asyncio
+
+        from api.stream import TelemetryBroadcaster
+        from db.tail import TelemetryTail
+
+        broadcaster = TelemetryBroadcaster(lambda: TelemetryTail(tmp_path), poll_seconds=0.01)
+
+        async def scenario():
+            soc = broadcaster.subscribe(site_ids=["SITE001"], tags=["soc_pct"])
+            everything = broadcaster.subscribe()
+            await asyncio.sleep(0.05)
+            self._write(tmp_path / "batch.jsonl", [
+                self._record("SITE001", "soc_pct", 0, 55.0),
+                self._record("SITE001", "p_kw", 0, 100.0),
+                self._record("SITE002", "soc_pct", 0, 60.0),
+            ])
+            batches = await soc.next_batch(1.0), await everything.next_batch(1.0)
+            await broadcaster.close()
+            return batches
+
+        (soc, dropped), (everything, _) = asyncio.run(scenario())
+
+        assert [(r["site_id"], r["tag"], r["value"]) for r in soc] == [("SITE001", "soc_pct", 55.0)]
+        assert dropped == 0
+        assert len(everything) == 3
+
+    def test_slow_client_drops_oldest(self):
+        """Test that a full client buffer keeps the newest readings and counts the rest."""
+        import asyncio
+
+        from api.stream import Subscriber
+
+        async def scenario():
+            subscriber = Subscriber(max_pending=2)
+            subscriber.offer([{"site_id": "SITE001", "tag": "p_kw", "ts": str(i), "value": i} for i in range(5)])
+            return await subscriber.next_batch(0)
+
+        readings, dropped = asyncio.run(scenario())
+
+        assert [r["value"] for r in readings] == [3, 4]
+        assert dropped == 3
+
+    def test_disconnect_ends_subscription(self, tmp_path):
+        """Test that the event stream stops and unsubscribes once the client goes away."""
+        import asyncio
+
+        from api.stream import TelemetryBroadcaster, event_stream
+        from db.tail import TelemetryTail
+
+        broadcaster = TelemetryBroadcaster(lambda: TelemetryTail(tmp_path), poll_seconds=0.01)
+
+        class GoneRequest:
+            async def is_disconnected(self):
+                return True
+
+        async def scenario():
+            subscriber = broadcaster.subscribe()
+            chunks = [chunk async for chunk in event_stream(broadcaster, subscriber, GoneRequest(), heartbeat=0.01)]
+            await asyncio.sleep(0)
+            return chunks
+
+        chunks = asyncio.run(scenario())
+
+        assert chunks == [b": connected\n\n"]
+        assert broadcaster.subscribers == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+"""
+BESS Analytics - Compaction Tests
+
+Tests for rewriting small Parquet files into compacted, sorted files.
+"""
+
+from datetime import timedelta
+
+import duckdb
+import pandas as pd
+
+from tests.conftest import TELEMETRY_START, make_telemetry
+
+
+def _write_batches(data_dir, count: int, minutes: int = 30):
+    """Write ``count`` consecutive telemetry micro-batches."""
+    batch_dir = data_dir / "fact_telemetry"
+    batch_dir.mkdir(exist_ok=True)
+    for i in range(count):
+        start = TELEMETRY_START + timedelta(days=2, minutes=i * minutes)
+        make_telemetry(start, minutes).to_parquet(batch_dir / f"batch_{i:04d}.parquet", index=False)
+
+
+def _rows(files) -> pd.DataFrame:
+    """All rows of a set of files in a stable order."""
+    from db.loader import _parquet_source
+
+    return duckdb.connect().execute(f"""
+        SELECT ts, site_id, asset_id, tag, value
+        FROM {_parquet_source(files)}
+        ORDER BY ALL
+    """).df()
+
+
+class TestCompaction:
+    """Tests for the Parquet compaction tool."""
+
+    def test_micro_batches_merge_into_table_file(self, data_dir):
+        """Test that micro-batches are merged into one sorted zstd file with the same rows."""
+        from db.compact import compact
+        from db.loader import source_files
+
+        _write_batches(data_dir, 5)
+        before = _rows(source_files("fact_telemetry"))
+
+        report = compact(["fact_telemetry"], row_group_size=20_480)
+
+        files = source_files("fact_telemetry")
+        assert files == [data_dir / "fact_telemetry.parquet"]
+        assert report["tables"] == [{
+            "table": "fact_telemetry",
+            "files_before": 6,
+            "files_after": 1,
+            "bytes_before": report["tables"][0]["bytes_before"],
+            "bytes_after": files[0].stat().st_size,
+        }]
+        pd.testing.assert_frame_equal(_rows(files), before)
+
+        metadata = duckdb.connect().execute(f"""
+            SELECT DISTINCT compression, row_group_num_rows
+            FROM parquet_metadata('{files[0]}')
+            WHERE row_group_id = 0
+        """).fetchall()
+        assert metadata == [("ZSTD", 20_480)]
+
+    def test_partitions_are_compacted_in_place(self, data_dir):
+        """Test that each hive partition ends up as a single file without partition columns."""
+        from db.compact import compact_table
+        from db.loader import source_files
+        from db.partitions import write_table_batch
+
+        for i in range(3):
+            batch = make_telemetry(TELEMETRY_START + timedelta(days=2, hours=i), 60)
+            write_table_batch(batch, "fact_telemetry", data_dir)
+        before = _rows(source_files("fact_telemetry"))
+
+        compact_table(duckdb.connect(), "fact_telemetry")
+
+        partition_files = [f for f in source_files("fact_telemetry") if f.parent != data_dir]
+        assert len(partition_files) == 3
+        assert all("site_id=" in str(f.parent.parent) for f in partition_files)
+        pd.testing.assert_frame_equal(_rows(source_files("fact_telemetry")), before)
+
+    def test_loader_picks_up_compacted_files(self, loaded_db, data_dir):
+        """Test that loading after compaction neither loses nor duplicates rows."""
+        from db.compact import compact
+        from db.loader import load_data
+
+        _write_batches(data_dir, 3)
+        load_data(loaded_db)
+        expected = loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+
+        compact(["fact_telemetry"])
+        load_data(loaded_db)
+
+        assert loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0] == expected
+
+    def test_external_views_follow_compacted_files(self, data_dir):
+        """Test that external views still answer after their files are compacted."""
+        from db.compact import compact
+        from db.loader import get_connection
+        from db.snapshot import build_snapshot, current_snapshot
+
+        _write_batches(data_dir, 3)
+        build_snapshot(external=["fact_telemetry"])
+        before = current_snapshot()
+        with get_connection(read_only=True) as conn:
+            expected = conn.execute("SELECT COUNT(*), MAX(ts) FROM fact_telemetry").fetchone()
+
+        report = compact(["fact_telemetry"])
+
+        assert report["external_views"] == ["fact_telemetry"]
+        assert current_snapshot() != before
+        with get_connection(read_only=True) as conn:
+            assert conn.execute("SELECT COUNT(*), MAX(ts) FROM fact_telemetry").fetchone() == expected
+
+    def test_scan_times_are_reported(self, data_dir):
+        """Test that the report covers the standard queries over Parquet tables."""
+        from db.compact import compact
+
+        report = compact(min_files=2)
+        names = {row["query"] for row in report["scans"]}
+
+        assert "Dispatch: one site, last day" in names
+        assert all(row["seconds_after"] is not None for row in report["scans"])
@@ -0,0 +1,844 @@
+"""
+BESS Analytics - Database Loader Tests
+
+Tests for Parquet ingest, incremental loading and analytical views.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from tests.conftest import TELEMETRY_START, make_telemetry
+
+
+class TestIncrementalLoad:
+    """Tests for watermark-based incremental ingest."""
+
+    def test_initial_load_records_manifest_and_watermark(self, loaded_db):
+        """Test that a first load records files and high-water marks."""
+        from db.loader import get_watermark
+
+        files = loaded_db.execute(
+            "SELECT COUNT(*) FROM _load_manifest WHERE table_name = 'fact_telemetry'"
+        ).fetchone()[0]
+        assert files == 1
+        assert get_watermark(loaded_db, "fact_telemetry") == TELEMETRY_START + timedelta(minutes=2 * 1440 - 1)
+
+    def test_reload_without_new_files_appends_nothing(self, loaded_db):
+        """Test that reloading unchanged files leaves tables untouched."""
+        from db.loader import load_data
+
+        before = loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+        load_data(loaded_db)
+        after = loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+
+        assert after == before
+
+    def test_micro_batch_appends_only_new_rows(self, loaded_db, data_dir):
+        """Test that a micro-batch overlapping the watermark appends only newer rows."""
+        from db.loader import load_data
+
+        before = loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+
+        # Batch starts 10 minutes before the watermark and runs 20 minutes past it
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        batch_start = TELEMETRY_START + timedelta(minutes=2 * 1440 - 10)
+        make_telemetry(batch_start, 30).to_parquet(batch_dir / "batch_0001.parquet", index=False)
+
+        load_data(loaded_db)
+        after = loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+        rows_per_minute = before // (2 * 1440)
+
+        assert after - before == 20 * rows_per_minute
+
+    def _telemetry_rows(self, conn):
+        return conn.execute(
+            "SELECT ts, site_id::VARCHAR, asset_id::VARCHAR, tag::VARCHAR, value FROM fact_telemetry ORDER BY ALL"
+        ).fetchall()
+
+    def test_full_refresh_matches_incremental_after_overlap(self, loaded_db, data_dir):
+        """Test that overlapping batches give the same rows incrementally and on a full refresh."""
+        from db.loader import load_data
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        day3 = TELEMETRY_START + timedelta(days=2)
+        make_telemetry(day3, 20).to_parquet(batch_dir / "batch_0001.parquet", index=False)
+        load_data(loaded_db)
+        make_telemetry(day3 + timedelta(minutes=10), 20).to_parquet(batch_dir / "batch_0002.parquet", index=False)
+        load_data(loaded_db)
+        incremental = self._telemetry_rows(loaded_db)
+
+        load_data(loaded_db, full_refresh=True)
+        duplicates = loaded_db.execute("""
+            SELECT COUNT(*) - COUNT(DISTINCT (ts, site_id, asset_id, tag)) FROM fact_telemetry
+        """).fetchone()[0]
+
+        assert self._telemetry_rows(loaded_db) == incremental
+        assert len(incremental) == 3 * 9 * (2 * 1440 + 30)
+        assert duplicates == 0
+
+    def test_late_site_for_loaded_minute_is_appended(self, loaded_db, data_dir):
+        """Test that another site's file for already loaded minutes reaches the table and its tiers."""
+        from db.loader import load_data
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        batch = make_telemetry(TELEMETRY_START + timedelta(days=2), 10)
+        batch[batch["site_id"] == "SITE001"].to_parquet(batch_dir / "batch_0001.parquet", index=False)
+        load_data(loaded_db)
+        batch[batch["site_id"] == "SITE002"].to_parquet(batch_dir / "batch_0002.parquet", index=False)
+        load_data(loaded_db)
+
+        day3 = "ts >= TIMESTAMP '2024-03-16' AND site_id = 'SITE002'"
+        raw = loaded_db.execute(f"SELECT COUNT(*) FROM fact_telemetry WHERE {day3}").fetchone()[0]
+        tier = loaded_db.execute(
+            "SELECT SUM(sample_count) FROM agg_telemetry_15min WHERE ts_15min >= TIMESTAMP '2024-03-16' "
+            "AND site_id = 'SITE002'"
+        ).fetchone()[0]
+        wide = loaded_db.execute(f"SELECT COUNT(*) FROM fact_telemetry_wide WHERE {day3}").fetchone()[0]
+        latest = loaded_db.execute(
+            "SELECT MAX(ts) FROM cur_telemetry WHERE site_id = 'SITE002'"
+        ).fetchone()[0]
+
+        assert raw == tier == 9 * 10
+        assert wide == 10
+        assert latest == TELEMETRY_START + timedelta(days=2, minutes=9)
+
+    def test_late_rows_recompute_only_their_site(self, loaded_db, data_dir):
+        """Test that a late batch for one site leaves other sites' derived rows alone."""
+        from db.loader import load_data
+
+        derived = {"agg_telemetry_15min": "sample_count", "fact_telemetry_wide": "p_kw", "agg_site_daily": "dod_pct"}
+        for table, column in derived.items():
+            loaded_db.execute(f"UPDATE {table} SET {column} = -1")
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        batch = make_telemetry(TELEMETRY_START, 30)
+        batch["ts"] = batch["ts"] + timedelta(seconds=30)
+        batch[batch["site_id"] == "SITE002"].to_parquet(batch_dir / "batch_0001.parquet", index=False)
+        load_data(loaded_db)
+
+        for table, column in derived.items():
+            recomputed = loaded_db.execute(
+                f"SELECT DISTINCT site_id::VARCHAR FROM {table} WHERE {column} != -1"
+            ).fetchall()
+            assert recomputed == [("SITE002",)], table
+
+    def test_full_refresh_rebuilds_tables(self, loaded_db):
+        """Test that a full refresh reloads from source files."""
+        from db.loader import load_data
+
+        loaded_db.execute("DELETE FROM fact_dispatch")
+        load_data(loaded_db, full_refresh=True)
+
+        assert loaded_db.execute("SELECT COUNT(*) FROM fact_dispatch").fetchone()[0] > 0
+
+
+class TestPartitionedTelemetry:
+    """Tests for the hive-partitioned telemetry layout."""
+
+    @pytest.fixture
+    def partitioned_db(self, data_dir):
+        """Load a database whose telemetry is stored only in hive layout."""
+        import pandas as pd
+        from db.loader import get_connection, load_data
+        from db.partitions import write_table_batch
+
+        monolithic = data_dir / "fact_telemetry.parquet"
+        write_table_batch(pd.read_parquet(monolithic), "fact_telemetry", data_dir)
+        monolithic.unlink()
+
+        conn = get_connection()
+        load_data(conn)
+        yield conn
+        conn.close()
+
+    def test_write_table_batch_creates_site_and_day_partitions(self, partitioned_db, data_dir):
+        """Test that telemetry is written one directory per site and day."""
+        partitions = {p.relative_to(data_dir / "fact_telemetry").as_posix()
+                      for p in (data_dir / "fact_telemetry").glob("*/*")}
+
+        assert "site_id=SITE001/date=2024-03-14" in partitions
+        assert len(partitions) == 3 * 2
+
+    def test_partitioned_files_load_into_table(self, partitioned_db):
+        """Test that hive files load with site_id restored and date dropped."""
+        columns = [r[0] for r in partitioned_db.execute("DESCRIBE fact_telemetry").fetchall()]
+        sites = partitioned_db.execute("SELECT COUNT(DISTINCT site_id) FROM fact_telemetry").fetchone()[0]
+
+        assert "date" not in columns
+        assert sites == 3
+
+    def test_partitioned_view_prunes_other_sites(self, partitioned_db):
+        """Test that a site/day query reads a single partition file."""
+        from db.partitions import partitioned_source
+
+        source = partitioned_source(partitioned_db, "fact_telemetry")
+        plan = partitioned_db.execute(f"""
+            EXPLAIN ANALYZE
+            SELECT AVG(value) FROM {source}
+            WHERE site_id = 'SITE002' AND date = DATE '2024-03-15'
+        """).fetchall()[0][1]
+
+        assert source == "fact_telemetry_partitioned"
+        assert "Scanning Files: 1/6" in plan
+
+    def test_partitioned_view_includes_unpartitioned_files(self, partitioned_db, data_dir):
+        """Test that a monolithic file beside the partitions is part of the view."""
+        from db.loader import load_data
+        from db.partitions import partitioned_source
+
+        make_telemetry(TELEMETRY_START + timedelta(days=2), 60).to_parquet(
+            data_dir / "fact_telemetry.parquet", index=False
+        )
+        load_data(partitioned_db, full_refresh=True)
+
+        source = partitioned_source(partitioned_db, "fact_telemetry")
+        in_view = partitioned_db.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+        in_table = partitioned_db.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+        new_day = partitioned_db.execute(
+            f"SELECT COUNT(*) FROM {source} WHERE site_id = 'SITE001' AND date = DATE '2024-03-16'"
+        ).fetchone()[0]
+
+        assert in_view == in_table
+        assert new_day == 9 * 60
+
+    def test_partitioned_view_matches_table_after_overlap(self, partitioned_db, data_dir):
+        """Test that rows repeated by overlapping batches are counted once through the view."""
+        import pandas as pd
+        from db.loader import load_data
+        from db.partitions import partitioned_source, write_table_batch
+
+        # The last hour already loaded, re-sent together with a new hour
+        resent = partitioned_db.execute("""
+            SELECT ts, site_id::VARCHAR as site_id, asset_id::VARCHAR as asset_id, tag::VARCHAR as tag, value
+            FROM fact_telemetry WHERE ts >= ?
+        """, [TELEMETRY_START + timedelta(days=1, hours=23)]).df()
+        overlap = pd.concat([resent, make_telemetry(TELEMETRY_START + timedelta(days=2), 60)], ignore_index=True)
+        write_table_batch(overlap, "fact_telemetry", data_dir)
+        overlap.to_parquet(data_dir / "fact_telemetry" / "batch_0001.parquet", index=False)
+        load_data(partitioned_db)
+
+        source = partitioned_source(partitioned_db, "fact_telemetry")
+        query = "SELECT site_id::VARCHAR, tag::VARCHAR, COUNT(*), ROUND(SUM(value), 3) FROM {} GROUP BY ALL ORDER BY ALL"
+        in_view = partitioned_db.execute(query.format(source)).fetchall()
+        in_table = partitioned_db.execute(query.format("fact_telemetry")).fetchall()
+
+        assert in_view == in_table
+        assert sum(row[2] for row in in_view) == 3 * 9 * (2 * 1440 + 60)
+
+    def test_generator_rerun_replaces_partitions(self, tmp_path, monkeypatch):
+        """Test that running the generator twice leaves one copy of the telemetry."""
+        import duckdb
+        from data_gen import generate
+
+        monkeypatch.setattr(generate, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(generate, "BRONZE_DIR", tmp_path / "bronze")
+        monkeypatch.setattr(generate, "SILVER_DIR", tmp_path / "silver")
+        monkeypatch.setattr(generate, "NUM_DAYS", 1)
+
+        def count():
+            pattern = tmp_path / "fact_telemetry" / "**" / "*.parquet"
+            return duckdb.sql(f"SELECT COUNT(*) FROM read_parquet('{pattern}')").fetchone()[0]
+
+        generate.main(partitioned_telemetry=True)
+        first = count()
+        generate.main(partitioned_telemetry=True)
+
+        assert count() == first
+        assert not (tmp_path / "fact_telemetry.parquet").exists()
+
+
+class TestMaterializedViews:
+    """Tests for materialized, incrementally refreshed aggregate views."""
+
+    def _snapshot(self, conn, view):
+        return conn.execute(f"SELECT * FROM {view} ORDER BY ALL").df()
+
+    def _live(self, conn, view):
+        from db.materialize import MATERIALIZED_VIEWS
+
+        spec = MATERIALIZED_VIEWS[view]
+        daily = "(" + spec["daily"].format(filter="TRUE") + ")"
+        query = spec["rollup"].format(daily=daily)
+        return conn.execute(f"SELECT * FROM ({query}) ORDER BY ALL").df()
+
+    def test_materialized_views_match_live_views(self, data_dir):
+        """Test that materialized views return the same rows as the plain views."""
+        import pandas as pd
+        from db.loader import get_connection, load_data
+        from db.materialize import MATERIALIZED_VIEWS
+
+        conn = get_connection()
+        load_data(conn, materialize=True)
+
+        for view in MATERIALIZED_VIEWS:
+            pd.testing.assert_frame_equal(
+                self._snapshot(conn, view), self._live(conn, view), check_exact=False
+            )
+        conn.close()
+
+    def test_refresh_recomputes_only_touched_days(self, data_dir):
+        """Test that a micro-batch refresh updates new days and leaves older days alone."""
+        import pandas as pd
+        from db.loader import get_connection, load_data
+
+        conn = get_connection()
+        load_data(conn, materialize=True)
+        conn.execute("UPDATE mv_battery_health SET avg_soc = -1 WHERE date = DATE '2024-03-14'")
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        make_telemetry(TELEMETRY_START + timedelta(days=2), 60).to_parquet(
+            batch_dir / "batch_0001.parquet", index=False
+        )
+        load_data(conn, materialize=True)
+
+        days = conn.execute("SELECT DISTINCT date FROM v_battery_health ORDER BY date").fetchall()
+        untouched = conn.execute(
+            "SELECT MAX(avg_soc) FROM mv_battery_health WHERE date = DATE '2024-03-14'"
+        ).fetchone()[0]
+        pd.testing.assert_frame_equal(
+            self._snapshot(conn, "v_site_availability"),
+            self._live(conn, "v_site_availability"),
+            check_exact=False,
+        )
+        conn.close()
+
+        assert len(days) == 3
+        assert untouched == -1
+
+    def test_plain_views_remain_the_default(self, loaded_db):
+        """Test that views read live facts unless materialization is requested."""
+        definition = loaded_db.execute(
+            "SELECT sql FROM duckdb_views() WHERE view_name = 'v_site_availability'"
+        ).fetchone()[0]
+
+        assert "fact_telemetry" in definition
+        assert "mv_site_availability" not in definition
+
+
+class TestWideTelemetry:
+    """Tests for the wide (one column per tag) telemetry table."""
+
+    def test_wide_table_has_one_row_per_site_and_minute(self, loaded_db):
+        """Test that the pivot keeps one row per (site_id, ts)."""
+        wide = loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry_wide").fetchone()[0]
+        keys = loaded_db.execute("SELECT COUNT(DISTINCT (site_id, ts)) FROM fact_telemetry").fetchone()[0]
+
+        assert wide == keys
+
+    def test_wide_table_is_extended_incrementally(self, loaded_db, data_dir):
+        """Test that new telemetry rows are pivoted and appended on the next load."""
+        from db.loader import load_data
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        make_telemetry(TELEMETRY_START + timedelta(days=2), 15).to_parquet(
+            batch_dir / "batch_0001.parquet", index=False
+        )
+        load_data(loaded_db)
+
+        latest = loaded_db.execute("""
+            SELECT soc_pct FROM fact_telemetry_wide
+            WHERE site_id = 'SITE001' ORDER BY ts DESC LIMIT 1
+        """).fetchone()[0]
+        expected = loaded_db.execute("""
+            SELECT value FROM fact_telemetry
+            WHERE site_id = 'SITE001' AND tag = 'soc_pct' ORDER BY ts DESC LIMIT 1
+        """).fetchone()[0]
+
+        assert latest == expected
+        assert loaded_db.execute("SELECT COUNT(*) FROM fact_telemetry_wide").fetchone()[0] == 3 * (2 * 1440 + 15)
+
+
+class TestCurrentTelemetry:
+    """Tests for the maintained latest-value table."""
+
+    LATEST_BY_SCAN = """
+        SELECT site_id, asset_id, tag, value, ts
+        FROM fact_telemetry
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY site_id, asset_id, tag ORDER BY ts DESC) = 1
+        ORDER BY ALL
+    """
+
+    def test_current_table_matches_window_scan(self, loaded_db):
+        """Test that cur_telemetry holds the latest row per (site, asset, tag)."""
+        current = loaded_db.execute(
+            "SELECT site_id, asset_id, tag, value, ts FROM cur_telemetry ORDER BY ALL"
+        ).fetchall()
+
+        assert current == loaded_db.execute(self.LATEST_BY_SCAN).fetchall()
+
+    def test_current_table_is_upserted_by_new_batches(self, loaded_db, data_dir):
+        """Test that a new batch replaces latest values without duplicating keys."""
+        from db.loader import load_data
+
+        keys = loaded_db.execute("SELECT COUNT(*) FROM cur_telemetry").fetchone()[0]
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        make_telemetry(TELEMETRY_START + timedelta(days=2), 5).to_parquet(
+            batch_dir / "batch_0001.parquet", index=False
+        )
+        load_data(loaded_db)
+
+        current = loaded_db.execute(
+            "SELECT site_id, asset_id, tag, value, ts FROM cur_telemetry ORDER BY ALL"
+        ).fetchall()
+
+        assert len(current) == keys
+        assert current == loaded_db.execute(self.LATEST_BY_SCAN).fetchall()
+
+    def test_site_latest_view_reads_current_table(self, loaded_db):
+        """Test that v_site_latest_telemetry reports the latest SOC per site."""
+        latest = loaded_db.execute("""
+            SELECT site_id, latest_soc_pct FROM v_site_latest_telemetry ORDER BY site_id
+        """).fetchall()
+        expected = loaded_db.execute("""
+            SELECT site_id, value FROM cur_telemetry WHERE tag = 'soc_pct' ORDER BY site_id
+        """).fetchall()
+
+        assert latest == expected
+
+
+class TestClusteredLoad:
+    """Tests for clustered fact tables and the pruning report."""
+
+    def _historian_pruning(self, conn):
+        from db.pruning import pruning_report
+
+        report = {row["query"]: row for row in pruning_report(conn)}
+        return report["Historian: one site, one tag, last day"]
+
+    def test_clustering_improves_zone_map_pruning(self, data_dir):
+        """Test that sorted fact tables let site/tag/time filters skip row groups."""
+        import pandas as pd
+        from db.loader import get_connection, load_data
+
+        telemetry = data_dir / "fact_telemetry.parquet"
+        pd.read_parquet(telemetry).sample(frac=1, random_state=0).to_parquet(telemetry, index=False)
+
+        conn = get_connection(row_group_size=4096)
+        load_data(conn)
+        unclustered = self._historian_pruning(conn)
+
+        load_data(conn, full_refresh=True, cluster=True)
+        clustered = self._historian_pruning(conn)
+        conn.close()
+
+        assert unclustered["pruned_pct"] == 0
+        assert clustered["row_groups"] == unclustered["row_groups"]
+        assert clustered["pruned_pct"] > 75
+
+    def test_row_group_size_applies_to_loaded_tables(self, data_dir):
+        """Test that the configured row-group size is used for new tables."""
+        from db.loader import get_connection, load_data
+
+        conn = get_connection(row_group_size=4096)
+        load_data(conn, cluster=True)
+        rows, row_groups = conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM fact_telemetry),
+                (SELECT COUNT(DISTINCT row_group_id) FROM pragma_storage_info('fact_telemetry'))
+        """).fetchone()
+        conn.close()
+
+        assert row_groups == -(-rows // 4096)
+
+
+class TestParallelLoad:
+    """Tests for concurrent table loading."""
+
+    def test_serial_and_parallel_loads_match(self, data_dir):
+        """Test that loading with one worker or several yields the same tables."""
+        from db.loader import get_connection, load_data
+
+        counts = []
+        for workers in (1, 4):
+            conn = get_connection(str(data_dir / f"workers_{workers}.duckdb"))
+            load_data(conn, workers=workers)
+            counts.append(conn.execute(
+                "SELECT table_name, estimated_size FROM duckdb_tables() ORDER BY table_name"
+            ).fetchall())
+            conn.close()
+
+        assert counts[0] == counts[1]
+
+    def test_row_count_reads_parquet_metadata(self, loaded_db, data_dir):
+        """Test that footer row counts match a full table scan."""
+        from db.loader import _parquet_row_count
+
+        files = [data_dir / "fact_telemetry.parquet"]
+        assert _parquet_row_count(loaded_db, files) == loaded_db.execute(
+            "SELECT COUNT(*) FROM fact_telemetry"
+        ).fetchone()[0]
+
+
+class TestExternalLoad:
+    """Tests for exposing tables as views over Parquet files."""
+
+    def test_external_tables_are_views_with_same_rows(self, data_dir):
+        """Test that external tables are views that return the copied rows."""
+        from db.loader import get_connection, load_data, table_exists, view_exists
+
+        copied = get_connection(str(data_dir / "copied.duckdb"))
+        load_data(copied)
+        external = get_connection(str(data_dir / "external.duckdb"))
+        load_data(external, external=["fact_telemetry", "fact_dispatch"])
+
+        for table in ("fact_telemetry", "fact_dispatch"):
+            assert view_exists(external, table) and not table_exists(external, table)
+            query = f"SELECT COUNT(*), MAX(ts) FROM {table}"
+            assert external.execute(query).fetchone() == copied.execute(query).fetchone()
+        assert table_exists(external, "dim_site")
+
+        # Derived tables are still built from the external source
+        query = "SELECT COUNT(*) FROM cur_telemetry"
+        assert external.execute(query).fetchone() == copied.execute(query).fetchone()
+        copied.close()
+        external.close()
+
+    def test_external_watermark_comes_from_footer_stats(self, data_dir):
+        """Test that an external table's watermark is read from Parquet statistics."""
+        from db.loader import get_connection, get_watermark, load_data
+
+        conn = get_connection()
+        load_data(conn, external=["fact_telemetry"])
+
+        assert get_watermark(conn, "fact_telemetry") == TELEMETRY_START + timedelta(minutes=2 * 1440 - 1)
+        conn.close()
+
+    def test_new_batch_extends_external_view(self, data_dir):
+        """Test that a new batch file shows up after the next load."""
+        from db.loader import get_connection, load_data
+
+        conn = get_connection()
+        load_data(conn, external=["fact_telemetry"])
+        before = conn.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        make_telemetry(TELEMETRY_START + timedelta(days=2), 10).to_parquet(
+            batch_dir / "batch_0001.parquet", index=False
+        )
+        load_data(conn, external=["fact_telemetry"])
+
+        assert conn.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0] > before
+        assert conn.execute("SELECT MAX(ts) FROM cur_telemetry").fetchone()[0] == (
+            TELEMETRY_START + timedelta(days=2, minutes=9)
+        )
+        conn.close()
+
+    def test_switching_back_copies_the_table(self, data_dir):
+        """Test that dropping a table from the external set loads it as a table."""
+        from db.loader import get_connection, load_data, table_exists
+
+        conn = get_connection()
+        load_data(conn, external=["fact_dispatch"])
+        load_data(conn)
+
+        assert table_exists(conn, "fact_dispatch")
+        assert conn.execute("SELECT COUNT(*) FROM fact_dispatch").fetchone()[0] > 0
+        conn.close()
+
+
+class TestEnumColumns:
+    """Tests for enum-typed identifier columns."""
+
+    def _column_type(self, conn, table, column):
+        return conn.execute(
+            "SELECT data_type FROM duckdb_columns() WHERE table_name = ? AND column_name = ?",
+            [table, column],
+        ).fetchone()[0]
+
+    def test_fact_identifiers_are_enums(self, loaded_db):
+        """Test that fact identifier columns are enums while dimensions stay VARCHAR."""
+        assert self._column_type(loaded_db, "fact_telemetry", "tag").startswith("ENUM")
+        assert self._column_type(loaded_db, "fact_telemetry", "site_id").startswith("ENUM")
+        assert self._column_type(loaded_db, "fact_events", "asset_id").startswith("ENUM")
+        assert self._column_type(loaded_db, "dim_site", "site_id") == "VARCHAR"
+
+    def test_string_predicates_are_unchanged(self, loaded_db):
+        """Test that enum columns compare with plain and unknown strings."""
+        rows = loaded_db.execute("""
+            SELECT site_id, tag, COUNT(*)
+            FROM fact_telemetry
+            WHERE site_id = ? AND tag IN ('soc_pct', 'not_a_tag')
+            GROUP BY site_id, tag
+        """, ["SITE001"]).fetchall()
+
+        assert rows == [("SITE001", "soc_pct", 2 * 1440)]
+
+    def test_new_identifiers_widen_enums(self, loaded_db, data_dir):
+        """Test that a batch with an unseen site and tag extends the enum types."""
+        from db.enums import enum_values
+        from db.loader import load_data
+
+        batch = make_telemetry(TELEMETRY_START + timedelta(days=2), 5)
+        batch.loc[batch.index[:10], "site_id"] = "SITE999"
+        batch.loc[batch.index[:5], "tag"] = "new_tag"
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        batch.to_parquet(batch_dir / "batch_0001.parquet", index=False)
+
+        load_data(loaded_db)
+
+        assert "SITE999" in enum_values(loaded_db, "site_id")
+        assert "new_tag" in enum_values(loaded_db, "tag")
+        assert loaded_db.execute(
+            "SELECT COUNT(*) FROM fact_telemetry WHERE site_id = 'SITE999'"
+        ).fetchone()[0] == 10
+        assert "'SITE999'" in self._column_type(loaded_db, "fact_telemetry_wide", "site_id")
+
+    def _blocks(self, conn, table, column):
+        """Storage blocks holding a column's first row group, which change when the column is rewritten."""
+        conn.execute("CHECKPOINT")
+        return conn.execute(
+            "SELECT segment_id, block_id, block_offset FROM pragma_storage_info(?) "
+            "WHERE column_name = ? AND row_group_id = 0 ORDER BY ALL",
+            [table, column],
+        ).fetchall()
+
+    def _write_batch(self, data_dir, batch):
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir(exist_ok=True)
+        batch.to_parquet(batch_dir / f"batch_{len(list(batch_dir.iterdir())):04d}.parquet", index=False)
+
+    def test_known_identifiers_leave_tables_alone(self, loaded_db, data_dir):
+        """Test that an incremental load without new identifiers does not rewrite enum columns."""
+        from db.loader import load_data
+
+        before = {c: self._blocks(loaded_db, "fact_telemetry", c) for c in ("site_id", "tag")}
+        types = {c: self._column_type(loaded_db, "fact_telemetry", c) for c in ("site_id", "tag")}
+
+        self._write_batch(data_dir, make_telemetry(TELEMETRY_START + timedelta(days=2), 5))
+        load_data(loaded_db)
+
+        assert {c: self._blocks(loaded_db, "fact_telemetry", c) for c in ("site_id", "tag")} == before
+        assert {c: self._column_type(loaded_db, "fact_telemetry", c) for c in ("site_id", "tag")} == types
+
+    def test_new_identifiers_are_appended_to_receiving_tables_only(self, loaded_db, data_dir):
+        """Test that a new site keeps existing codes and leaves other facts' history alone."""
+        from db.loader import load_data
+
+        codes = "SELECT DISTINCT site_id::VARCHAR, enum_code(site_id) FROM fact_telemetry ORDER BY 1"
+        before = loaded_db.execute(codes).fetchall()
+        dispatch = self._blocks(loaded_db, "fact_dispatch", "site_id")
+
+        batch = make_telemetry(TELEMETRY_START + timedelta(days=2), 5)
+        batch.loc[batch.index[:10], "site_id"] = "SITE000"
+        self._write_batch(data_dir, batch)
+        load_data(loaded_db)
+
+        after = loaded_db.execute(codes).fetchall()
+        assert after[0] == ("SITE000", len(before))
+        assert after[1:] == before
+        assert self._blocks(loaded_db, "fact_dispatch", "site_id") == dispatch
+        assert "'SITE000'" not in self._column_type(loaded_db, "fact_dispatch", "site_id")
+
+
+class TestRetentionTiers:
+    """Tests for downsampled telemetry tiers and raw retention."""
+
+    def test_tiers_summarize_raw_rows(self, loaded_db):
+        """Test that each tier matches an aggregation of the raw minutes."""
+        tiers = [("agg_telemetry_15min", "ts_15min", 15), ("agg_telemetry_1hour", "ts_1hour", 60)]
+        for table, bucket, minutes in tiers:
+            tier = loaded_db.execute(f"""
+                SELECT {bucket}, site_id::VARCHAR, tag::VARCHAR, avg_value, min_value, max_value, sample_count
+                FROM {table} ORDER BY ALL
+            """).fetchall()
+            raw = loaded_db.execute(f"""
+                SELECT time_bucket(INTERVAL '{minutes} minutes', ts) as b, site_id::VARCHAR, tag::VARCHAR,
+                       AVG(value), MIN(value), MAX(value), COUNT(*)
+                FROM fact_telemetry GROUP BY ALL ORDER BY ALL
+            """).fetchall()
+
+            assert len(tier) == 3 * 9 * 2 * 1440 // minutes
+            assert tier == raw
+
+    def test_partial_bucket_is_completed_by_next_load(self, loaded_db, data_dir):
+        """Test that a bucket split across two batches ends up with every sample."""
+        from db.loader import load_data
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        day3 = TELEMETRY_START + timedelta(days=2)
+        make_telemetry(day3, 20).to_parquet(batch_dir / "batch_0001.parquet", index=False)
+        load_data(loaded_db)
+        make_telemetry(day3 + timedelta(minutes=20), 10).to_parquet(batch_dir / "batch_0002.parquet", index=False)
+        load_data(loaded_db)
+
+        counts = loaded_db.execute("""
+            SELECT ts_15min, MIN(sample_count), MAX(sample_count)
+            FROM agg_telemetry_15min WHERE ts_15min >= ? GROUP BY ts_15min ORDER BY ts_15min
+        """, [day3]).fetchall()
+
+        assert counts == [
+            (day3, 15, 15),
+            (day3 + timedelta(minutes=15), 15, 15),
+        ]
+
+    def test_retention_purges_raw_but_keeps_tiers(self, data_dir):
+        """Test that raw minutes outside the window are purged while tiers keep them."""
+        from db.loader import get_connection, load_data
+        from db.retention import raw_retained_from
+
+        conn = get_connection()
+        load_data(conn, retention_days=1)
+
+        cutoff = TELEMETRY_START + timedelta(minutes=2 * 1440 - 1) - timedelta(days=1)
+        assert raw_retained_from(conn) == cutoff
+        assert conn.execute("SELECT MIN(ts) FROM fact_telemetry").fetchone()[0] == cutoff
+        assert conn.execute("SELECT MIN(ts) FROM fact_telemetry_wide").fetchone()[0] == cutoff
+        assert conn.execute("SELECT MIN(ts_15min) FROM agg_telemetry_15min").fetchone()[0] == TELEMETRY_START
+        conn.close()
+
+    def test_late_batch_before_retention_keeps_history(self, data_dir):
+        """Test that a late batch reaching back before the retention cutoff leaves derived history intact."""
+        from db.loader import get_connection, load_data
+
+        make_telemetry(TELEMETRY_START, 4 * 1440).to_parquet(data_dir / "fact_telemetry.parquet", index=False)
+        conn = get_connection()
+        load_data(conn, materialize=True, retention_days=1)
+        derived = ["agg_telemetry_15min", "agg_telemetry_1hour", "agg_site_daily", "mv_site_availability"]
+        before = {table: conn.execute(f"SELECT * FROM {table} ORDER BY ALL").fetchall() for table in derived}
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        late = make_telemetry(TELEMETRY_START + timedelta(seconds=30), 5)
+        late = late[(late["site_id"] == "SITE002") & (late["tag"] == "p_kw")]
+        late.to_parquet(batch_dir / "batch_0001.parquet", index=False)
+        load_data(conn, materialize=True, retention_days=1)
+
+        assert conn.execute("SELECT COUNT(*) FROM agg_telemetry_1hour").fetchone()[0] == 4 * 24 * 3 * 9
+        assert conn.execute("SELECT COUNT(*) FROM agg_site_daily").fetchone()[0] == 4 * 3
+        for table in derived:
+            assert conn.execute(f"SELECT * FROM {table} ORDER BY ALL").fetchall() == before[table], table
+        conn.close()
+
+    def test_router_picks_cheapest_tier(self, data_dir):
+        """Test that the router uses the coarsest tier that satisfies the query."""
+        from db.loader import get_connection, load_data
+        from db.retention import telemetry_tier
+
+        conn = get_connection()
+        load_data(conn)
+        assert telemetry_tier(conn, 1440)["table"] == "agg_telemetry_1hour"
+        assert telemetry_tier(conn, 60)["table"] == "agg_telemetry_1hour"
+        assert telemetry_tier(conn, 15)["table"] == "agg_telemetry_15min"
+        assert telemetry_tier(conn, 5)["table"] == "fact_telemetry"
+
+        load_data(conn, retention_days=1)
+        assert telemetry_tier(conn, 5, TELEMETRY_START)["table"] == "agg_telemetry_15min"
+        assert telemetry_tier(conn, 5)["table"] == "agg_telemetry_15min"
+        assert telemetry_tier(conn, 5, TELEMETRY_START + timedelta(days=1))["table"] == "fact_telemetry"
+        conn.close()
+
+
+class TestGoldLayer:
+    """Tests for the in-database Gold layer stage."""
+
+    def test_site_daily_matches_raw_telemetry(self, loaded_db, data_dir):
+        """Test that daily site rollups agree with a pandas aggregation of raw rows."""
+        import pandas as pd
+
+        raw = pd.read_parquet(data_dir / "fact_telemetry.parquet")
+        raw = raw[raw["site_id"] == "SITE002"]
+        soc = raw[raw["tag"] == "soc_pct"].groupby(raw["ts"].dt.date)["value"]
+        power = raw[raw["tag"] == "p_kw"]
+
+        rows = loaded_db.execute(
+            "SELECT dod_pct, energy_discharged_mwh FROM agg_site_daily WHERE site_id = 'SITE002' ORDER BY date"
+        ).fetchall()
+        discharged = power[power["value"] > 0].groupby(power["ts"].dt.date)["value"].sum() / 60 / 1000
+
+        assert [r[0] for r in rows] == pytest.approx((soc.max() - soc.min()).tolist())
+        assert [r[1] for r in rows] == pytest.approx(discharged.tolist())
+
+    def test_refresh_recomputes_only_new_buckets(self, loaded_db, data_dir):
+        """Test that a new day of telemetry adds its rollups without touching older days."""
+        from db.loader import load_data
+
+        loaded_db.execute("UPDATE agg_site_daily SET dod_pct = -1 WHERE date = ?", [TELEMETRY_START.date()])
+        months_before = loaded_db.execute("SELECT COUNT(*) FROM agg_site_monthly").fetchone()[0]
+
+        batch_dir = data_dir / "fact_telemetry"
+        batch_dir.mkdir()
+        make_telemetry(TELEMETRY_START + timedelta(days=2), 60).to_parquet(
+            batch_dir / "batch_0001.parquet", index=False
+        )
+        load_data(loaded_db)
+
+        days = loaded_db.execute(
+            "SELECT date, MIN(dod_pct) FROM agg_site_daily GROUP BY date ORDER BY date"
+        ).fetchall()
+        assert [d for d, _ in days] == [(TELEMETRY_START + timedelta(days=n)).date() for n in range(3)]
+        assert days[0][1] == -1
+        assert loaded_db.execute("SELECT COUNT(*) FROM agg_site_monthly").fetchone()[0] == months_before
+
+
+class TestLoadReport:
+    """Tests for the JSON load-performance report."""
+
+    def _latest_report(self, data_dir) -> dict:
+        import json
+
+        return json.loads(sorted((data_dir / "load_reports").glob("load-*.json"))[-1].read_text())
+
+    def test_load_writes_report(self, loaded_db, data_dir):
+        """Test that a load reports every table and stage."""
+        report = self._latest_report(data_dir)
+
+        telemetry = report["tables"]["fact_telemetry"]
+        assert telemetry["mode"] == "full"
+        assert telemetry["rows"] == 3 * 9 * 2 * 1440
+        assert telemetry["bytes_read"] == (data_dir / "fact_telemetry.parquet").stat().st_size
+        assert telemetry["seconds"] > 0
+        assert "process_peak_rss_mb" in telemetry
+        assert {"v_daily_revenue", "v_site_availability", "v_revenue_loss_allocation"} <= set(report["views"])
+        assert sum(report["views"].values()) <= report["stages"]["views"]
+        assert {"dimensions", "facts", "wide_telemetry", "gold", "kpi_snapshot", "views"} <= set(report["stages"])
+        assert report["total_seconds"] >= sum(report["stages"].values()) * 0.9
+
+    def test_incremental_reload_reports_no_work(self, loaded_db, data_dir):
+        """Test that reloading unchanged files reports zero rows and bytes."""
+        from db.loader import load_data
+
+        load_data(loaded_db)
+        telemetry = self._latest_report(data_dir)["tables"]["fact_telemetry"]
+
+        assert (telemetry["mode"], telemetry["rows"], telemetry["bytes_read"]) == ("incremental", 0, 0)
+
+    def test_compare_flags_regressions(self):
+        """Test that the comparison flags slowdowns beyond the threshold."""
+        from db.report import compare_reports
+
+        old = {
+            "tables": {"fact_dispatch": {"seconds": 1.0, "rows": 10}},
+            "views": {"v_daily_revenue": 0.1},
+            "stages": {"views": 0.5},
+            "total_seconds": 2.0,
+        }
+        new = {
+            "tables": {"fact_dispatch": {"seconds": 1.5, "rows": 10}},
+            "views": {"v_daily_revenue": 0.2},
+            "stages": {"views": 0.55},
+            "total_seconds": 2.1,
+        }
+
+        rows = {(r["kind"], r["name"]): r for r in compare_reports(old, new, threshold=0.2)}
+
+        assert rows[("table", "fact_dispatch")]["change"] == 0.5
+        assert rows[("table", "fact_dispatch")]["regression"]
+        assert rows[("view", "v_daily_revenue")]["regression"]
+        assert not rows[("stage", "views")]["regression"]
+        assert not rows[("total", "total")]["regression"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,170 @@
+"""
+BESS Analytics - Snapshot Tests
+
+Tests for building, validating and swapping versioned database snapshots.
+"""
+
+from datetime import timedelta
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from tests.conftest import TELEMETRY_START, make_telemetry
+
+DASHBOARD_PAGES = sorted((Path(__file__).parent.parent / "dashboard" / "pages").glob("*.py"))
+
+
+def _add_batch(data_dir, name: str, start, minutes: int):
+    """Write a telemetry micro-batch file."""
+    batch_dir = data_dir / "fact_telemetry"
+    batch_dir.mkdir(exist_ok=True)
+    make_telemetry(start, minutes).to_parquet(batch_dir / name, index=False)
+
+
+class TestSnapshots:
+    """Tests for atomic snapshot build-and-swap."""
+
+    def test_build_publishes_pointer(self, data_dir):
+        """Test that a built snapshot becomes the path readers resolve."""
+        from db.snapshot import build_snapshot, current_snapshot, resolve_db_path
+
+        assert resolve_db_path() == data_dir / "bess_analytics.duckdb"
+
+        snapshot = build_snapshot()
+
+        assert current_snapshot() == snapshot
+        assert resolve_db_path() == snapshot
+        conn = duckdb.connect(str(snapshot), read_only=True)
+        assert conn.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0] > 0
+        conn.close()
+
+    def test_open_readers_keep_their_snapshot(self, data_dir):
+        """Test that a refresh does not change what an open reader sees."""
+        from db.snapshot import build_snapshot, resolve_db_path
+
+        first = build_snapshot()
+        reader = duckdb.connect(str(resolve_db_path()), read_only=True)
+        before = reader.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0]
+
+        _add_batch(data_dir, "batch_0001.parquet", TELEMETRY_START + timedelta(days=2), 10)
+        second = build_snapshot()
+
+        assert second != first
+        assert reader.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0] == before
+        reader.close()
+
+        fresh = duckdb.connect(str(resolve_db_path()), read_only=True)
+        assert fresh.execute("SELECT COUNT(*) FROM fact_telemetry").fetchone()[0] > before
+        fresh.close()
+
+    def test_old_snapshots_are_pruned(self, data_dir):
+        """Test that only the newest snapshots are kept on disk."""
+        from db.snapshot import build_snapshot, snapshot_dir
+
+        snapshots = [build_snapshot(keep=2) for _ in range(3)]
+
+        assert sorted(snapshot_dir().glob("*.duckdb")) == snapshots[1:]
+
+    def test_invalid_snapshot_is_not_published(self, data_dir):
+        """Test that a build failing validation leaves the live snapshot in place."""
+        import pandas as pd
+        from db.snapshot import build_snapshot, current_snapshot, snapshot_dir
+
+        live = build_snapshot()
+        settlement = data_dir / "fact_settlement.parquet"
+        pd.read_parquet(settlement).head(0).to_parquet(settlement, index=False)
+
+        with pytest.raises(RuntimeError, match="fact_settlement"):
+            build_snapshot(full_refresh=True)
+
+        assert current_snapshot() == live
+        assert list(snapshot_dir().glob("*.duckdb")) == [live]
+
+    def test_api_follows_published_snapshot(self, data_dir, monkeypatch):
+        """Test that the API picks up a new snapshot on its next request."""
+        from fastapi.testclient import TestClient
+
+        import api.main as api_main
+        from db.snapshot import build_snapshot
+
+        monkeypatch.setattr(api_main, "DB_PATH", data_dir / "bess_analytics.duckdb")
+        client = TestClient(api_main.app)
+        build_snapshot()
+
+        params = {"site_id": "SITE001", "tags": "soc_pct", "resolution": "1hour"}
+        before = client.get("/metrics/telemetry", params=params).json()
+
+        _add_batch(data_dir, "batch_0001.parquet", TELEMETRY_START + timedelta(days=2), 60)
+        build_snapshot()
+        after = client.get("/metrics/telemetry", params=params).json()
+
+        assert len(after) == len(before) + 1
+
+    def test_readers_follow_published_snapshot(self, data_dir):
+        """Test that get_connection reads the live snapshot, not the stale database file."""
+        from db.loader import get_connection
+        from db.snapshot import build_snapshot
+
+        snapshot = build_snapshot()
+        conn = get_connection(read_only=True)
+        path = conn.execute(
+            "SELECT path FROM duckdb_databases() WHERE database_name = current_database()"
+        ).fetchone()[0]
+        conn.close()
+
+        assert path == str(snapshot)
+
+    def test_in_place_writes_refused_after_publish(self, data_dir):
+        """Test that the live database cannot be loaded in place once snapshots are published."""
+        from db.loader import get_connection, init_database
+        from db.snapshot import build_snapshot
+
+        build_snapshot()
+
+        with pytest.raises(RuntimeError, match="snapshot"):
+            get_connection()
+        with pytest.raises(RuntimeError, match="snapshot"):
+            init_database()
+
+    def test_locked_database_reports_how_to_refresh(self, data_dir):
+        """Test that an in-place load against a file held by a reader fails with guidance."""
+        import subprocess
+        import sys
+
+        from db.loader import DB_PATH, get_connection
+
+        get_connection().close()
+        reader = subprocess.Popen(
+            [sys.executable, "-c", (
+                "import sys, duckdb; conn = duckdb.connect(sys.argv[1], read_only=True); "
+                "print('ready', flush=True); sys.stdin.read()"
+            ), str(DB_PATH)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert reader.stdout.readline().strip() == "ready"
+            with pytest.raises(RuntimeError, match="python -m db.loader"):
+                get_connection()
+        finally:
+            reader.stdin.close()
+            reader.wait()
+
+
+class TestDashboardReaders:
+    """Tests that dashboard pages only read the published snapshot."""
+
+    @pytest.mark.parametrize("page", DASHBOARD_PAGES, ids=lambda p: p.stem)
+    def test_page_renders_from_read_only_snapshot(self, page, data_dir):
+        """Test that a page's queries run on a read-only connection to the live snapshot."""
+        from streamlit.testing.v1 import AppTest
+
+        from db.snapshot import build_snapshot
+
+        build_snapshot()
+        app = AppTest.from_file(str(page), default_timeout=60).run()
+
+        assert [e.message for e in app.exception] == []
+        assert not (data_dir / "bess_analytics.duckdb").exists()